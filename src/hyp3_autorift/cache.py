@@ -0,0 +1,162 @@
+"""Node-wide, on-disk caches shared by concurrent jobs"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = 'HYP3_AUTORIFT_CACHE_DIR'
+
+
+def get_cache_dir(name: str) -> Path | None:
+    """Get (and create) the directory of a named cache.
+
+    Caching is enabled by setting the `HYP3_AUTORIFT_CACHE_DIR` environment variable to a directory that may be
+    shared by all the jobs on a node.
+
+    Args:
+        name: Name of the cache, e.g. `orbits`
+
+    Returns:
+        The cache directory, or None if caching is disabled
+    """
+    cache_root = os.environ.get(CACHE_DIR_ENV)
+    if not cache_root:
+        return None
+
+    cache_dir = Path(cache_root) / name
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+@contextmanager
+def file_lock(lock_path: Union[str, Path], shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on a file, blocking until it is available; works across processes.
+
+    Args:
+        lock_path: The lock file, created if it doesn't exist
+        shared: Acquire a shared (read) lock instead of an exclusive (write) lock
+    """
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def publish_file(src: Union[str, Path], dest: Union[str, Path], move: bool = False) -> Path:
+    """Atomically place a file in a cache, so other jobs never see a partially written file.
+
+    Args:
+        src: The file to publish
+        dest: The path in the cache to publish the file to
+        move: Move `src` instead of copying it
+
+    Returns:
+        The published file
+    """
+    dest = Path(dest)
+    with tempfile.NamedTemporaryFile(dir=dest.parent, prefix=f'.{dest.name}.', delete=False) as tmp:
+        tmp_path = Path(tmp.name)
+    try:
+        if move:
+            shutil.move(src, tmp_path)
+        else:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return dest
+
+
+def write_json(data, dest: Union[str, Path]) -> Path:
+    """Atomically write a JSON file, e.g. a cache index."""
+    dest = Path(dest)
+    with tempfile.NamedTemporaryFile('w', dir=dest.parent, prefix=f'.{dest.name}.', delete=False) as tmp:
+        tmp_path = Path(tmp.name)
+        try:
+            json.dump(data, tmp, indent=2, sort_keys=True)
+        except BaseException:
+            tmp_path.unlink()
+            raise
+    os.replace(tmp_path, dest)
+    return dest
+
+
+def read_json(path: Union[str, Path], default=None):
+    """Read a JSON file, returning `default` if it doesn't exist or is unreadable."""
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return default
+
+
+def link_from_cache(cached_file: Union[str, Path], directory: Union[str, Path] = '.', hard: bool = False) -> Path:
+    """Make a cached file available in a (working) directory by linking it, or copying it if links aren't possible.
+
+    Args:
+        cached_file: The file in the cache
+        directory: The directory to make the file available in
+        hard: Hard link the file so it remains available even if it's evicted from the cache
+
+    Returns:
+        The path to the file in `directory`
+    """
+    cached_file = Path(cached_file).absolute()
+    local_file = Path(directory) / cached_file.name
+    if local_file.absolute() == cached_file:
+        return local_file
+
+    local_file.unlink(missing_ok=True)
+    try:
+        if hard:
+            local_file.hardlink_to(cached_file)
+        else:
+            local_file.symlink_to(cached_file)
+    except OSError:
+        log.debug(f'Unable to link {cached_file}; copying it instead')
+        shutil.copyfile(cached_file, local_file)
+    return local_file
+
+
+def evict_lru(cache_dir: Union[str, Path], max_bytes: int, pattern: str = '*', keep: tuple = ()) -> list[Path]:
+    """Remove the least recently used files from a cache until it is no larger than `max_bytes`.
+
+    Files are used most recently when their modification time is newest, so touch a file whenever it is used.
+
+    Args:
+        cache_dir: The cache directory
+        max_bytes: The maximum size of the cache
+        pattern: Glob pattern of the cached files to consider
+        keep: Files to never evict, e.g. the file just added
+
+    Returns:
+        The evicted files
+    """
+    keep_names = {Path(file).name for file in keep}
+    files = [file for file in Path(cache_dir).glob(pattern) if file.is_file() and not file.name.startswith('.')]
+    stats = {file: file.stat() for file in files}
+    total_bytes = sum(stat.st_size for stat in stats.values())
+
+    evicted = []
+    for file in sorted(files, key=lambda file: stats[file].st_mtime):
+        if total_bytes <= max_bytes:
+            break
+        if file.name in keep_names:
+            continue
+        file.unlink(missing_ok=True)
+        total_bytes -= stats[file].st_size
+        evicted.append(file)
+        log.info(f'Evicted {file.name} from {cache_dir}')
+
+    return evicted
@@ -0,0 +1,211 @@
+"""A node-local cache of warped 1x1 degree DEM tiles"""
+
+import hashlib
+import logging
+import math
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from hyp3lib import DemError
+from hyp3lib.dem import prepare_dem_geotiff
+from osgeo import gdal
+
+from hyp3_autorift import cache, geometry
+
+
+log = logging.getLogger(__name__)
+
+gdal.UseExceptions()
+
+TILE_SIZE = 1  # degrees
+
+
+def get_tile_origins(bounds: list[float]) -> list[tuple[int, int]]:
+    """Get the (lon, lat) of the south-west corner of each DEM tile intersecting the bounds.
+
+    Args:
+        bounds: The `[west, south, east, north]` bounds in degrees
+
+    Returns:
+        The tile origins, ordered north-to-south and west-to-east
+    """
+    west, south, east, north = bounds
+    lons = range(math.floor(west), max(math.ceil(east), math.floor(west) + TILE_SIZE), TILE_SIZE)
+    lats = range(math.floor(south), max(math.ceil(north), math.floor(south) + TILE_SIZE), TILE_SIZE)
+    return [(lon, lat) for lat in reversed(lats) for lon in lons]
+
+
+def get_tile_name(lon: int, lat: int) -> str:
+    return f'{"N" if lat >= 0 else "S"}{abs(lat):02d}{"E" if lon >= 0 else "W"}{abs(lon):03d}.tif'
+
+
+def snap_bounds(bounds: list[float], resolution: float) -> list[float]:
+    """Expand the bounds outward to the nearest multiples of the resolution, like GDAL's `targetAlignedPixels`."""
+    west, south, east, north = (round(bound / resolution, 6) for bound in bounds)
+    return [
+        math.floor(west) * resolution,
+        math.floor(south) * resolution,
+        math.ceil(east) * resolution,
+        math.ceil(north) * resolution,
+    ]
+
+
+def get_dem_key(source: str, resolution: float, **options) -> str:
+    """Get the name of the cache for a DEM source, resolution, and any other options that affect the DEM tiles."""
+    description = '|'.join([source, repr(resolution)] + [f'{key}={value!r}' for key, value in sorted(options.items())])
+    digest = hashlib.sha1(description.encode()).hexdigest()[:12]
+    return f'{Path(source).stem}_{resolution:g}_{digest}'
+
+
+def fetch_cached_tile(
+    cache_dir: Path, origin: tuple[int, int], fetch_tile: Callable[[list[float], Path], None]
+) -> Path | None:
+    """Get a DEM tile from the cache, fetching it into the cache if it isn't there.
+
+    Args:
+        cache_dir: The DEM tile cache directory
+        origin: The (lon, lat) of the south-west corner of the tile
+        fetch_tile: Function that writes the DEM for `[west, south, east, north]` bounds to a GeoTIFF, raising a
+            `DemError` if there is no DEM coverage
+
+    Returns:
+        The cached tile, or None if there is no DEM coverage for the tile
+    """
+    lon, lat = origin
+    tile = cache_dir / get_tile_name(lon, lat)
+    no_coverage = tile.with_suffix('.empty')
+
+    if not tile.exists() and not no_coverage.exists():
+        with cache.file_lock(cache_dir / f'.{tile.name}.lock'):
+            if not tile.exists() and not no_coverage.exists():
+                log.info(f'Fetching DEM tile {tile.name}')
+                with tempfile.TemporaryDirectory(dir=cache_dir) as temp_dir:
+                    temp_tile = Path(temp_dir) / tile.name
+                    try:
+                        fetch_tile([lon, lat, lon + TILE_SIZE, lat + TILE_SIZE], temp_tile)
+                    except DemError as e:
+                        log.info(f'No DEM coverage for tile {tile.name}: {e}')
+                        no_coverage.touch()
+                    else:
+                        cache.publish_file(temp_tile, tile, move=True)
+
+    return tile if tile.exists() else None
+
+
+def get_cached_dem(
+    bounds: list[float],
+    cache_dir: Path,
+    fetch_tile: Callable[[list[float], Path], None],
+    dem_path: str = 'dem.tif',
+    resolution: float = 0.001,
+    max_workers: int = 4,
+) -> str:
+    """Create a DEM GeoTIFF for the bounds from cached 1x1 degree tiles, fetching only the tiles that are missing.
+
+    The tiles are mosaicked with a VRT and the (pixel-aligned) bounds are cut out of it, so no resampling is done.
+
+    Args:
+        bounds: The `[west, south, east, north]` bounds in degrees
+        cache_dir: The DEM tile cache directory for this DEM source and resolution
+        fetch_tile: Function that writes the DEM for `[west, south, east, north]` tile bounds to a GeoTIFF on a
+            `resolution` pixel grid aligned to the tile bounds; see `fetch_cached_tile`
+        dem_path: The DEM GeoTIFF to create
+        resolution: The resolution of the DEM in degrees
+        max_workers: Maximum number of tiles to fetch concurrently
+
+    Returns:
+        The path of the DEM
+    """
+    origins = get_tile_origins(bounds)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(origins)))) as executor:
+        tiles = [tile for tile in executor.map(lambda o: fetch_cached_tile(cache_dir, o, fetch_tile), origins) if tile]
+
+    if not tiles:
+        raise DemError(f'No DEM coverage for bounds {bounds}')
+
+    west, south, east, north = snap_bounds(bounds, resolution)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        vrt = str(Path(temp_dir) / 'dem.vrt')
+        gdal.BuildVRT(vrt, [str(tile) for tile in tiles], resolution='highest')
+        gdal.Translate(dem_path, vrt, projWin=[west, north, east, south], format='GTiff')
+
+    return dem_path
+
+
+def warp_dem(dem: str, bounds: list[float], dem_path: str, resolution: float = 0.001) -> None:
+    """Warp a DEM to a Int16, EPSG:4326 GeoTIFF covering the bounds."""
+    in_ds = gdal.OpenShared(dem, gdal.GA_ReadOnly)
+    warp_options = gdal.WarpOptions(
+        format='GTIFF',
+        outputType=gdal.GDT_Int16,
+        multithread=True,
+        resampleAlg='cubic',
+        xRes=resolution,
+        yRes=resolution,
+        dstSRS='EPSG:4326',
+        dstNodata=0,
+        outputBounds=bounds,
+    )
+    gdal.Warp(str(dem_path), in_ds, options=warp_options)
+
+
+def get_warped_dem(dem: str, bounds: list[float], dem_path: str = 'dem.tif', resolution: float = 0.001) -> str:
+    """Warp a (remote) DEM to a GeoTIFF covering the bounds, using the node-local DEM tile cache if it's enabled.
+
+    Args:
+        dem: The source DEM, e.g. a `/vsicurl/` URL
+        bounds: The `[west, south, east, north]` bounds in degrees
+        dem_path: The DEM GeoTIFF to create
+        resolution: The resolution of the DEM in degrees
+
+    Returns:
+        The path of the DEM
+    """
+    cache_dir = cache.get_cache_dir(f'dems/{get_dem_key(dem, resolution, resample="cubic", type="Int16")}')
+    if cache_dir is None:
+        warp_dem(dem, bounds, dem_path, resolution)
+        return dem_path
+
+    return get_cached_dem(
+        bounds,
+        cache_dir,
+        lambda tile_bounds, path: warp_dem(dem, tile_bounds, str(path), resolution),
+        dem_path,
+        resolution,
+    )
+
+
+def get_copernicus_dem(
+    bounds: list[float], dem_path: str = 'dem.tif', resolution: float = 0.001, height_above_ellipsoid: bool = True
+) -> str:
+    """Prepare a Copernicus GLO-30 DEM GeoTIFF covering the bounds, using the node-local DEM tile cache if it's enabled.
+
+    Args:
+        bounds: The `[west, south, east, north]` bounds in degrees
+        dem_path: The DEM GeoTIFF to create
+        resolution: The resolution of the DEM in degrees
+        height_above_ellipsoid: Provide heights above the ellipsoid instead of above mean sea level
+
+    Returns:
+        The path of the DEM
+    """
+
+    def prepare_dem(tile_bounds: list[float], path: Path) -> None:
+        west, south, east, north = tile_bounds
+        prepare_dem_geotiff(
+            output_name=path,
+            geometry=geometry.polygon_from_bbox(x_limits=(west, east), y_limits=(south, north)),
+            epsg_code=4326,
+            pixel_size=resolution,
+            height_above_ellipsoid=height_above_ellipsoid,
+        )
+
+    key = get_dem_key('copernicus_glo30', resolution, height_above_ellipsoid=height_above_ellipsoid)
+    cache_dir = cache.get_cache_dir(f'dems/{key}')
+    if cache_dir is None:
+        prepare_dem(bounds, Path(dem_path))
+        return dem_path
+
+    return get_cached_dem(bounds, cache_dir, prepare_dem, dem_path, resolution)
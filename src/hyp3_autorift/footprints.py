@@ -0,0 +1,113 @@
+"""Offline footprints of Sentinel-2 scenes, derived from the Military Grid Reference System (MGRS) tile in their names"""
+
+import re
+from functools import lru_cache
+
+import pyproj
+
+
+# MGRS latitude bands are 8 degrees tall, from 80S (C) to 72N (X, which extends to 84N)
+LATITUDE_BANDS = 'CDEFGHJKLMNPQRSTUVWX'
+# 100 km square column letters repeat every three UTM zones
+COLUMN_LETTERS = ('ABCDEFGH', 'JKLMNPQR', 'STUVWXYZ')
+# 100 km square row letters repeat every 2,000 km of northing, and are offset by 500 km in even UTM zones
+ROW_LETTERS = 'ABCDEFGHJKLMNPQRSTUV'
+
+# Sentinel-2 tiles are 109.8 km squares whose upper left corner is up to 40 m west and north of the upper left corner
+# of their MGRS 100 km square, so they overlap their eastern and southern neighbors by 9.8 km
+S2_TILE_SIZE = 109_800
+S2_TILE_OFFSET = 40
+
+MGRS_TILE_PATTERN = re.compile(r'_T?(\d{2}[C-HJ-NP-X][A-HJ-NP-Z][A-HJ-NP-V])_')
+
+
+def get_s2_tile(scene_name: str) -> str | None:
+    """Get the MGRS tile of a Sentinel-2 scene (e.g., `29QKF`), or None if the scene name doesn't include one."""
+    match = MGRS_TILE_PATTERN.search(f'{scene_name}_')
+    return match.group(1) if match else None
+
+
+def get_utm_epsg(tile: str) -> int:
+    """Get the EPSG code of the UTM zone of an MGRS tile."""
+    zone = int(tile[:2])
+    return 32600 + zone if tile[2] >= 'N' else 32700 + zone
+
+
+@lru_cache
+def _get_transformer(epsg: int, to_utm: bool) -> pyproj.Transformer:
+    if to_utm:
+        return pyproj.Transformer.from_crs('EPSG:4326', f'EPSG:{epsg}', always_xy=True)
+    return pyproj.Transformer.from_crs(f'EPSG:{epsg}', 'EPSG:4326', always_xy=True)
+
+
+def get_square_origin(tile: str) -> tuple[int, int]:
+    """Get the UTM easting and northing of the lower left corner of the 100 km square of an MGRS tile.
+
+    Args:
+        tile: The MGRS tile, e.g. `29QKF`
+
+    Returns:
+        The easting and northing of the lower left corner of the 100 km square, in meters
+    """
+    zone, band, column, row = int(tile[:2]), tile[2], tile[3], tile[4]
+    if not 1 <= zone <= 60:
+        raise ValueError(f'Invalid UTM zone in MGRS tile {tile}')
+
+    easting = (COLUMN_LETTERS[(zone - 1) % 3].index(column) + 1) * 100_000
+
+    row_offset = 5 if zone % 2 == 0 else 0
+    northing = ((ROW_LETTERS.index(row) - row_offset) % len(ROW_LETTERS)) * 100_000
+
+    # The row letters repeat every 2,000 km, so choose the first 100 km square that reaches into the latitude band;
+    # a band's southern edge is furthest south at the central meridian of the UTM zone.
+    band_south = -80 + 8 * LATITUDE_BANDS.index(band)
+    central_meridian = -183 + 6 * zone
+    _, band_northing = _get_transformer(get_utm_epsg(tile), True).transform(central_meridian, band_south)
+    while northing + 100_000 <= band_northing:
+        northing += 2_000_000
+
+    return easting, northing
+
+
+def get_s2_tile_bbox(tile: str) -> list[float]:
+    """Get the WGS84 bounding box of a Sentinel-2 tile, like `process.get_raster_bbox` gets from its rasters.
+
+    The footprint is padded by up to 40 m to cover the small offsets between Sentinel-2 tiles and the MGRS grid.
+
+    Args:
+        tile: The MGRS tile, e.g. `29QKF`
+
+    Returns:
+        The `[west, south, east, north]` bounding box in degrees; tiles crossing the antimeridian extend below -180
+    """
+    easting, northing = get_square_origin(tile)
+    west = easting - S2_TILE_OFFSET
+    east = easting + S2_TILE_SIZE
+    south = northing + 100_000 - S2_TILE_SIZE
+    north = northing + 100_000 + S2_TILE_OFFSET
+
+    xs = [west, east, east, west]
+    ys = [north, north, south, south]
+    lons, lats = _get_transformer(get_utm_epsg(tile), False).transform(xs, ys)
+    lons = list(lons)
+    if max(lons) >= 170 and min(lons) <= -170:
+        lons = [lon - 360 if lon >= 170 else lon for lon in lons]
+    return [min(lons), min(lats), max(lons), max(lats)]
+
+
+def get_s2_scene_bbox(scene_name: str) -> list[float] | None:
+    """Get the WGS84 bounding box of a Sentinel-2 scene from the MGRS tile in its name, or None if it can't be derived.
+
+    Args:
+        scene_name: The Sentinel-2 scene name, e.g. `S2A_MSIL1C_20160616T112217_N0204_R137_T29QKF_20160617T193500`
+
+    Returns:
+        The `[west, south, east, north]` bounding box in degrees, or None
+    """
+    tile = get_s2_tile(scene_name)
+    if tile is None:
+        return None
+    try:
+        return get_s2_tile_bbox(tile)
+    except ValueError:
+        return None
@@ -0,0 +1,106 @@
+"""A persistent, node-wide cache of scene metadata (e.g., STAC items) in SQLite"""
+
+import json
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Callable, Union
+
+from hyp3_autorift import cache
+
+
+log = logging.getLogger(__name__)
+
+DATABASE_FILE = 'metadata.sqlite'
+
+_CACHES: dict[Path, 'MetadataCache'] = {}
+
+
+class MetadataCache:
+    """Scene metadata stored as JSON in a SQLite database, keyed by a namespace (e.g., the collection) and scene ID.
+
+    Items are immutable unless they're stored with a time-to-live, after which they're ignored and replaced the next
+    time they're requested. Each call uses its own connection, so a cache can be shared by threads and processes.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with closing(self._connect()) as connection, connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS metadata ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL, expires REAL, '
+                'PRIMARY KEY (namespace, key))'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=60)
+
+    def get(self, namespace: str, key: str):
+        """Get an item, or None if it isn't cached or has expired."""
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM metadata WHERE namespace = ? AND key = ?', (namespace, key)
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires is not None and expires < time.time():
+            return None
+        return json.loads(value)
+
+    def put(self, namespace: str, key: str, value, ttl: float | None = None) -> None:
+        """Store an item, replacing any cached item with the same key.
+
+        Args:
+            namespace: The namespace of the item, e.g. the collection
+            key: The key of the item, e.g. the scene ID
+            value: The item; must be JSON serializable
+            ttl: (Optional) The time-to-live of the item in seconds; the item never expires if None
+        """
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO metadata (namespace, key, value, created, expires) VALUES (?, ?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), now, expires),
+            )
+
+
+def get_metadata_cache() -> MetadataCache | None:
+    """Get the node-wide metadata cache, or None if caching is disabled; see `cache.get_cache_dir`."""
+    cache_dir = cache.get_cache_dir('metadata')
+    if cache_dir is None:
+        return None
+
+    path = cache_dir / DATABASE_FILE
+    if path not in _CACHES:
+        _CACHES[path] = MetadataCache(path)
+    return _CACHES[path]
+
+
+def get_cached_metadata(namespace: str, key: str, get_metadata: Callable[[], dict], ttl: float | None = None):
+    """Get an item from the metadata cache, getting and caching it if it isn't cached (or has expired).
+
+    Args:
+        namespace: The namespace of the item, e.g. the collection
+        key: The key of the item, e.g. the scene ID
+        get_metadata: Function that gets the item when it isn't cached
+        ttl: (Optional) The time-to-live of a newly cached item in seconds; the item never expires if None
+
+    Returns:
+        The item
+    """
+    metadata_cache = get_metadata_cache()
+    if metadata_cache is None:
+        return get_metadata()
+
+    if (value := metadata_cache.get(namespace, key)) is not None:
+        log.debug(f'Using cached {namespace} metadata for {key}')
+        return value
+
+    value = get_metadata()
+    metadata_cache.put(namespace, key, value, ttl=ttl)
+    return value
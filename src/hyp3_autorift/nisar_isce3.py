@@ -11,14 +11,14 @@ from pathlib import Path
 import asf_search as asf
 import cv2
 import numpy as np
-from hyp3lib.dem import prepare_dem_geotiff
-from nisar.products.readers import product
 from nisar.workflows import geo2rdr, rdr2geo, resample_slc
 from numpy import datetime64, timedelta64
 from osgeo import gdal, ogr, osr
 from shapely import Polygon
 
-from hyp3_autorift import utils
+from hyp3_autorift import nisar_products, utils
+from hyp3_autorift.dem import get_copernicus_dem
+from hyp3_autorift.parameters import prefetch_parameter_rasters
 from hyp3_autorift.process import DEFAULT_PARAMETER_FILE
 from hyp3_autorift.vend.testGeogrid import loadMetadataRslc, runGeogrid
 from hyp3_autorift.vend.testautoRIFT import generateAutoriftProduct
@@ -115,8 +115,7 @@ def get_scene_polygon(
         epsg_code = get_epsg_code(ds)
         ds = None
     else:
-        slc = product.open_product(reference_path)
-        poly = slc.identification.boundingPolygon
+        poly = nisar_products.get_bounding_polygon(reference_path)
 
     geom = ogr.CreateGeometryFromWkt(str(poly))
     srs = osr.SpatialReference()
@@ -149,18 +148,14 @@ def get_scene_polygon(
 
 def get_dem(scene_poly: ogr.Geometry, dem_path: str = 'dem.tif') -> str:
     """Download a DEM covering a given polygon."""
-    return str(
-        prepare_dem_geotiff(
-            output_name=dem_path, geometry=scene_poly, epsg_code=4326, pixel_size=0.001, height_above_ellipsoid=True
-        )
-    )
+    west, east, south, north = scene_poly.GetEnvelope()
+    return get_copernicus_dem([west, south, east, north], dem_path=dem_path, height_above_ellipsoid=True)
 
 
 def mock_s1_orbit_file(reference_path: str) -> str:
     """Create a mock Sentinel-1 Orbit file from the orbit info in a NISAR product."""
     orbit_path = Path(reference_path).with_suffix('.EOF')
-    ds = product.open_product(reference_path)
-    orbit = ds.getOrbit()
+    orbit = nisar_products.get_orbit(reference_path)
     count = len(orbit.position)
     ref_epoch = datetime64(orbit.reference_epoch, 'ns')
 
@@ -235,13 +230,17 @@ def srcwin_for_intersection(xmin, ymin, xmax, ymax, gt):
 
 
 def crop_gslcs(reference, secondary):
-    """Crop the reference and secondary GeoTIFFs to their overlap."""
+    """Crop the reference and secondary GSLCs to their overlap.
+
+    The crops are VRT windows over the GSLC datasets, so the overlap is read lazily from the GSLCs when it's converted to
+    amplitude instead of being copied into intermediate complex GeoTIFFs.
+    """
     geom = get_scene_polygon(
         reference_path=reference, bounds_from_ds=False, return_in_utm=True, geom_from_envelope=True
     )
 
-    reference = f'NETCDF:{reference}://science/LSAR/GSLC/grids/frequencyA/HH'
-    secondary = f'NETCDF:{secondary}://science/LSAR/GSLC/grids/frequencyA/HH'
+    reference = f'NETCDF:"{Path(reference).resolve()}"://science/LSAR/GSLC/grids/frequencyA/HH'
+    secondary = f'NETCDF:"{Path(secondary).resolve()}"://science/LSAR/GSLC/grids/frequencyA/HH'
 
     ds1 = gdal.Open(reference)
     ds2 = gdal.Open(secondary)
@@ -254,19 +253,72 @@ def crop_gslcs(reference, secondary):
     xoff1, yoff1, xsize1, ysize1 = srcwin_for_intersection(xmin, ymin, xmax, ymax, gt1)
     xoff2, yoff2, xsize2, ysize2 = srcwin_for_intersection(xmin, ymin, xmax, ymax, gt2)
 
-    out1 = 'reference_cropped.tif'
-    out2 = 'secondary_cropped.tif'
+    out1 = 'reference_cropped.vrt'
+    out2 = 'secondary_cropped.vrt'
 
-    gdal.Translate(out1, ds1, srcWin=[xoff1, yoff1, xsize1, ysize1])
-    gdal.Translate(out2, ds2, srcWin=[xoff2, yoff2, xsize2, ysize2])
+    gdal.Translate(out1, ds1, srcWin=[xoff1, yoff1, xsize1, ysize1], format='VRT')
+    gdal.Translate(out2, ds2, srcWin=[xoff2, yoff2, xsize2, ysize2], format='VRT')
+    del ds1, ds2
 
     print('Cropped the reference and secondary images to their intersection.')
 
     return out1, out2
 
 
-def convert_slc_to_uint8_amplitude(in_filename: str, out_filename: str, wallis_filter_width=21, is_gslc: bool = False):
-    """Convert CFloat32 rslc image to uint8 amplitude data, and write it to a GeoTIFF file."""
+def read_amplitude_rows(band, row: int, num_rows: int, is_gslc: bool = False) -> np.ndarray:
+    """Read rows of a complex SLC band as float32 amplitude, zeroing invalid (NaN/inf) GSLC values.
+
+    Rows outside the band are returned as zeros, like a constant (zero) border.
+    """
+    num_cols = band.XSize
+    img = np.zeros((num_rows, num_cols), dtype=np.float32)
+    start, stop = max(row, 0), min(row + num_rows, band.YSize)
+    if stop > start:
+        encoded = band.ReadRaster(
+            xoff=0,
+            yoff=start,
+            xsize=num_cols,
+            ysize=stop - start,
+            buf_xsize=num_cols,
+            buf_ysize=stop - start,
+            buf_type=gdal.GDT_CFloat32,
+        )
+        img[start - row : stop - row] = np.abs(np.frombuffer(encoded, np.complex64)).reshape((stop - start, num_cols))
+
+    if is_gslc:
+        img[~np.isfinite(img)] = 0
+    return img
+
+
+def read_filtered_block(
+    band, row: int, block_rows: int, kernel: np.ndarray, is_gslc: bool = False
+) -> tuple[np.ndarray, np.ndarray]:
+    """Read a block of rows of a complex SLC band and apply a high-pass filter to its amplitude.
+
+    The block is read with a halo of half the kernel height so the filtered block is identical to the same rows of the
+    whole filtered image.
+
+    Returns:
+        filtered: The filtered amplitude of the block
+        valid_data: Mask of the valid (non-zero amplitude) pixels of the block
+    """
+    halo = kernel.shape[0] // 2
+    num_rows = min(block_rows, band.YSize - row)
+    img = read_amplitude_rows(band, row - halo, num_rows + 2 * halo, is_gslc)
+    valid_data = img[halo : halo + num_rows] != 0
+    filtered = cv2.filter2D(img, -1, kernel, borderType=cv2.BORDER_CONSTANT)[halo : halo + num_rows]
+    return filtered, valid_data
+
+
+def convert_slc_to_uint8_amplitude(
+    in_filename: str, out_filename: str, wallis_filter_width=21, is_gslc: bool = False, block_rows: int = 1024
+):
+    """Convert CFloat32 rslc image to uint8 amplitude data, and write it to a GeoTIFF file.
+
+    The image is streamed in blocks of rows, so memory use is bounded by the block size instead of the scene size. A
+    first pass accumulates the mean and standard deviation of the high-pass filtered amplitude over the valid pixels,
+    and a second pass filters each block again, scales it to uint8, and writes it.
+    """
     ds = gdal.Open(in_filename, gdal.GA_ReadOnly)
     gt = ds.GetGeoTransform(can_return_null=True)
     proj = ds.GetProjectionRef()
@@ -283,63 +335,48 @@ def convert_slc_to_uint8_amplitude(in_filename: str, out_filename: str, wallis_f
         out_ds.SetGeoTransform(gt)
         out_ds.SetProjection(proj)
 
-    img = np.zeros((num_rows, num_cols), dtype=np.float32)
-
-    block_size = 10000
-
-    # Read SLC data progressively to avoid memory issues
-    for row in range(0, num_rows, block_size):
-        print(f'Reading Block {row / block_size}')
-
-        start = time.time()
-        if row + block_size > num_rows:
-            block_size = num_rows - row
-
-        encoded = band.ReadRaster(
-            xoff=0,
-            yoff=row,
-            xsize=num_cols,
-            ysize=block_size,
-            buf_xsize=num_cols,
-            buf_ysize=block_size,
-            buf_type=gdal.GDT_CFloat32,
-        )
-        img[row : row + block_size] = (
-            np.abs(np.frombuffer(encoded, np.complex64)).reshape((block_size, num_cols)).astype(np.float32)
-        )
-        end = time.time()
-        print(f'Reading SLC Block took {end - start}s')
-
-    print('Setting Invalid to 0')
-    if is_gslc:
-        img[np.isnan(img)] = 0
-        img[np.isinf(img)] = 0
-    valid_data = img != 0
-
-    print('Preprocess with HPS Filter')
     kernel = -np.ones((wallis_filter_width, wallis_filter_width), dtype=np.float32)
     kernel[int((wallis_filter_width - 1) / 2), int((wallis_filter_width - 1) / 2)] = kernel.size - 1
     kernel = kernel / kernel.size
-    img[:] = cv2.filter2D(img, -1, kernel, borderType=cv2.BORDER_CONSTANT)
-
-    print('Scale Values')
-    S1 = np.std(img[valid_data]) * np.sqrt(img[valid_data].size / (img[valid_data].size - 1.0))
-    M1 = np.mean(img[valid_data])
-    img -= M1 - 3 * S1
-    img /= 6 * S1
-    img *= 256
-    del S1, M1
-    np.clip(img, 0, 255, out=img)
-    np.rint(img, out=img)
-    img[:] = img.astype(np.uint8)
-
-    print('Setting Invalid to 0')
-    if is_gslc:
-        img[np.isnan(img)] = 0
-        img[np.isinf(img)] = 0
-    img[~valid_data] = 0
 
-    out_band.WriteArray(img)
+    print('Computing statistics of the HPS filtered image')
+    start = time.time()
+    count, mean, m2 = 0, 0.0, 0.0
+    for row in range(0, num_rows, block_rows):
+        filtered, valid_data = read_filtered_block(band, row, block_rows, kernel, is_gslc)
+        block_count = int(np.count_nonzero(valid_data))
+        if block_count == 0:
+            continue
+        block_mean = np.sum(filtered, where=valid_data, dtype=np.float64) / block_count
+        block_m2 = np.sum(np.square(filtered - block_mean, dtype=np.float64), where=valid_data)
+
+        # Combine the running and block statistics (Chan et al.)
+        delta = block_mean - mean
+        total = count + block_count
+        mean += delta * block_count / total
+        m2 += block_m2 + delta**2 * count * block_count / total
+        count = total
+    print(f'Computing statistics took {time.time() - start}s')
+
+    S1 = np.float32(np.sqrt(m2 / (count - 1.0)))
+    M1 = np.float32(mean)
+
+    print('Filtering and scaling values')
+    start = time.time()
+    for row in range(0, num_rows, block_rows):
+        img, valid_data = read_filtered_block(band, row, block_rows, kernel, is_gslc)
+        img -= M1 - 3 * S1
+        img /= 6 * S1
+        img *= 256
+        np.clip(img, 0, 255, out=img)
+        np.rint(img, out=img)
+        img = img.astype(np.uint8)
+        img[~valid_data] = 0
+        out_band.WriteArray(img, 0, row)
+    print(f'Filtering and scaling took {time.time() - start}s')
+
+    out_band.FlushCache()
+    del out_band, out_ds, band, ds
 
 
 def download_product(granule_name: str):
@@ -397,8 +434,7 @@ class GSLCMetadata:
 
 def get_polarizations(filename: str, frequency: str = 'A'):
     """Retrieve the available polarizations for a NISAR product."""
-    slc = product.open_product(filename)
-    return slc.polarizations[frequency]
+    return nisar_products.get_polarizations(filename, frequency)
 
 
 def process_nisar_rslc(
@@ -406,6 +442,8 @@ def process_nisar_rslc(
     secondary: str,
     frequency: str = 'A',
     polarization: str = 'HH',
+    workers: int = 1,
+    tiles: int = 1,
 ) -> str:
     """Run autoRIFT processing on a NISAR RSLC pair."""
     resample_type = 'coarse'
@@ -432,9 +470,14 @@ def process_nisar_rslc(
     print(f'Centroid: {scene_poly.Centroid()}')
 
     parameter_info = utils.find_jpl_parameter_info(scene_poly, parameter_file=DEFAULT_PARAMETER_FILE, flip_point=False)
+    parameter_info['autorift']['mpflag'] = utils.get_autorift_mpflag(workers)
+    parameter_info['autorift']['tiles'] = tiles
 
     print(f'Paramenter Info: {parameter_info}')
 
+    west, east, south, north = scene_poly.GetEnvelope()
+    parameter_info = prefetch_parameter_rasters(parameter_info, [west, south, east, north])
+
     reference_data_path = f'HDF5:{reference}://science/LSAR/RSLC/swaths/frequency{frequency}/{polarization}'
     secondary_data_path = f'scratch/coarse_resample_slc/freq{frequency}/{polarization}/coregistered_secondary.slc'
 
@@ -488,6 +531,8 @@ def process_nisar_gslc(
     secondary: str,
     frequency: str = 'A',
     polarization: str = 'HH',
+    workers: int = 1,
+    tiles: int = 1,
 ) -> str:
     """Run autoRIFT processing on a NISAR GSLC pair."""
     print(f'Reference GSLC: {reference}')
@@ -502,9 +547,14 @@ def process_nisar_gslc(
     print(f'DEM Path: {dem_path}')
 
     parameter_info = utils.find_jpl_parameter_info(scene_poly, parameter_file=DEFAULT_PARAMETER_FILE, flip_point=False)
+    parameter_info['autorift']['mpflag'] = utils.get_autorift_mpflag(workers)
+    parameter_info['autorift']['tiles'] = tiles
 
     print(f'Paramenter Info: {parameter_info}')
 
+    west, east, south, north = scene_poly.GetEnvelope()
+    parameter_info = prefetch_parameter_rasters(parameter_info, [west, south, east, north])
+
     ref_cropped, sec_cropped = crop_gslcs(reference, secondary)
 
     ref_amplitude = 'reference_adjusted.tif'
@@ -552,6 +602,8 @@ def process_nisar_pair(
     reference: str,
     secondary: str,
     frequency: str = 'A',
+    workers: int = 1,
+    tiles: int = 1,
 ) -> str:
     """Run autoRIFT processing on a NISAR SLC pair."""
     download_product(reference)
@@ -575,6 +627,8 @@ def process_nisar_pair(
             secondary=secondary,
             frequency=frequency,
             polarization=polarization,
+            workers=workers,
+            tiles=tiles,
         )
     elif 'GSLC' in reference:
         netcdf_file = process_nisar_gslc(
@@ -582,6 +636,8 @@ def process_nisar_pair(
             secondary=secondary,
             frequency=frequency,
             polarization=polarization,
+            workers=workers,
+            tiles=tiles,
         )
     else:
         raise ValueError(f'Only RSLC and GSLC NISAR products are supported: {reference}')
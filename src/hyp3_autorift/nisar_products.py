@@ -0,0 +1,81 @@
+"""Cached NISAR product handles and metadata"""
+
+import os
+from typing import Callable
+
+from nisar.products.readers import product
+
+
+class NisarProductSession:
+    """Memoizes `nisar.products.readers.product.open_product` and the metadata read from the products.
+
+    Each product's HDF5 metadata tree is only parsed once per job, and its orbit, bounding polygon, polarizations, and
+    swath (radar grid) metadata are only extracted once. Relative and absolute paths to the same file share a cache
+    entry.
+    """
+
+    def __init__(self):
+        self._products: dict[str, object] = {}
+        self._metadata: dict[tuple, object] = {}
+
+    def open_product(self, filename: str):
+        """Open a NISAR product, like `product.open_product`."""
+        key = os.path.abspath(filename)
+        if key not in self._products:
+            self._products[key] = product.open_product(filename)
+        return self._products[key]
+
+    def _memoize(self, name: str, filename: str, func: Callable, *args):
+        key = (name, os.path.abspath(filename), *args)
+        if key not in self._metadata:
+            self._metadata[key] = func(self.open_product(filename), *args)
+        return self._metadata[key]
+
+    def get_orbit(self, filename: str):
+        """Get the orbit of a NISAR product."""
+        return self._memoize('orbit', filename, lambda slc: slc.getOrbit())
+
+    def get_bounding_polygon(self, filename: str) -> str:
+        """Get the bounding polygon (WKT) of a NISAR product."""
+        return self._memoize('polygon', filename, lambda slc: str(slc.identification.boundingPolygon))
+
+    def get_polarizations(self, filename: str, frequency: str = 'A') -> list[str]:
+        """Get (a new list of) the available polarizations of a frequency of a NISAR product."""
+        return list(self._memoize('polarizations', filename, lambda slc, freq: slc.polarizations[freq], frequency))
+
+    def get_swath_metadata(self, filename: str):
+        """Get the swath (radar grid) metadata of a NISAR RSLC product."""
+        return self._memoize('swath', filename, lambda slc: slc.getSwathMetadata())
+
+    def clear(self):
+        """Drop all cached products and metadata."""
+        self._products.clear()
+        self._metadata.clear()
+
+
+SESSION = NisarProductSession()
+
+
+def open_product(filename: str):
+    """Open a NISAR product using the shared `SESSION`; see `NisarProductSession.open_product`."""
+    return SESSION.open_product(filename)
+
+
+def get_orbit(filename: str):
+    """Get the orbit of a NISAR product using the shared `SESSION`."""
+    return SESSION.get_orbit(filename)
+
+
+def get_bounding_polygon(filename: str) -> str:
+    """Get the bounding polygon (WKT) of a NISAR product using the shared `SESSION`."""
+    return SESSION.get_bounding_polygon(filename)
+
+
+def get_polarizations(filename: str, frequency: str = 'A') -> list[str]:
+    """Get the available polarizations of a NISAR product using the shared `SESSION`."""
+    return SESSION.get_polarizations(filename, frequency)
+
+
+def get_swath_metadata(filename: str):
+    """Get the swath metadata of a NISAR RSLC product using the shared `SESSION`."""
+    return SESSION.get_swath_metadata(filename)
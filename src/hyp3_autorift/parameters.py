@@ -0,0 +1,259 @@
+"""A spatially indexed, locally cached catalog of the autoRIFT parameter files, and prefetching of their rasters"""
+
+import copy
+import hashlib
+import logging
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from osgeo import gdal, ogr, osr
+
+from hyp3_autorift import cache
+
+
+log = logging.getLogger(__name__)
+
+gdal.UseExceptions()
+
+CATALOG_FILE = 'catalog.json'
+GEOTRANSFORMS_FILE = 'geotransforms.json'
+
+PREFETCH_MARGIN = 10_000.0  # meters
+PREFETCH_WORKERS = 8
+
+_CATALOGS: dict[str, 'ParameterCatalog'] = {}
+
+
+def get_catalog_key(parameter_file: str) -> str:
+    """Get the name of the cache for a parameter file; the full URL (which includes its version) is hashed."""
+    digest = hashlib.sha1(parameter_file.encode()).hexdigest()[:12]
+    return f'{Path(parameter_file).stem}_{digest}'
+
+
+def read_features(parameter_file: str) -> list[dict]:
+    """Read the attributes, geometry (WKT), and bounding box of each feature of a parameter shapefile, in layer order."""
+    shapes = ogr.GetDriverByName('ESRI Shapefile').Open(parameter_file, gdal.GA_ReadOnly)
+    layer = shapes.GetLayer(0)
+    field_names = [field.name for field in layer.schema]
+
+    features = []
+    for feature in layer:
+        geometry = feature.geometry()
+        minx, maxx, miny, maxy = geometry.GetEnvelope()
+        features.append(
+            {
+                'attributes': {name: feature[name] for name in field_names},
+                'wkt': geometry.ExportToWkt(),
+                'bbox': [minx, miny, maxx, maxy],
+            }
+        )
+    del shapes
+    return features
+
+
+def find_candidates(bboxes: np.ndarray, x: float, y: float) -> np.ndarray:
+    """Find the indexes of the bounding boxes that contain a point.
+
+    Args:
+        bboxes: An (N, 4) array of `[minx, miny, maxx, maxy]` bounding boxes
+        x: The x coordinate of the point
+        y: The y coordinate of the point
+
+    Returns:
+        The indexes of the bounding boxes containing the point, in order
+    """
+    if len(bboxes) == 0:
+        return np.array([], dtype=int)
+    inside = (bboxes[:, 0] <= x) & (x <= bboxes[:, 2]) & (bboxes[:, 1] <= y) & (y <= bboxes[:, 3])
+    return np.flatnonzero(inside)
+
+
+class ParameterCatalog:
+    """The features of an autoRIFT parameter shapefile with a bounding box index for fast point lookups.
+
+    The raster geotransforms needed by lookups (e.g., the DEM pixel size) are memoized, and persisted if the catalog is
+    cached on disk.
+    """
+
+    def __init__(self, features: list[dict], cache_dir: Path | None = None):
+        self.features = features
+        self.cache_dir = cache_dir
+        self._bboxes = np.array([feature['bbox'] for feature in features], dtype=float).reshape((-1, 4))
+        self._geometries: dict[int, ogr.Geometry] = {}
+        self._geotransforms: dict[str, list[float]] = {}
+        if cache_dir is not None:
+            self._geotransforms = cache.read_json(cache_dir / GEOTRANSFORMS_FILE, default={})
+
+    @classmethod
+    def from_parameter_file(cls, parameter_file: str) -> 'ParameterCatalog':
+        """Load the catalog of a parameter file, using the node-local `parameters` cache if it's enabled.
+
+        When caching is enabled, the parameter shapefile is downloaded and indexed once per node; otherwise, it's read
+        (once per process) from `parameter_file`.
+
+        Args:
+            parameter_file: The parameter shapefile, e.g. a `/vsicurl/` URL
+
+        Returns:
+            The parameter catalog
+        """
+        cache_dir = cache.get_cache_dir(f'parameters/{get_catalog_key(parameter_file)}')
+        if cache_dir is None:
+            return cls(read_features(parameter_file))
+
+        catalog_file = cache_dir / CATALOG_FILE
+        if (features := cache.read_json(catalog_file)) is None:
+            with cache.file_lock(cache_dir / '.lock'):
+                if (features := cache.read_json(catalog_file)) is None:
+                    log.info(f'Adding {parameter_file} to the parameter cache')
+                    download_dir = Path(tempfile.mkdtemp(dir=cache_dir, prefix='.shapefile.'))
+                    try:
+                        local_file = download_dir / Path(parameter_file).name
+                        gdal.VectorTranslate(str(local_file), parameter_file, format='ESRI Shapefile')
+                        features = read_features(str(local_file))
+                        shutil.rmtree(cache_dir / 'shapefile', ignore_errors=True)
+                        os.replace(download_dir, cache_dir / 'shapefile')
+                    finally:
+                        shutil.rmtree(download_dir, ignore_errors=True)
+                    cache.write_json(features, catalog_file)
+
+        return cls(features, cache_dir)
+
+    def _get_geometry(self, index: int) -> ogr.Geometry:
+        if index not in self._geometries:
+            self._geometries[index] = ogr.CreateGeometryFromWkt(self.features[index]['wkt'])
+        return self._geometries[index]
+
+    def find(self, point: ogr.Geometry) -> dict | None:
+        """Find the attributes of the first feature containing a point, like a scan of the shapefile's layer.
+
+        Args:
+            point: The point, in the coordinates of the parameter shapefile
+
+        Returns:
+            The feature's attributes, or None if no feature contains the point
+        """
+        for index in find_candidates(self._bboxes, point.GetX(), point.GetY()):
+            if self._get_geometry(index).Contains(point):
+                return self.features[index]['attributes']
+        return None
+
+    def get_geotransform(self, raster: str) -> list[float]:
+        """Get (and memoize) the geotransform of a raster, like the DEM of a feature."""
+        if raster not in self._geotransforms:
+            geotransform = gdal.Info(raster, format='json')['geoTransform']
+            self._geotransforms[raster] = geotransform
+            if self.cache_dir is not None:
+                with cache.file_lock(self.cache_dir / '.lock'):
+                    geotransforms = cache.read_json(self.cache_dir / GEOTRANSFORMS_FILE, default={})
+                    geotransforms[raster] = geotransform
+                    cache.write_json(geotransforms, self.cache_dir / GEOTRANSFORMS_FILE)
+        return self._geotransforms[raster]
+
+
+def get_parameter_catalog(parameter_file: str) -> ParameterCatalog:
+    """Get the (in-process memoized) catalog of a parameter file; see `ParameterCatalog.from_parameter_file`."""
+    if parameter_file not in _CATALOGS:
+        _CATALOGS[parameter_file] = ParameterCatalog.from_parameter_file(parameter_file)
+    return _CATALOGS[parameter_file]
+
+
+def get_aoi_window(
+    bounds: list[float], epsg: int, geotransform: list[float], size: list[int], margin: float = PREFETCH_MARGIN
+) -> list[float]:
+    """Get the window of a (north-up) raster grid covering a lon/lat area of interest.
+
+    Args:
+        bounds: The `[west, south, east, north]` bounds of the area of interest in degrees
+        epsg: The EPSG code of the raster
+        geotransform: The geotransform of the raster
+        size: The `[columns, rows]` size of the raster
+        margin: Margin to add around the area of interest in the units of the raster's projection
+
+    Returns:
+        The `[ulx, uly, lrx, lry]` window (a GDAL `projWin`), snapped outward to the raster grid and clipped to the
+        raster's extent
+    """
+    in_srs = osr.SpatialReference()
+    in_srs.ImportFromEPSG(4326)
+    in_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    out_srs = osr.SpatialReference()
+    out_srs.ImportFromEPSG(epsg)
+    out_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    transformation = osr.CoordinateTransformation(in_srs, out_srs)
+
+    # Densify the edges, since they're curved in most projections
+    west, south, east, north = bounds
+    steps = np.linspace(0, 1, 21)
+    lons = np.concatenate(
+        [west + (east - west) * steps, np.full(21, east), east - (east - west) * steps, np.full(21, west)]
+    )
+    lats = np.concatenate(
+        [np.full(21, south), south + (north - south) * steps, np.full(21, north), north - (north - south) * steps]
+    )
+    points = transformation.TransformPoints(np.column_stack([lons, lats]).tolist())
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+
+    x0, dx, _, y0, _, dy = geotransform
+    col_min = max(math.floor((min(xs) - margin - x0) / dx), 0)
+    col_max = min(math.ceil((max(xs) + margin - x0) / dx), size[0])
+    row_min = max(math.floor((max(ys) + margin - y0) / dy), 0)
+    row_max = min(math.ceil((min(ys) - margin - y0) / dy), size[1])
+    if col_min >= col_max or row_min >= row_max:
+        raise ValueError(f'Area of interest {bounds} does not intersect the raster grid')
+
+    return [x0 + col_min * dx, y0 + row_min * dy, x0 + col_max * dx, y0 + row_max * dy]
+
+
+def prefetch_parameter_rasters(
+    parameter_info: dict,
+    bounds: list[float],
+    directory: str | Path = 'parameters',
+    margin: float = PREFETCH_MARGIN,
+    max_workers: int = PREFETCH_WORKERS,
+) -> dict:
+    """Download the area of interest of all the Geogrid parameter rasters concurrently into local tiled GeoTIFFs.
+
+    All the rasters are cropped to the same window of the DEM grid (which the parameter rasters share), so the pixel
+    offsets Geogrid computes from the cropped DEM are valid for the other cropped rasters too.
+
+    Args:
+        parameter_info: The parameter info from `utils.find_jpl_parameter_info`
+        bounds: The `[west, south, east, north]` bounds of the scene in degrees
+        directory: The directory to download the rasters to
+        margin: Margin to add around the scene in the units of the rasters' projection
+        max_workers: Maximum number of rasters to download concurrently
+
+    Returns:
+        A copy of `parameter_info` with the Geogrid rasters replaced by the local GeoTIFFs
+    """
+    dem_info = gdal.Info(parameter_info['geogrid']['dem'], format='json')
+    proj_win = get_aoi_window(bounds, parameter_info['epsg'], dem_info['geoTransform'], dem_info['size'], margin)
+    log.info(f'Prefetching the parameter rasters for the window {proj_win}')
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rasters: dict[str, str] = {}
+    for name, raster in parameter_info['geogrid'].items():
+        if isinstance(raster, str) and raster.startswith('/vsicurl/'):
+            rasters.setdefault(raster, str(directory / f'{name}.tif'))
+
+    def prefetch(raster: str, local_file: str) -> None:
+        gdal.Translate(local_file, raster, projWin=proj_win, format='GTiff', creationOptions=['TILED=YES'])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(rasters)))) as executor:
+        futures = [executor.submit(prefetch, raster, local_file) for raster, local_file in rasters.items()]
+        for future in futures:
+            future.result()
+
+    parameter_info = copy.deepcopy(parameter_info)
+    for name, raster in parameter_info['geogrid'].items():
+        if raster in rasters:
+            parameter_info['geogrid'][name] = rasters[raster]
+    return parameter_info
@@ -9,6 +9,7 @@ import os
 import shutil
 import warnings
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Callable, Literal, Optional, Tuple
@@ -23,8 +24,9 @@ from hyp3lib.util import string_is_true
 from netCDF4 import Dataset
 from osgeo import gdal
 
-from hyp3_autorift import geometry, image, utils
+from hyp3_autorift import footprints, geometry, image, metadata_cache, utils
 from hyp3_autorift.crop import crop_netcdf_product
+from hyp3_autorift.parameters import prefetch_parameter_rasters
 from hyp3_autorift.utils import get_opendata_prefix, get_platform, save_publication_info
 
 
@@ -48,6 +50,20 @@ DEFAULT_PARAMETER_FILE = (
     '/vsicurl/https://its-live-data.s3.amazonaws.com/autorift_parameters/v001/autorift_landice_0120m.shp'
 )
 
+METADATA_WORKERS = 8
+S2_L2A_METADATA_TTL = 7 * 24 * 60 * 60  # seconds; Earth Search items may be updated
+S2_L1C_GCS_METADATA_TTL = 24 * 60 * 60  # seconds; the band may be added to the its-live-project S2 cache
+
+_METADATA_SESSION: requests.Session | None = None
+
+
+def get_metadata_session() -> requests.Session:
+    """Get the shared, pooled requests session (with retries) used to request scene metadata."""
+    global _METADATA_SESSION
+    if _METADATA_SESSION is None:
+        _METADATA_SESSION = utils.get_download_session(retries=3, backoff_factor=1, pool_size=METADATA_WORKERS)
+    return _METADATA_SESSION
+
 
 def get_lc2_stac_json_key(scene_name: str) -> str:
     platform = get_platform(scene_name)
@@ -61,7 +77,11 @@ def get_lc2_stac_json_key(scene_name: str) -> str:
 
 
 def get_lc2_metadata(scene_name: str) -> dict:
-    response = requests.get(f'{LC2_SEARCH_URL}/{scene_name}')
+    return metadata_cache.get_cached_metadata('landsat-c2l1', scene_name, lambda: _get_lc2_metadata(scene_name))
+
+
+def _get_lc2_metadata(scene_name: str) -> dict:
+    response = get_metadata_session().get(f'{LC2_SEARCH_URL}/{scene_name}')
     try:
         response.raise_for_status()
         return response.json()
@@ -96,9 +116,13 @@ def get_s2_safe_url(scene_name):
 
 
 def get_s2_manifest(scene_name):
+    return metadata_cache.get_cached_metadata('s2-l1c-manifest', scene_name, lambda: _get_s2_manifest(scene_name))
+
+
+def _get_s2_manifest(scene_name):
     safe_url = get_s2_safe_url(scene_name)
     manifest_url = f'{safe_url}/manifest.safe'
-    response = requests.get(manifest_url)
+    response = get_metadata_session().get(manifest_url)
     response.raise_for_status()
     return response.text
 
@@ -144,9 +168,15 @@ def get_raster_bbox(path: str):
 
 
 def get_s2_l2a_metadata(scene_name: str) -> dict:
+    return metadata_cache.get_cached_metadata(
+        'sentinel-2-c1-l2a', scene_name, lambda: _get_s2_l2a_metadata(scene_name), ttl=S2_L2A_METADATA_TTL
+    )
+
+
+def _get_s2_l2a_metadata(scene_name: str) -> dict:
     url = f'https://earth-search.aws.element84.com/v1/collections/sentinel-2-c1-l2a/items/{scene_name}'
 
-    response = requests.get(url)
+    response = get_metadata_session().get(url)
     response.raise_for_status()
     item = response.json()
 
@@ -159,7 +189,7 @@ def get_s2_l2a_metadata(scene_name: str) -> dict:
     else:
         vsi_path = band_url
 
-    bbox = item.get('bbox')
+    bbox = item.get('bbox') or footprints.get_s2_scene_bbox(scene_name)
     if not bbox:
         bbox = get_raster_bbox(vsi_path)
 
@@ -187,11 +217,17 @@ def get_s2_metadata(scene_name: str) -> dict:
         return get_s2_l2a_metadata(scene_name)
 
     # Google Cloud L1C .SAFE items
+    cache = metadata_cache.get_metadata_cache()
+    if cache is not None and (metadata := cache.get('s2-l1c', scene_name)) is not None:
+        return metadata
+
     path = get_s2_path(scene_name)
-    bbox = get_raster_bbox(path)
+    bbox = footprints.get_s2_scene_bbox(scene_name)
+    if bbox is None:
+        bbox = get_raster_bbox(path)
     acquisition_start = datetime.strptime(scene_name.split('_')[2], '%Y%m%dT%H%M%S')
 
-    return {
+    metadata = {
         'path': path,
         'bbox': bbox,
         'id': scene_name,
@@ -199,6 +235,27 @@ def get_s2_metadata(scene_name: str) -> dict:
             'datetime': acquisition_start.isoformat(timespec='seconds') + 'Z',
         },
     }
+    if cache is not None:
+        ttl = None if path.startswith('/vsis3/') else S2_L1C_GCS_METADATA_TTL
+        cache.put('s2-l1c', scene_name, metadata, ttl=ttl)
+    return metadata
+
+
+def resolve_metadata(
+    get_metadata: Callable[[str], dict], scene_names: list[str], max_workers: int = METADATA_WORKERS
+) -> list[dict]:
+    """Resolve the metadata of several scenes concurrently.
+
+    Args:
+        get_metadata: Function that gets the metadata of a scene, e.g. `get_s2_metadata`
+        scene_names: The scenes to get the metadata of
+        max_workers: Maximum number of scenes to resolve concurrently
+
+    Returns:
+        The metadata of each scene, in the order of `scene_names`
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(scene_names)))) as executor:
+        return list(executor.map(get_metadata, scene_names))
 
 
 def _create_mosaic_metadata(metas: list[dict]) -> dict:
@@ -349,6 +406,8 @@ def process(
     use_static_files: bool = True,
     regenerate_static_files: bool = False,
     frame_id: str | None = None,
+    workers: int | None = None,
+    tiles: int = 1,
 ) -> Tuple[Path, Path, Path]:
     """Process a Sentinel-1, Sentinel-2, or Landsat-8 image pair
 
@@ -363,6 +422,8 @@ def process(
         use_static_files: Use pre-generated static topographic correction files if available (Sentinel-1 only).
         regenerate_static_files: Force the creation of, and upload of, new static files (Sentinel-1 only).
         frame_id: OPERA frame ID to record in the img_pair_info variable in the autoRIFT product file
+        workers: Number of parallel workers (processes/threads) to use; defaults to all available CPUs
+        tiles: Number of grid strips autoRIFT correlates in separate processes; 1 (the default) disables tiling
 
     Returns:
         the autoRIFT product file, browse image, thumbnail image
@@ -375,6 +436,7 @@ def process(
     secondary_zero_path = None
 
     platform = get_platform(reference[0])
+    workers = utils.configure_workers(workers)
 
     if platform == 'S1-BURST':
         from hyp3_autorift.s1_isce3 import process_sentinel1_burst_isce3
@@ -388,6 +450,8 @@ def process(
             regenerate_static_files=regenerate_static_files,
             chip_size=chip_size,
             search_range=search_range,
+            workers=workers,
+            tiles=tiles,
         )
 
     elif platform == 'S1-SLC':
@@ -401,12 +465,14 @@ def process(
             regenerate_static_files=regenerate_static_files,
             chip_size=chip_size,
             search_range=search_range,
+            workers=workers,
+            tiles=tiles,
         )
 
     elif platform == 'NISAR':
         from hyp3_autorift.nisar_isce3 import process_nisar_pair
 
-        netcdf_file = process_nisar_pair(reference[0], secondary[0])
+        netcdf_file = process_nisar_pair(reference[0], secondary[0], workers=workers, tiles=tiles)
     else:
         # Set config and env for new CXX threads in Geogrid/autoRIFT
         gdal.SetConfigOption('GDAL_DISABLE_READDIR_ON_OPEN', 'EMPTY_DIR')
@@ -422,32 +488,24 @@ def process(
         sec_paths = []
 
         if platform == 'S2':
-            log.info(f'Processing {len(reference)} reference S2 granules.')
-            for granule in reference:
-                meta = get_s2_metadata(granule)
-                ref_metas.append(meta)
-                ref_paths.append(meta['path'])
-            log.info(f'Processing {len(secondary)} secondary S2 granules.')
-            for granule in secondary:
-                meta = get_s2_metadata(granule)
-                sec_metas.append(meta)
-                sec_paths.append(meta['path'])
+            log.info(f'Processing {len(reference)} reference and {len(secondary)} secondary S2 granules.')
+            metas = resolve_metadata(get_s2_metadata, reference + secondary)
+            ref_metas, sec_metas = metas[: len(reference)], metas[len(reference) :]
+            ref_paths = [meta['path'] for meta in ref_metas]
+            sec_paths = [meta['path'] for meta in sec_metas]
 
         elif 'L' in platform:
             # Set config and env for new CXX threads in Geogrid/autoRIFT
             gdal.SetConfigOption('AWS_REQUEST_PAYER', 'requester')
             os.environ['AWS_REQUEST_PAYER'] = 'requester'
 
-            log.info(f'Processing {len(reference)} reference Landsat Collection 2 granules.')
-            for granule in reference:
-                meta = get_lc2_metadata(granule)
-                ref_metas.append(meta)
-                ref_paths.append(get_lc2_path(meta))
-            log.info(f'Processing {len(secondary)} secondary Landsat Collection 2 granules.')
-            for granule in secondary:
-                meta = get_lc2_metadata(granule)
-                sec_metas.append(meta)
-                sec_paths.append(get_lc2_path(meta))
+            log.info(
+                f'Processing {len(reference)} reference and {len(secondary)} secondary Landsat Collection 2 granules.'
+            )
+            metas = resolve_metadata(get_lc2_metadata, reference + secondary)
+            ref_metas, sec_metas = metas[: len(reference)], metas[len(reference) :]
+            ref_paths = [get_lc2_path(meta) for meta in ref_metas]
+            sec_paths = [get_lc2_path(meta) for meta in sec_metas]
 
         # Handle mosaicking/metadata if multiple scenes were provided, otherwise just get metadata from the single scene
         if len(ref_paths) > 1:
@@ -497,6 +555,9 @@ def process(
 
         scene_poly = geometry.polygon_from_bbox(x_limits=lat_limits, y_limits=lon_limits)
         parameter_info = utils.find_jpl_parameter_info(scene_poly, parameter_file)
+        parameter_info['autorift']['mpflag'] = utils.get_autorift_mpflag(workers)
+        parameter_info['autorift']['tiles'] = tiles
+        parameter_info = prefetch_parameter_rasters(parameter_info, bbox)
 
         if chip_size is not None:
             # Add static chipSize to parameter_info geogrid params
@@ -652,6 +713,20 @@ def main():
         help='Optional OPERA frame ID to include in metadata for Sentinel-1 multi-burst processing, '
         'and will be ignored otherwise.',
     )
+    parser.add_argument(
+        '--workers',
+        type=utils.nullable_int,
+        default=None,
+        help='Number of parallel workers (processes/threads) to use. Defaults to the number of CPUs available to this '
+        'process, respecting CPU affinity and container (cgroup) CPU limits.',
+    )
+    parser.add_argument(
+        '--tiles',
+        type=int,
+        default=1,
+        help='Number of horizontal strips of the autoRIFT grid to correlate in separate processes. Tiled results can '
+        'differ slightly from a full-grid run near strip boundaries, so tiling is disabled (1) by default.',
+    )
 
     args = parser.parse_args()
 
@@ -719,6 +794,8 @@ def main():
         use_static_files=args.use_static_files,
         regenerate_static_files=args.regenerate_static_files,
         frame_id=args.frame_id,
+        workers=args.workers,
+        tiles=args.tiles,
     )
 
     if args.bucket:
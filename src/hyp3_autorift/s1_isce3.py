@@ -2,24 +2,32 @@ import copy
 import glob
 import logging
 import math
+import multiprocessing
 import os
 import shutil
-import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Iterator
 
+import asf_search as asf
 import netCDF4
 import numpy as np
-import s1reader
 from burst2safe.burst2safe import burst2safe
 from compass import s1_cslc
-from hyp3lib.fetch import download_file
+from dateutil.parser import parse as parse_dt
 from hyp3lib.scene import get_download_url
 from osgeo import gdal
 from s1reader import s1_info
-from s1reader.s1_orbit import retrieve_orbit_file
 
 import hyp3_autorift
-from hyp3_autorift import geometry, utils
+from hyp3_autorift import geometry, s1_metadata, s1_orbits, utils
+from hyp3_autorift.dem import get_warped_dem
+from hyp3_autorift.parameters import prefetch_parameter_rasters
 from hyp3_autorift.process import DEFAULT_PARAMETER_FILE
 from hyp3_autorift.s1_rdr_static_files import (
     S3_BUCKET,
@@ -28,12 +36,23 @@ from hyp3_autorift.s1_rdr_static_files import (
     get_static_layer,
     upload_static_nc_to_s3,
 )
-from hyp3_autorift.vend.testGeogrid import getPol, loadMetadata, loadMetadataSlc, runGeogrid
+from hyp3_autorift.vend.testGeogrid import loadMetadata, loadMetadataSlc, runGeogrid
 from hyp3_autorift.vend.testautoRIFT import generateAutoriftProduct
 
 
 log = logging.getLogger(__name__)
 
+RUNCONFIG_DIR = Path('./runconfigs/')
+STATIC_PREFETCH_WORKERS = 8
+
+# Used to pad the burst footprints for the DEM: the footprints are on the ellipsoid, but terrain up to
+# DEM_MAX_HEIGHT meters displaces a pixel by up to height / tan(incidence angle) in ground range
+DEM_MAX_HEIGHT = 9000.0
+SWATH_MIN_INCIDENCE = {1: 29.0, 2: 34.0, 3: 39.0}  # degrees
+DEM_PADDING = 0.01  # degrees
+
+AMPLITUDE_STRIP_ROWS = 512
+
 
 def process_sentinel1_burst_isce3(
     reference,
@@ -44,12 +63,10 @@ def process_sentinel1_burst_isce3(
     regenerate_static_files: bool = False,
     chip_size: int | None = None,
     search_range: int | None = None,
+    workers: int = 1,
+    tiles: int = 1,
 ):
-    safe_ref = download_burst(reference)
-    safe_sec = download_burst(secondary)
-
-    orbit_ref = retrieve_orbit_file(str(safe_ref), orbit_dir='.', concatenate=True)
-    orbit_sec = retrieve_orbit_file(str(safe_sec), orbit_dir='.', concatenate=True)
+    (safe_ref, orbit_ref), (safe_sec, orbit_sec) = stage_scenes(download_burst, reference, secondary)
 
     if isinstance(reference, list) and len(reference) > 1:
         burst_ids_ref = [get_burst_id(safe_ref, g, orbit_ref) for g in reference]
@@ -71,6 +88,8 @@ def process_sentinel1_burst_isce3(
             regenerate_static_files,
             chip_size,
             search_range,
+            workers,
+            tiles,
         )
 
     reference = reference[0]
@@ -92,6 +111,8 @@ def process_sentinel1_burst_isce3(
         regenerate_static_files,
         chip_size,
         search_range,
+        workers,
+        tiles,
     )
 
 
@@ -108,53 +129,72 @@ def process_burst(
     regenerate_static_files: bool = False,
     chip_size: int | None = None,
     search_range: int | None = None,
+    workers: int = 1,
+    tiles: int = 1,
 ):
     swath = int(granule_ref.split('_')[2][2])
     lat_limits, lon_limits = bounding_box(safe_ref, orbit_ref, False, swaths=[swath])
     scene_poly = geometry.polygon_from_bbox(x_limits=lat_limits, y_limits=lon_limits)
     parameter_info = utils.find_jpl_parameter_info(scene_poly, parameter_file=DEFAULT_PARAMETER_FILE)
+    parameter_info['autorift']['mpflag'] = utils.get_autorift_mpflag(workers)
+    parameter_info['autorift']['tiles'] = tiles
 
+    dem_bounds = get_bursts_dem_bounds([(safe_ref, orbit_ref, [burst_id_ref]), (safe_sec, orbit_sec, [burst_id_sec])])
     download_dem(
         dem=parameter_info['geogrid']['dem'],
-        bounds=[lon_limits[0], lat_limits[0], lon_limits[1], lat_limits[1]],
+        bounds=dem_bounds or [lon_limits[0], lat_limits[0], lon_limits[1], lat_limits[1]],
     )
-
-    if regenerate_static_files:
-        has_static_layer = False
-        do_static_upload = True
-    elif use_static_files:
-        retrieval_bucket = static_files_bucket if static_files_bucket else S3_BUCKET
-        has_static_layer = get_static_layer(burst_id_ref, retrieval_bucket)
-        do_static_upload = not has_static_layer and static_files_bucket
-    else:
-        has_static_layer = False
-        do_static_upload = False
-
-    pol = getPol(safe_ref, orbit_ref)
-    burst = s1reader.load_bursts(safe_ref, orbit_ref, swath, pol, burst_ids=[burst_id_ref])[0]
-
-    write_yaml(
-        safe=safe_ref,
-        orbit_file=orbit_ref,
-        burst_id=burst_id_ref,
-        is_ref=True,
-        use_static_layer=use_static_files and has_static_layer,
+    parameter_info = prefetch_parameter_rasters(
+        parameter_info, [lon_limits[0], lat_limits[0], lon_limits[1], lat_limits[1]]
     )
-    s1_cslc.run('s1_cslc.yaml', 'radar')
-    convert2isce(burst_id_ref)
-
-    if do_static_upload and (topo_correction_file := create_static_layer(burst_id_ref, burst=burst)):
-        upload_static_nc_to_s3(topo_correction_file, burst_id_ref, bucket=static_files_bucket)
-        topo_correction_file.unlink()
-
-    write_yaml(
-        safe=safe_sec,
-        orbit_file=orbit_sec,
-        burst_id=burst_id_sec,
-        use_static_layer=use_static_files and has_static_layer,
+
+    has_static_layer, do_static_upload = stage_static_layer(
+        burst_id_ref, static_files_bucket, use_static_files, regenerate_static_files
     )
-    s1_cslc.run('s1_cslc.yaml', 'radar')
-    convert2isce(burst_id_sec, ref=False)
+
+    if use_static_files and has_static_layer and workers > 1:
+        # With a static layer, the secondary CSLC doesn't depend on the reference CSLC
+        with cslc_process_pool(max_workers=2, threads_per_worker=workers // 2) as executor:
+            futures = [
+                executor.submit(
+                    create_cslc,
+                    safe_ref,
+                    orbit_ref,
+                    burst_id_ref,
+                    is_ref=True,
+                    use_static_layer=True,
+                    runconfig_path=RUNCONFIG_DIR / f'{burst_id_ref}_ref.yaml',
+                    scratch_folder=f'./scratch/{burst_id_ref}_ref',
+                ),
+                executor.submit(
+                    create_cslc,
+                    safe_sec,
+                    orbit_sec,
+                    burst_id_sec,
+                    use_static_layer=True,
+                    runconfig_path=RUNCONFIG_DIR / f'{burst_id_sec}_sec.yaml',
+                    scratch_folder=f'./scratch/{burst_id_sec}_sec',
+                ),
+            ]
+            for future in futures:
+                future.result()
+        convert2isce(burst_id_ref, workers=workers)
+        convert2isce(burst_id_sec, ref=False, workers=workers)
+    else:
+        pol = s1_metadata.get_pol(safe_ref, orbit_ref)
+        burst = s1_metadata.load_bursts(safe_ref, orbit_ref, swath, pol, burst_ids=[burst_id_ref])[0]
+
+        create_cslc(
+            safe_ref, orbit_ref, burst_id_ref, is_ref=True, use_static_layer=use_static_files and has_static_layer
+        )
+        convert2isce(burst_id_ref, workers=workers)
+
+        if do_static_upload and (topo_correction_file := create_static_layer(burst_id_ref, burst=burst)):
+            upload_static_nc_to_s3(topo_correction_file, burst_id_ref, bucket=static_files_bucket)
+            topo_correction_file.unlink()
+
+        create_cslc(safe_sec, orbit_sec, burst_id_sec, use_static_layer=use_static_files and has_static_layer)
+        convert2isce(burst_id_sec, ref=False, workers=workers)
 
     meta_r = loadMetadata(safe_ref, orbit_ref, swath=swath)
     meta_temp = loadMetadata(safe_sec, orbit_sec, swath=swath)
@@ -221,12 +261,10 @@ def process_sentinel1_slc_isce3(
     regenerate_static_files: bool = False,
     chip_size: int | None = None,
     search_range: int | None = None,
+    workers: int = 1,
+    tiles: int = 1,
 ):
-    safe_ref = download_file(get_download_url(slc_ref), chunk_size=5242880)
-    safe_sec = download_file(get_download_url(slc_sec), chunk_size=5242880)
-
-    orbit_ref = retrieve_orbit_file(safe_ref, orbit_dir='.', concatenate=True)
-    orbit_sec = retrieve_orbit_file(safe_sec, orbit_dir='.', concatenate=True)
+    (safe_ref, orbit_ref), (safe_sec, orbit_sec) = stage_scenes(download_slc, slc_ref, slc_sec)
 
     burst_ids_ref = get_burst_ids(safe_ref, orbit_ref)
     burst_ids_sec = get_burst_ids(safe_sec, orbit_sec)
@@ -244,6 +282,8 @@ def process_sentinel1_slc_isce3(
         chip_size=chip_size,
         search_range=search_range,
         regenerate_static_files=regenerate_static_files,
+        workers=workers,
+        tiles=tiles,
     )
 
 
@@ -261,58 +301,39 @@ def process_slc(
     regenerate_static_files: bool = False,
     chip_size: int | None = None,
     search_range: int | None = None,
+    workers: int = 1,
+    tiles: int = 1,
 ):
     lat_limits, lon_limits = bounding_box(safe_ref, orbit_ref, True, swaths=swaths)
     scene_poly = geometry.polygon_from_bbox(x_limits=lat_limits, y_limits=lon_limits)
     parameter_info = utils.find_jpl_parameter_info(scene_poly, parameter_file=DEFAULT_PARAMETER_FILE)
-    burst_ids = list(set(burst_ids_sec) & set(burst_ids_ref))
-    pol = getPol(safe_ref, orbit_ref)
+    parameter_info['autorift']['mpflag'] = utils.get_autorift_mpflag(workers)
+    parameter_info['autorift']['tiles'] = tiles
+    burst_ids = sorted(set(burst_ids_sec) & set(burst_ids_ref))
 
+    dem_bounds = get_bursts_dem_bounds([(safe_ref, orbit_ref, burst_ids), (safe_sec, orbit_sec, burst_ids)])
     download_dem(
         dem=parameter_info['geogrid']['dem'],
-        bounds=[lon_limits[0], lat_limits[0], lon_limits[1], lat_limits[1]],
+        bounds=dem_bounds or [lon_limits[0], lat_limits[0], lon_limits[1], lat_limits[1]],
+    )
+    parameter_info = prefetch_parameter_rasters(
+        parameter_info, [lon_limits[0], lat_limits[0], lon_limits[1], lat_limits[1]]
     )
 
-    for burst_id in burst_ids:
-        swath = int(burst_id.split('_')[-1][-1])
-        burst = s1reader.load_bursts(safe_ref, orbit_ref, swath, pol, burst_ids=[burst_id])[0]
-
-        if regenerate_static_files:
-            has_static_layer = False
-            do_static_upload = True
-        elif use_static_files:
-            retrieval_bucket = static_files_bucket if static_files_bucket else S3_BUCKET
-            has_static_layer = get_static_layer(burst_id, retrieval_bucket)
-            do_static_upload = not has_static_layer and static_files_bucket
-        else:
-            has_static_layer = False
-            do_static_upload = False
-
-        write_yaml(
-            safe=safe_ref,
-            orbit_file=orbit_ref,
-            burst_id=burst_id,
-            is_ref=True,
-            use_static_layer=use_static_files and has_static_layer,
-        )
-        s1_cslc.run('s1_cslc.yaml', 'radar')
-
-        write_yaml(
-            safe=safe_sec,
-            orbit_file=orbit_sec,
-            burst_id=burst_id,
-            use_static_layer=use_static_files and has_static_layer,
-        )
-        s1_cslc.run('s1_cslc.yaml', 'radar')
-
-        if do_static_upload and (topo_correction_file := create_static_layer(burst_id, burst=burst)):
-            upload_static_nc_to_s3(topo_correction_file, burst_id, static_files_bucket)
-            topo_correction_file.unlink()
-
-        if has_static_layer:
-            shutil.rmtree(STATIC_DIR / burst_id)
+    run_burst_cslc_jobs(
+        burst_ids,
+        workers,
+        safe_ref=safe_ref,
+        safe_sec=safe_sec,
+        orbit_ref=orbit_ref,
+        orbit_sec=orbit_sec,
+        static_files_bucket=static_files_bucket,
+        use_static_files=use_static_files,
+        regenerate_static_files=regenerate_static_files,
+    )
 
-    slc_shape = merge_swaths(safe_ref, orbit_ref, swaths=swaths)
+    # Full-frame mosaics are several GB each, so page them through a file rather than holding them in memory
+    slc_shape = merge_swaths(safe_ref, orbit_ref, swaths=swaths, memmap_dir='.')
     meta_r = loadMetadataSlc(safe_ref, orbit_ref, swaths=swaths, slc_shape=slc_shape)
     meta_temp = loadMetadataSlc(safe_sec, orbit_sec, swaths=swaths)
     meta_s = copy.copy(meta_r)
@@ -370,10 +391,252 @@ def process_slc(
     return netcdf_file
 
 
-def read_slc_gdal(slc_path: str):
+def stage_static_layer(
+    burst_id: str,
+    static_files_bucket: str,
+    use_static_files: bool,
+    regenerate_static_files: bool = False,
+) -> tuple[bool, bool]:
+    """Stage the static topographic correction layer for a burst, if one should be used.
+
+    Args:
+        burst_id: ISCE format burst ID
+        static_files_bucket: Bucket to retrieve static layers from and upload new static layers to
+        use_static_files: Use a pre-generated static layer if one is available
+        regenerate_static_files: Force the creation (and upload) of a new static layer
+
+    Returns:
+        Whether a static layer was staged, and whether a new static layer should be created and uploaded
+    """
+    if regenerate_static_files:
+        return False, True
+
+    if use_static_files:
+        retrieval_bucket = static_files_bucket if static_files_bucket else S3_BUCKET
+        has_static_layer = get_static_layer(burst_id, retrieval_bucket)
+        return has_static_layer, not has_static_layer and bool(static_files_bucket)
+
+    return False, False
+
+
+def prefetch_static_layers(
+    executor: ThreadPoolExecutor,
+    burst_ids: list[str],
+    static_files_bucket: str,
+    use_static_files: bool,
+    regenerate_static_files: bool = False,
+) -> dict[str, Future]:
+    """Stage the static topographic correction layers for many bursts in the background.
+
+    Args:
+        executor: Thread pool to stage the static layers in; bursts are staged in the order given
+        burst_ids: ISCE format burst IDs
+        static_files_bucket: Bucket to retrieve static layers from and upload new static layers to
+        use_static_files: Use a pre-generated static layer if one is available
+        regenerate_static_files: Force the creation (and upload) of a new static layer
+
+    Returns:
+        Futures for the result of `stage_static_layer` for each burst
+    """
+
+    def prefetch(burst_id: str) -> tuple[bool, bool]:
+        has_static_layer, do_static_upload = stage_static_layer(
+            burst_id, static_files_bucket, use_static_files, regenerate_static_files
+        )
+        if use_static_files and not regenerate_static_files:
+            log.info(f'Static layer for burst {burst_id}: {"hit" if has_static_layer else "miss"}')
+        return has_static_layer, do_static_upload
+
+    return {burst_id: executor.submit(prefetch, burst_id) for burst_id in burst_ids}
+
+
+def log_static_layer_report(static_layers: dict[str, tuple[bool, bool]]) -> None:
+    hits = sorted(burst_id for burst_id, (has_static_layer, _) in static_layers.items() if has_static_layer)
+    misses = sorted(set(static_layers) - set(hits))
+    log.info(f'Static layers: {len(hits)} hits, {len(misses)} misses')
+    if misses:
+        log.info(f'Static layers missing for bursts: {", ".join(misses)}')
+
+
+def create_cslc(
+    safe: str,
+    orbit_file: str,
+    burst_id: str,
+    is_ref: bool = False,
+    use_static_layer: bool = False,
+    runconfig_path: str | Path = 's1_cslc.yaml',
+    scratch_folder: str | None = None,
+) -> str:
+    """Create the CSLC for a single burst of a SAFE.
+
+    Args:
+        safe: The SAFE containing the burst
+        orbit_file: The orbit file for the SAFE
+        burst_id: ISCE format burst ID
+        is_ref: Whether this is the reference burst
+        use_static_layer: Use the staged static topographic correction layer for the burst
+        runconfig_path: Where to write the run config
+        scratch_folder: Scratch directory for ISCE3; defaults to the product directory
+
+    Returns:
+        The burst ID
+    """
+    runconfig = write_yaml(
+        safe=safe,
+        orbit_file=orbit_file,
+        burst_id=burst_id,
+        is_ref=is_ref,
+        use_static_layer=use_static_layer,
+        runconfig_path=runconfig_path,
+        scratch_folder=scratch_folder,
+    )
+    s1_cslc.run(runconfig, 'radar')
+    return burst_id
+
+
+@contextmanager
+def cslc_process_pool(max_workers: int, threads_per_worker: int = 1) -> Iterator[ProcessPoolExecutor]:
+    """Create a process pool for running concurrent CSLC jobs.
+
+    Workers are spawned (not forked) and the available threads are split between them instead of each ISCE3 run
+    using every CPU.
+
+    Args:
+        max_workers: Maximum number of concurrent CSLC jobs
+        threads_per_worker: Number of OpenMP threads each job may use
+    """
+    omp_num_threads = os.environ.get('OMP_NUM_THREADS')
+    os.environ['OMP_NUM_THREADS'] = str(max(1, threads_per_worker))
+    try:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            yield executor
+    finally:
+        if omp_num_threads is None:
+            del os.environ['OMP_NUM_THREADS']
+        else:
+            os.environ['OMP_NUM_THREADS'] = omp_num_threads
+
+
+def run_burst_cslc_jobs(
+    burst_ids: list[str],
+    workers: int,
+    safe_ref: str,
+    safe_sec: str,
+    orbit_ref: str,
+    orbit_sec: str,
+    static_files_bucket: str,
+    use_static_files: bool,
+    regenerate_static_files: bool = False,
+) -> None:
+    """Create the reference and secondary CSLCs for many bursts, running up to `workers` CSLC jobs concurrently.
+
+    The static layers of all the bursts are prefetched concurrently in the background, and a burst's reference CSLC
+    job is scheduled as soon as its static layer has been staged. Each job gets its own run config and scratch
+    directory. A secondary CSLC job is scheduled as soon as its reference CSLC is done, or immediately if a static
+    layer is available for the burst, since it then doesn't depend on the reference CSLC.
+
+    Args:
+        burst_ids: ISCE format burst IDs to process
+        workers: Maximum number of concurrent CSLC jobs
+        safe_ref: The reference SAFE
+        safe_sec: The secondary SAFE
+        orbit_ref: The reference orbit file
+        orbit_sec: The secondary orbit file
+        static_files_bucket: Bucket to retrieve static layers from and upload new static layers to
+        use_static_files: Use a pre-generated static layer if one is available
+        regenerate_static_files: Force the creation (and upload) of a new static layer
+    """
+    static_layers: dict[str, tuple[bool, bool]] = {}
+
+    def cslc_args(burst_id: str, is_ref: bool) -> dict:
+        name = 'ref' if is_ref else 'sec'
+        return {
+            'safe': safe_ref if is_ref else safe_sec,
+            'orbit_file': orbit_ref if is_ref else orbit_sec,
+            'burst_id': burst_id,
+            'is_ref': is_ref,
+            'use_static_layer': use_static_files and static_layers[burst_id][0],
+            'runconfig_path': RUNCONFIG_DIR / f'{burst_id}_{name}.yaml',
+            'scratch_folder': f'./scratch/{burst_id}_{name}',
+        }
+
+    def finish_burst(burst_id: str) -> None:
+        has_static_layer, do_static_upload = static_layers[burst_id]
+        if do_static_upload:
+            swath = int(burst_id.split('_')[-1][-1])
+            pol = s1_metadata.get_pol(safe_ref, orbit_ref)
+            burst = s1_metadata.load_bursts(safe_ref, orbit_ref, swath, pol, burst_ids=[burst_id])[0]
+            if topo_correction_file := create_static_layer(burst_id, burst=burst):
+                upload_static_nc_to_s3(topo_correction_file, burst_id, static_files_bucket)
+                topo_correction_file.unlink()
+
+        if has_static_layer:
+            shutil.rmtree(STATIC_DIR / burst_id)
+
+    max_workers = max(1, min(workers, 2 * len(burst_ids)))
+    prefetch_workers = max(1, min(STATIC_PREFETCH_WORKERS, len(burst_ids)))
+    with ThreadPoolExecutor(max_workers=prefetch_workers) as prefetch_executor:
+        static_futures = prefetch_static_layers(
+            prefetch_executor, burst_ids, static_files_bucket, use_static_files, regenerate_static_files
+        )
+
+        if max_workers == 1:
+            for burst_id in burst_ids:
+                static_layers[burst_id] = static_futures[burst_id].result()
+                create_cslc(**cslc_args(burst_id, is_ref=True))
+                create_cslc(**cslc_args(burst_id, is_ref=False))
+                finish_burst(burst_id)
+            log_static_layer_report(static_layers)
+            return
+
+        log.info(f'Creating CSLCs for {len(burst_ids)} bursts with {max_workers} workers')
+        with cslc_process_pool(max_workers, threads_per_worker=workers // max_workers) as executor:
+            # Each burst's CSLC jobs are scheduled once its static layer has been staged
+            pending: dict[Future, tuple[str, str]] = {
+                future: (burst_id, 'static') for burst_id, future in static_futures.items()
+            }
+            remaining_jobs = {burst_id: 2 for burst_id in burst_ids}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    burst_id, job = pending.pop(future)
+                    result = future.result()
+
+                    if job == 'static':
+                        static_layers[burst_id] = result
+                        pending[executor.submit(create_cslc, **cslc_args(burst_id, is_ref=True))] = (burst_id, 'ref')
+                        if static_layers[burst_id][0]:
+                            pending[executor.submit(create_cslc, **cslc_args(burst_id, is_ref=False))] = (
+                                burst_id,
+                                'sec',
+                            )
+                        continue
+
+                    if job == 'ref' and not static_layers[burst_id][0]:
+                        pending[executor.submit(create_cslc, **cslc_args(burst_id, is_ref=False))] = (burst_id, 'sec')
+
+                    remaining_jobs[burst_id] -= 1
+                    if remaining_jobs[burst_id] == 0:
+                        finish_burst(burst_id)
+                        log.info(f'Finished creating CSLCs for burst {burst_id}')
+
+    log_static_layer_report(static_layers)
+
+
+def read_slc_gdal(slc_path: str, window: tuple[int, int, int, int] | None = None) -> np.ndarray:
+    """Read the amplitude of an SLC.
+
+    Args:
+        slc_path: The SLC file to read
+        window: (Optional) The `(xoff, yoff, xsize, ysize)` window of the SLC to read
+
+    Returns:
+        The amplitude of the SLC (window)
+    """
     ds = gdal.Open(slc_path)
     band = ds.GetRasterBand(1)
-    slc_arr = np.abs(band.ReadAsArray()).astype(np.float32)
+    slc_arr = np.abs(band.ReadAsArray(*window) if window else band.ReadAsArray()).astype(np.float32, copy=False)
     del band, ds
     return slc_arr
 
@@ -390,14 +653,26 @@ def write_slc_gdal(data: np.ndarray, out_path: str):
     del out_raster
 
 
-def merge_swaths(safe_ref: str, orbit_ref: str, swaths=(1, 2, 3)) -> tuple[int, ...]:
+def get_raster_shape(path: str) -> tuple[int, int]:
+    ds = gdal.Open(path)
+    shape = ds.RasterYSize, ds.RasterXSize
+    del ds
+    return shape
+
+
+def merge_swaths(
+    safe_ref: str, orbit_ref: str, swaths=(1, 2, 3), memmap_dir: str | Path | None = None
+) -> tuple[int, ...]:
     """Merges the bursts within the provided swath(s) and then merges the swaths.
        The secondary image is merged according to the reference image's metadata.
 
+    Each burst's valid window is written directly into the final mosaic, so no intermediate swath images are created.
+
     Args:
         safe_ref: The filename of the reference safe. The secondary must be coregistered to this.
         orbit_ref: The filename of the orbit file for the reference image.
         swaths: Ascending sorted list containing the desired swath(s) to merge. Swaths must be adjacent.
+        memmap_dir: (Optional) Directory in which to memory-map the mosaic instead of holding it in memory.
     """
     safe_path_ref = os.path.abspath(safe_ref)
     orbit_path_ref = os.path.abspath(orbit_ref)
@@ -420,14 +695,17 @@ def merge_swaths(safe_ref: str, orbit_ref: str, swaths=(1, 2, 3)) -> tuple[int,
     sensing_start = None
     sensing_stop = None
     az_time_interval = None
-    pol = getPol(safe_ref, orbit_ref)
+    pol = s1_metadata.get_pol(safe_ref, orbit_ref)
+    swath_layouts = []
 
     for swath in swaths:
-        ref_bursts = s1reader.load_bursts(safe_ref, orbit_ref, swath, pol)
+        ref_bursts = s1_metadata.load_bursts(safe_ref, orbit_ref, swath, pol)
         ref_burst_files = [b for b in burst_files_ref if f'iw{swath}' in b]
         sec_burst_files = [b for b in burst_files_sec if f'iw{swath}' in b]
 
-        burst_az_samples, num_rng_samples = merge_bursts_in_swath(ref_bursts, ref_burst_files, sec_burst_files, swath)
+        burst_shape = get_raster_shape(get_burst_path(ref_burst_files[0]))
+        burst_windows, (burst_az_samples, num_rng_samples) = get_burst_merge_windows(ref_bursts, burst_shape)
+        swath_layouts.append((ref_bursts, burst_windows, burst_az_samples, ref_burst_files, sec_burst_files))
 
         az_time_interval = ref_bursts[0].azimuth_time_interval
         burst_length = timedelta(seconds=az_time_interval * (burst_az_samples - 1))
@@ -465,53 +743,105 @@ def merge_swaths(safe_ref: str, orbit_ref: str, swaths=(1, 2, 3)) -> tuple[int,
     sensing_time = (sensing_stop - sensing_start).total_seconds()
     total_rng_samples = last_rng_samples + num_rng_pixels
     total_az_samples = 1 + int(np.round(sensing_time / az_time_interval))
+    merged_shape = (total_az_samples, total_rng_samples)
 
     for slc in ['ref', 'sec']:
-        swath_index = 0
-        merged_arr = np.zeros((total_az_samples, total_rng_samples), dtype=np.float32)
+        memmap_file = None if memmap_dir is None else Path(memmap_dir) / f'{slc}_merged.dat'
+        if memmap_file is None:
+            merged_arr = np.zeros(merged_shape, dtype=np.float32)
+        else:
+            merged_arr = np.memmap(memmap_file, np.float32, mode='w+', shape=merged_shape)
 
-        for swath in swaths:
+        for swath_index, swath in enumerate(swaths):
             print(f'Merging Swath {swath}')
+            swath_bursts, burst_windows, slc_rows, ref_burst_files, sec_burst_files = swath_layouts[swath_index]
+            burst_files = ref_burst_files if slc == 'ref' else sec_burst_files
 
-            slc_path = slc + '_swath_iw' + str(swath) + '.tif'
-            slc_array = read_slc_gdal(slc_path)
-            slc_rows = slc_array.shape[0]
-
-            bursts = s1reader.load_bursts(safe_ref, orbit_ref, swath, pol)
-
-            first_rng_sample = bursts[0].first_valid_sample
-            last_rng_sample = bursts[0].last_valid_sample
+            first_rng_sample = swath_bursts[0].first_valid_sample
+            last_rng_sample = swath_bursts[0].last_valid_sample
             az_offset = int(np.floor((sensing_starts[swath_index] - sensing_start).total_seconds() / az_time_interval))
             rng_offset = rng_offsets[swath_index] + first_rng_sample
-            rng_end_index = rng_offset + (last_rng_sample - first_rng_sample)
             invalid_pixel_buffer = 64 if swath != max(swaths) else 0
-            slc_az_start_index = bursts[0].first_valid_line
+            slc_az_start_index = swath_bursts[0].first_valid_line
 
-            if len(bursts) > 1:
-                slc_az_end_index = -bursts[-1].last_valid_line
-                merged_az_end_index = az_offset + slc_rows + (slc_az_end_index - slc_az_start_index)
+            if len(swath_bursts) > 1:
+                slc_az_end_index = slc_rows - swath_bursts[-1].last_valid_line
             else:
-                slc_az_end_index = bursts[0].last_valid_line
-                merged_az_end_index = az_offset + (slc_az_end_index - slc_az_start_index)
+                slc_az_end_index = swath_bursts[0].last_valid_line
+
+            mosaic_swath_bursts(
+                merged_arr,
+                [get_burst_path(burst_file) for burst_file in burst_files[: len(burst_windows)]],
+                burst_windows,
+                swath_window=(
+                    slice(slc_az_start_index, slc_az_end_index),
+                    slice(first_rng_sample, last_rng_sample - invalid_pixel_buffer),
+                ),
+                merged_offset=(az_offset, rng_offset),
+            )
 
-            merged_az_slice = slice(az_offset, merged_az_end_index)
-            merged_rng_slice = slice(rng_offset, rng_end_index - invalid_pixel_buffer)
-            slc_az_slice = slice(slc_az_start_index, slc_az_end_index)
-            slc_rng_slice = slice(first_rng_sample, last_rng_sample - invalid_pixel_buffer)
+        write_slc_gdal(merged_arr, 'reference.tif' if slc == 'ref' else 'secondary.tif')
 
-            cond = np.logical_and(
-                merged_arr[merged_az_slice, merged_rng_slice] == 0, slc_array[slc_az_slice, slc_rng_slice] != 0
-            )
+        if memmap_file is not None:
+            del merged_arr
+            memmap_file.unlink()
 
-            merged_arr[merged_az_slice, merged_rng_slice][cond] = slc_array[slc_az_slice, slc_rng_slice][cond]
+    return merged_shape
 
-            swath_index += 1
 
-        write_slc_gdal(merged_arr, 'reference.tif' if slc == 'ref' else 'secondary.tif')
+def mosaic_swath_bursts(
+    merged_arr: np.ndarray,
+    burst_paths: list[str],
+    burst_windows: list[tuple[slice, slice, slice]],
+    swath_window: tuple[slice, slice],
+    merged_offset: tuple[int, int],
+) -> None:
+    """Write the bursts of a swath directly into the merged (multi-swath) mosaic.
+
+    This is equivalent to first merging the bursts into a swath image (where later bursts overwrite earlier bursts),
+    and then copying the non-zero pixels of the `swath_window` of that swath image into the pixels of the mosaic that
+    are still zero, starting at `merged_offset`. Only the part of each burst that ends up in the mosaic is read.
+
+    Args:
+        merged_arr: The mosaic to update in place
+        burst_paths: The burst SLCs, in swath order
+        burst_windows: The `(swath_az_slice, burst_az_slice, rng_slice)` of each burst (see `get_burst_merge_windows`)
+        swath_window: The `(az_slice, rng_slice)` of the swath image to copy into the mosaic
+        merged_offset: The `(az, rng)` location in the mosaic of the start of the `swath_window`
+    """
+    window_az, window_rng = swath_window
+
+    # Process the bursts last-to-first so each swath pixel is only written by the burst that owns it
+    for index in reversed(range(len(burst_windows))):
+        swath_az, burst_az, rng = burst_windows[index]
+        az_start, az_stop = max(swath_az.start, window_az.start), min(swath_az.stop, window_az.stop)
+        rng_start, rng_stop = max(rng.start, window_rng.start), min(rng.stop, window_rng.stop)
+        if az_start >= az_stop or rng_start >= rng_stop:
+            continue
+
+        burst_az_start = az_start - swath_az.start + burst_az.start
+        burst_arr = read_slc_gdal(
+            burst_paths[index], window=(rng_start, burst_az_start, rng_stop - rng_start, az_stop - az_start)
+        )
+        valid = burst_arr != 0
 
-    subprocess.call('rm -rf ref_swath_*iw* sec_swath_*iw*', shell=True)
+        for later_swath_az, _, later_rng in burst_windows[index + 1 :]:
+            overlap_az = slice(
+                max(az_start, later_swath_az.start) - az_start, min(az_stop, later_swath_az.stop) - az_start
+            )
+            overlap_rng = slice(max(rng_start, later_rng.start) - rng_start, min(rng_stop, later_rng.stop) - rng_start)
+            if overlap_az.start < overlap_az.stop and overlap_rng.start < overlap_rng.stop:
+                valid[overlap_az, overlap_rng] = False
+
+        merged_az_start = merged_offset[0] + az_start - window_az.start
+        merged_rng_start = merged_offset[1] + rng_start - window_rng.start
+        merged_window = merged_arr[
+            merged_az_start : merged_az_start + burst_arr.shape[0],
+            merged_rng_start : merged_rng_start + burst_arr.shape[1],
+        ]
 
-    return merged_arr.shape
+        cond = np.logical_and(merged_window == 0, valid)
+        merged_window[cond] = burst_arr[cond]
 
 
 def get_azimuth_reference_offsets(bursts: list):
@@ -542,50 +872,37 @@ def get_burst_path(burst_filename: str):
     return glob.glob(glob.glob(burst_filename + '/*')[0] + '/*.slc.tif')[0]
 
 
-def merge_bursts_in_swath(ref_bursts: list, ref_burst_files: list[str], sec_burst_files: list[str], swath: int):
-    """Merges the bursts within the provided swath.
+def get_burst_merge_windows(bursts: list, burst_shape: tuple[int, int]):
+    """Determine where the valid part of each burst goes when the bursts of a swath are merged.
        The secondary bursts are merged according to the reference bursts' metadata.
 
     Args:
-        ref_bursts: List of the reference burst objects
-        ref_burst_files: List of the filenames of the reference burst slcs
-        sec_burst_files: List of the filenames of the secondary burst slcs
-        swath: The swath containing the bursts to merge.
+        bursts: List of the reference burst objects in the swath
+        burst_shape: The `(azimuth, range)` size of the burst SLCs
 
     Returns:
-        num_az_samples: Merged image size in the azimuth direction
-        num_rng_samples: Merged image size in the range direction
+        windows: The `(swath_az_slice, burst_az_slice, rng_slice)` of each burst, in swath order
+        swath_shape: The merged swath size in the `(azimuth, range)` directions
     """
-    print(f'Merging Bursts in Swath {swath}')
-
-    num_bursts = len(ref_bursts)
-    az_time_interval = ref_bursts[0].azimuth_time_interval
-    burst_arr = read_slc_gdal(get_burst_path(ref_burst_files[0]))
-    num_az_samples, num_rng_samples = burst_arr.shape
-
-    ref_output_path = 'ref_swath_iw' + str(swath) + '.tif'
-    sec_output_path = 'sec_swath_iw' + str(swath) + '.tif'
+    num_bursts = len(bursts)
+    az_time_interval = bursts[0].azimuth_time_interval
+    num_az_samples, num_rng_samples = burst_shape
 
     if num_bursts == 1:
-        write_slc_gdal(burst_arr, ref_output_path)
-        burst_arr = read_slc_gdal(get_burst_path(sec_burst_files[0]))
-        write_slc_gdal(burst_arr, sec_output_path)
-        return num_az_samples, num_rng_samples
+        full_burst = (slice(0, num_az_samples), slice(0, num_az_samples), slice(0, num_rng_samples))
+        return [full_burst], (num_az_samples, num_rng_samples)
 
-    last_burst_sensing_start = ref_bursts[-1].sensing_start
+    last_burst_sensing_start = bursts[-1].sensing_start
     burst_length = timedelta(seconds=(num_az_samples - 1.0) * az_time_interval)
-    sensing_start = ref_bursts[0].sensing_start
+    sensing_start = bursts[0].sensing_start
     sensing_end = last_burst_sensing_start + burst_length
     num_az_lines = 1 + int(np.round((sensing_end - sensing_start).total_seconds() / az_time_interval))
-    az_reference_offsets = get_azimuth_reference_offsets(ref_bursts)
+    az_reference_offsets = get_azimuth_reference_offsets(bursts)
 
-    ref_merged_arr = np.zeros((num_az_lines, num_rng_samples), dtype=np.float32)
-    sec_merged_arr = np.zeros((num_az_lines, num_rng_samples), dtype=np.float32)
+    windows = []
     for index in range(num_bursts):
-        burst = ref_bursts[index]
+        burst = bursts[index]
         burst_limit = az_reference_offsets[index]
-        burst_arr_ref = read_slc_gdal(get_burst_path(ref_burst_files[index]))
-        burst_arr_sec = read_slc_gdal(get_burst_path(sec_burst_files[index]))
 
         # Merge the bursts in the azimuth direction such that the beginning of 1 burst is halfway
         # through the overlap with the previous burst. This avoids any invalid pixels from resampling in ISCE3.
@@ -611,25 +928,17 @@ def merge_bursts_in_swath(ref_bursts: list, ref_burst_files: list[str], sec_burs
             merge_start_index = burst_limit[0] + (prev_burst_limit[1] - burst_limit[0]) // 2
             merge_end_index = burst_limit[1]
 
-        rng_slice = slice(burst.first_valid_sample, burst.last_valid_sample)
-
-        merge_az_slice = slice(merge_start_index, merge_end_index)
-        burst_az_slice = slice(burst_start_index, burst_end_index)
+        print(f'burst_{index}[{burst_start_index}:{burst_end_index}] -> [{merge_start_index}:{merge_end_index}]')
 
-        print(
-            f'IW{swath}[{merge_start_index}:{merge_end_index}] = burst_{index}[{burst_start_index}:{burst_end_index}]'
+        windows.append(
+            (
+                slice(merge_start_index, merge_end_index),
+                slice(burst_start_index, burst_end_index),
+                slice(burst.first_valid_sample, burst.last_valid_sample),
+            )
         )
 
-        burst_arr_ref = burst_arr_ref[burst_az_slice, rng_slice]
-        burst_arr_sec = burst_arr_sec[burst_az_slice, rng_slice]
-
-        ref_merged_arr[merge_az_slice, rng_slice] = burst_arr_ref
-        sec_merged_arr[merge_az_slice, rng_slice] = burst_arr_sec
-
-    write_slc_gdal(ref_merged_arr, ref_output_path)
-    write_slc_gdal(sec_merged_arr, sec_output_path)
-
-    return num_az_lines, num_rng_samples
+    return windows, (num_az_lines, num_rng_samples)
 
 
 # FIXME: is_slc could be handled by swaths?
@@ -682,16 +991,129 @@ def bounding_box(safe, orbit_file, is_slc, swaths=(1, 2, 3), epsg=4326):
     return lat_limits, lon_limits
 
 
-def convert2isce(burst_id, ref=True):
+def get_strip_rows(band, target_rows: int = AMPLITUDE_STRIP_ROWS) -> int:
+    """Get the number of rows in a strip of whole GDAL blocks close to `target_rows`."""
+    _, block_rows = band.GetBlockSize()
+    return max(block_rows, (target_rows // block_rows) * block_rows)
+
+
+def convert_slc_to_amplitude(
+    slc_path: str, out_path: str, workers: int = 1, strip_rows: int = AMPLITUDE_STRIP_ROWS
+) -> str:
+    """Convert a complex SLC to a float32 amplitude GeoTIFF in block-aligned strips of rows.
+
+    Strips are read and converted by up to `workers` threads, each with its own GDAL dataset, and written in order, so
+    peak memory is bounded by a few strips instead of the whole SLC.
+
+    Args:
+        slc_path: The complex SLC to convert
+        out_path: The amplitude GeoTIFF to create
+        workers: Number of threads reading and converting strips
+        strip_rows: Approximate number of rows in each strip; rounded to whole GDAL blocks
+
+    Returns:
+        The path to the amplitude GeoTIFF
+    """
+    ds = gdal.Open(slc_path)
+    band = ds.GetRasterBand(1)
+    num_rng_samples, num_az_samples = ds.RasterXSize, ds.RasterYSize
+    rows = get_strip_rows(band, strip_rows)
+    del band, ds
+
+    driver = gdal.GetDriverByName('GTIFF')
+    out_raster = driver.Create(out_path, num_rng_samples, num_az_samples, 1, gdal.GDT_Float32)
+    out_band = out_raster.GetRasterBand(1)
+    out_band.SetNoDataValue(0)
+
+    local = threading.local()
+
+    def read_strip(row: int) -> np.ndarray:
+        if not hasattr(local, 'ds'):
+            local.ds = gdal.Open(slc_path)
+        strip = local.ds.GetRasterBand(1).ReadAsArray(0, row, num_rng_samples, min(rows, num_az_samples - row))
+        return np.abs(strip).astype(np.float32, copy=False)
+
+    strip_starts = list(range(0, num_az_samples, rows))
+    max_pending = 2 * max(workers, 1)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        pending: deque[Future[np.ndarray]] = deque(
+            executor.submit(read_strip, row) for row in strip_starts[:max_pending]
+        )
+        for ii, row in enumerate(strip_starts):
+            out_band.WriteArray(pending.popleft().result(), 0, row)
+            if ii + max_pending < len(strip_starts):
+                pending.append(executor.submit(read_strip, strip_starts[ii + max_pending]))
+
+    out_band.FlushCache()
+    del out_band, out_raster
+    return out_path
+
+
+def convert2isce(burst_id, ref=True, workers=1):
     product_path = './product/' if ref else './product_sec/'
     output_path = 'reference.tif' if ref else 'secondary.tif'
 
     fol = glob.glob(product_path + burst_id + '/*')[0]
     slc = glob.glob(fol + '/*.slc.tif')[0]
-    ds = gdal.Open(slc)
-    band = ds.GetRasterBand(1)
-    arr = np.abs(band.ReadAsArray()).astype(np.float32)
-    write_slc_gdal(arr, output_path)
+    convert_slc_to_amplitude(slc, output_path, workers=workers)
+
+
+def get_orbit_safe_name(scene) -> str:
+    """Get a SAFE name with the mission and sensing window of an SLC or burst granule(s), to retrieve its orbit with.
+
+    SLC names already are one; burst granule names don't include the mission, so the bursts are looked up in CMR.
+
+    Args:
+        scene: The SLC name, burst granule name, or list of burst granule names
+
+    Returns:
+        The SAFE name
+    """
+    granules = scene if isinstance(scene, list) else [scene]
+    if not granules[0].endswith('-BURST'):
+        return granules[0]
+
+    results = asf.granule_search(granules)
+    if len(results) == 0:
+        raise ValueError(f'`asf_search` was unable to find {granules}')
+
+    mission = 'S1' + results[0].properties['platform'][-1]
+    # CMR times have a variable number of fractional digits, which `datetime.fromisoformat` can't parse before 3.11
+    start = min(parse_dt(result.properties['startTime']) for result in results)
+    stop = max(parse_dt(result.properties['stopTime']) for result in results)
+    return f'{mission}_IW_SLC__1SDV_{start:%Y%m%dT%H%M%S}_{stop:%Y%m%dT%H%M%S}'
+
+
+def stage_scenes(download: Callable, reference, secondary) -> tuple[tuple, tuple]:
+    """Download the reference and secondary scenes, and retrieve their orbit files, concurrently.
+
+    The orbit files are retrieved using the scene names, so all four transfers run at the same time.
+
+    Args:
+        download: Function that downloads a scene and returns the path to its SAFE
+        reference: The reference scene(s) to download
+        secondary: The secondary scene(s) to download
+
+    Returns:
+        The (SAFE, orbit file) of the reference and of the secondary
+    """
+    start = time.monotonic()
+
+    def get_orbit(scene) -> str:
+        return s1_orbits.get_orbit_file(get_orbit_safe_name(scene))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        safes = [executor.submit(download, scene) for scene in (reference, secondary)]
+        orbits = [executor.submit(get_orbit, scene) for scene in (reference, secondary)]
+        safe_ref, safe_sec = (future.result() for future in safes)
+        orbit_ref, orbit_sec = (future.result() for future in orbits)
+
+    log.info(f'Staged the reference and secondary scenes in {time.monotonic() - start:.1f} s')
+    return (safe_ref, orbit_ref), (safe_sec, orbit_sec)
+
+
+def download_slc(slc: str) -> str:
+    return utils.download_file_in_parts(get_download_url(slc), chunk_size=5242880)
 
 
 def download_burst(burst_granule, all_anns=True):
@@ -709,7 +1131,7 @@ def get_burst_id(safe, burst_granule, orbit_file):
     swath_number = int(swath[2])
 
     abspath = os.path.abspath(safe)
-    bursts = s1reader.load_bursts(abspath, orbit_file, swath_number, pol)
+    bursts = s1_metadata.load_bursts(abspath, orbit_file, swath_number, pol)
 
     str_burst_id = None
     for x in bursts:
@@ -734,10 +1156,10 @@ def get_isce3_burst_id(burst):
 def get_burst_ids(safe, orbit_file):
     abspath = os.path.abspath(safe)
     bursts = []
-    pol = getPol(safe, orbit_file)
+    pol = s1_metadata.get_pol(safe, orbit_file)
 
     for swath_number in [1, 2, 3]:
-        bursts += s1reader.load_bursts(abspath, orbit_file, swath_number, pol)
+        bursts += s1_metadata.load_bursts(abspath, orbit_file, swath_number, pol)
 
     return [get_isce3_burst_id(x) for x in bursts]
 
@@ -748,22 +1170,77 @@ def get_bounds_dem(safe):
     return bounds
 
 
-def download_dem(dem, bounds):
-    in_ds = gdal.OpenShared(dem, gdal.GA_ReadOnly)
-    warp_options = gdal.WarpOptions(
-        format='GTIFF',
-        outputType=gdal.GDT_Int16,
-        resampleAlg='cubic',
-        xRes=0.001,
-        yRes=0.001,
-        dstSRS='EPSG:4326',
-        dstNodata=0,
-        outputBounds=bounds,
+def get_dem_margin(latitude: float, swath: int, max_height: float = DEM_MAX_HEIGHT) -> tuple[float, float]:
+    """Get the (longitude, latitude) margin in degrees needed around a burst footprint to cover terrain displacement.
+
+    Args:
+        latitude: The latitude furthest from the equator of the footprint
+        swath: The swath number (1, 2, or 3) of the burst
+        max_height: The maximum terrain height above the ellipsoid to account for in meters
+
+    Returns:
+        lon_margin: The margin in degrees of longitude
+        lat_margin: The margin in degrees of latitude
+    """
+    margin = max_height / math.tan(math.radians(SWATH_MIN_INCIDENCE[swath]))
+    meters_per_degree = 111_320.0
+    lat_margin = margin / meters_per_degree + DEM_PADDING
+    lon_margin = margin / (meters_per_degree * max(math.cos(math.radians(latitude)), 0.01)) + DEM_PADDING
+    return lon_margin, lat_margin
+
+
+def get_bursts_dem_bounds(scenes: list[tuple[str, str, list[str]]]) -> list[float] | None:
+    """Get the DEM bounds covering the footprints of only the selected bursts of some Sentinel-1 SAFEs.
+
+    Each burst's footprint (on the ellipsoid) is padded by a margin for the terrain displacement in its swath.
+
+    Args:
+        scenes: The (SAFE, orbit file, ISCE3 burst IDs) of each scene, e.g., of the reference and secondary
+
+    Returns:
+        The `[west, south, east, north]` bounds, or None if the footprints couldn't be determined or cross the
+        antimeridian
+    """
+    bounds = []
+    for safe, orbit_file, burst_ids in scenes:
+        pol = s1_metadata.get_pol(safe, orbit_file)
+        for swath in sorted({int(burst_id[-1]) for burst_id in burst_ids}):
+            for burst in s1_metadata.load_bursts(safe, orbit_file, swath, pol, burst_ids=burst_ids):
+                for polygon in burst.border:
+                    west, south, east, north = polygon.bounds
+                    lon_margin, lat_margin = get_dem_margin(max(abs(south), abs(north)), swath)
+                    bounds.append((west - lon_margin, south - lat_margin, east + lon_margin, north + lat_margin))
+
+    if not bounds:
+        return None
+
+    west, south, east, north = (
+        min(b[0] for b in bounds),
+        min(b[1] for b in bounds),
+        max(b[2] for b in bounds),
+        max(b[3] for b in bounds),
     )
-    gdal.Warp('dem.tif', in_ds, options=warp_options)
+    if east - west > 180:
+        log.info('Burst footprints cross the antimeridian; using the scene bounding box for the DEM')
+        return None
+
+    log.info(f'DEM bounds from the footprints of the selected bursts: {[west, south, east, north]}')
+    return [west, south, east, north]
 
 
-def write_yaml(safe, orbit_file, burst_id=None, is_ref=False, use_static_layer=False):
+def download_dem(dem, bounds):
+    get_warped_dem(dem, bounds, dem_path='dem.tif')
+
+
+def write_yaml(
+    safe,
+    orbit_file,
+    burst_id=None,
+    is_ref=False,
+    use_static_layer=False,
+    runconfig_path='s1_cslc.yaml',
+    scratch_folder=None,
+):
     abspath = os.path.abspath(safe)
     yaml_folder = os.path.dirname(hyp3_autorift.__file__) + '/schemas'
 
@@ -775,26 +1252,30 @@ def write_yaml(safe, orbit_file, burst_id=None, is_ref=False, use_static_layer=F
         burst_id_str = '[' + burst_id + ']' if burst_id else ''
         bool_reference = 'True'
         product_folder = './product'
-        scratch_folder = './scratch'
+        default_scratch_folder = './scratch'
         output_folder = './output'
     elif use_static_layer:
         s1_ref_file = str((STATIC_DIR / burst_id).absolute())
         burst_id_str = '[' + burst_id + ']'
         bool_reference = 'False'
         product_folder = './product_sec' if not is_ref else './product'
-        scratch_folder = './product_sec' if not is_ref else './product'
+        default_scratch_folder = './product_sec' if not is_ref else './product'
         output_folder = './output_sec' if not is_ref else './output'
     else:
         s1_ref_file = os.path.abspath(glob.glob('./product/' + burst_id + '/*')[0])
         burst_id_str = '[' + burst_id + ']'
         bool_reference = 'False'
         product_folder = './product_sec'
-        scratch_folder = './product_sec'
+        default_scratch_folder = './product_sec'
         output_folder = './output_sec'
 
-    pol = getPol(safe, orbit_file)
+    scratch_folder = default_scratch_folder if scratch_folder is None else str(scratch_folder)
 
-    with open('s1_cslc.yaml', 'w') as yaml:
+    pol = s1_metadata.get_pol(safe, orbit_file)
+
+    runconfig_path = Path(runconfig_path)
+    runconfig_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(runconfig_path, 'w') as yaml:
         for line in lines:
             newstring = ''
             if 's1_image' in line:
@@ -819,3 +1300,5 @@ def write_yaml(safe, orbit_file, burst_id=None, is_ref=False, use_static_layer=F
             else:
                 newstring = line
             yaml.write(newstring)
+
+    return str(runconfig_path)
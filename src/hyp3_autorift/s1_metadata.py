@@ -0,0 +1,86 @@
+"""Cached loading of Sentinel-1 burst metadata"""
+
+import os
+
+import s1reader
+
+
+POLARIZATIONS = ('vv', 'vh', 'hh', 'hv')
+
+
+class BurstMetadataSession:
+    """Memoizes `s1reader.load_bursts` so a SAFE's annotation XML is only parsed once per job.
+
+    Bursts are cached per (SAFE, orbit file, swath, polarization), and the detected polarization per
+    (SAFE, orbit file). Relative and absolute paths to the same file share a cache entry.
+    """
+
+    def __init__(self):
+        self._bursts: dict[tuple[str, str, int, str], list] = {}
+        self._pols: dict[tuple[str, str], str] = {}
+
+    def load_bursts(self, safe: str, orbit_path: str, swath: int, pol: str, burst_ids: list[str] | None = None):
+        """Load the bursts of a swath of a SAFE, like `s1reader.load_bursts`.
+
+        Args:
+            safe: Path to the SAFE
+            orbit_path: Path to the orbit file
+            swath: Swath number (1, 2, or 3)
+            pol: Polarization of the bursts
+            burst_ids: (Optional) Only return the bursts with these ISCE3 burst ids (e.g., `t064_135523_iw1`)
+
+        Returns:
+            A new list of the (cached) burst objects
+        """
+        key = (os.path.abspath(safe), os.path.abspath(orbit_path), int(swath), pol)
+        if key not in self._bursts:
+            self._bursts[key] = s1reader.load_bursts(safe, orbit_path, swath, pol)
+
+        bursts = self._bursts[key]
+        if burst_ids is not None:
+            bursts = [burst for burst in bursts if str(burst.burst_id) in burst_ids]
+        return list(bursts)
+
+    def get_pol(self, safe: str, orbit_path: str) -> str:
+        """Find the first polarization (in `vv`, `vh`, `hh`, `hv` order) with bursts in any swath of a SAFE.
+
+        Args:
+            safe: Path to the SAFE
+            orbit_path: Path to the orbit file
+
+        Returns:
+            The polarization
+        """
+        key = (os.path.abspath(safe), os.path.abspath(orbit_path))
+        if key not in self._pols:
+            self._pols[key] = self._find_pol(safe, orbit_path)
+        return self._pols[key]
+
+    def _find_pol(self, safe: str, orbit_path: str) -> str:
+        for pol in POLARIZATIONS:
+            for swath in [1, 2, 3]:
+                try:
+                    self.load_bursts(safe, orbit_path, swath, pol)
+                except Exception:
+                    continue
+                print(f'Polarization {pol}')
+                return pol
+        raise ValueError(f'No polarization information found for {safe}.')
+
+    def clear(self):
+        """Drop all cached metadata."""
+        self._bursts.clear()
+        self._pols.clear()
+
+
+SESSION = BurstMetadataSession()
+
+
+def load_bursts(safe: str, orbit_path: str, swath: int, pol: str, burst_ids: list[str] | None = None):
+    """Load the bursts of a swath of a SAFE using the shared `SESSION`; see `BurstMetadataSession.load_bursts`."""
+    return SESSION.load_bursts(safe, orbit_path, swath, pol, burst_ids=burst_ids)
+
+
+def get_pol(safe: str, orbit_path: str) -> str:
+    """Find the polarization of a SAFE using the shared `SESSION`; see `BurstMetadataSession.get_pol`."""
+    return SESSION.get_pol(safe, orbit_path)
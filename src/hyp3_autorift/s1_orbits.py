@@ -0,0 +1,150 @@
+"""Retrieval of Sentinel-1 orbit files through a shared, indexed orbit cache"""
+
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from s1reader.s1_orbit import retrieve_orbit_file
+
+from hyp3_autorift import cache
+
+
+log = logging.getLogger(__name__)
+
+ORBIT_TYPES = ('POEORB', 'RESORB')  # in order of preference
+ORBIT_PADDING = timedelta(seconds=60)
+POEORB_LATENCY = timedelta(days=21)  # precise orbits are published ~20 days after acquisition
+INDEX_FILE = 'index.json'
+
+
+def parse_orbit_file_name(orbit_file: str) -> dict | None:
+    """Parse the mission, orbit type, and validity window from a Sentinel-1 orbit file name, like
+    `S1A_OPER_AUX_POEORB_OPOD_20210111T121212_V20201221T225942_20201223T005942.EOF`.
+
+    Args:
+        orbit_file: The orbit file
+
+    Returns:
+        The `mission`, `type`, `start`, and `stop` of the orbit file, or None if it isn't a Sentinel-1 orbit file name
+    """
+    parts = Path(orbit_file).stem.split('_')
+    try:
+        start = datetime.strptime(parts[6], 'V%Y%m%dT%H%M%S')
+        stop = datetime.strptime(parts[7], '%Y%m%dT%H%M%S')
+    except (IndexError, ValueError):
+        return None
+    return {
+        'mission': parts[0],
+        'type': parts[3],
+        'produced': parts[5],
+        'start': start.isoformat(),
+        'stop': stop.isoformat(),
+    }
+
+
+def get_safe_sensing_window(safe: str) -> tuple[str, datetime, datetime]:
+    """Get the mission and sensing start and stop times from a Sentinel-1 SAFE (or SLC zip) name."""
+    parts = Path(safe).name.split('_')
+    start = datetime.strptime(parts[5], '%Y%m%dT%H%M%S')
+    stop = datetime.strptime(parts[6], '%Y%m%dT%H%M%S')
+    return parts[0], start, stop
+
+
+def find_cached_orbit_file(orbit_dir: Path, mission: str, start: datetime, stop: datetime) -> Path | None:
+    """Find the preferred orbit file in the cache index whose validity window covers a sensing window.
+
+    Args:
+        orbit_dir: The orbit cache directory
+        mission: The Sentinel-1 mission, e.g. `S1A`
+        start: The sensing start time
+        stop: The sensing stop time
+
+    Returns:
+        The cached orbit file, or None if no cached orbit file covers the sensing window
+    """
+    index = cache.read_json(orbit_dir / INDEX_FILE, default={})
+    candidates = []
+    for name, info in index.items():
+        if info['mission'] != mission or info['type'] not in ORBIT_TYPES:
+            continue
+        covers = (
+            datetime.fromisoformat(info['start']) <= start - ORBIT_PADDING
+            and datetime.fromisoformat(info['stop']) >= stop + ORBIT_PADDING
+        )
+        if covers and (orbit_dir / name).exists():
+            candidates.append((-ORBIT_TYPES.index(info['type']), info['produced'], name))
+
+    if not candidates:
+        return None
+    # Prefer precise orbits, then the most recently produced file
+    *_, name = max(candidates)
+    return orbit_dir / name
+
+
+def is_current(orbit_file: Path, stop: datetime) -> bool:
+    """Check whether a cached orbit file is still the best available: a precise orbit, or a restituted orbit for a scene
+    whose precise orbit can't have been published yet.
+
+    Args:
+        orbit_file: The cached orbit file
+        stop: The sensing stop time of the scene
+
+    Returns:
+        True if the orbit file should be used, or False if a precise orbit should be retrieved instead
+    """
+    info = parse_orbit_file_name(orbit_file.name)
+    if info is not None and info['type'] == 'POEORB':
+        return True
+    return datetime.now(timezone.utc).replace(tzinfo=None) < stop + POEORB_LATENCY
+
+
+def add_to_index(orbit_dir: Path, orbit_file: Path) -> None:
+    """Add an orbit file in the cache to the cache index; must be called while holding the cache lock."""
+    info = parse_orbit_file_name(orbit_file.name)
+    if info is None:
+        log.warning(f'Unable to index orbit file {orbit_file.name}')
+        return
+
+    index = cache.read_json(orbit_dir / INDEX_FILE, default={})
+    index[orbit_file.name] = info
+    cache.write_json(index, orbit_dir / INDEX_FILE)
+
+
+def get_orbit_file(safe: str, orbit_dir: str | Path = '.') -> str:
+    """Get the orbit file for a Sentinel-1 SAFE, preferring precise orbits.
+
+    When the `HYP3_AUTORIFT_CACHE_DIR` environment variable is set, the node-wide orbit cache is searched for an orbit
+    file covering the SAFE's sensing window before any network request is made. A cached restituted orbit is only used
+    while the precise orbit can't have been published yet (see `is_current`); afterwards, the orbit file is retrieved
+    again. Orbit files that need to be downloaded are added to the cache. Either way, the orbit file is linked into
+    `orbit_dir`.
+
+    Args:
+        safe: The SAFE (or SLC zip) path
+        orbit_dir: The directory to make the orbit file available in
+
+    Returns:
+        The path to the orbit file in `orbit_dir`
+    """
+    cache_dir = cache.get_cache_dir('orbits')
+    if cache_dir is None:
+        return retrieve_orbit_file(safe, orbit_dir=str(orbit_dir), concatenate=True)
+
+    mission, start, stop = get_safe_sensing_window(safe)
+    cached_file = find_cached_orbit_file(cache_dir, mission, start, stop)
+    if cached_file is not None and is_current(cached_file, stop):
+        log.info(f'Using cached orbit file {cached_file.name}')
+        return str(cache.link_from_cache(cached_file, orbit_dir))
+
+    with cache.file_lock(cache_dir / '.lock'):
+        # Another job may have downloaded it while we waited for the lock
+        cached_file = find_cached_orbit_file(cache_dir, mission, start, stop)
+        if cached_file is None or not is_current(cached_file, stop):
+            with tempfile.TemporaryDirectory(dir=cache_dir) as download_dir:
+                downloaded_file = Path(retrieve_orbit_file(safe, orbit_dir=download_dir, concatenate=True))
+                cached_file = cache.publish_file(downloaded_file, cache_dir / downloaded_file.name, move=True)
+            add_to_index(cache_dir, cached_file)
+            log.info(f'Added orbit file {cached_file.name} to the orbit cache')
+
+    return str(cache.link_from_cache(cached_file, orbit_dir))
@@ -1,12 +1,16 @@
 import glob
+import os
 from pathlib import Path
+from xml.sax.saxutils import escape
 
 import boto3
+import netCDF4
 import numpy as np
 from botocore.exceptions import ClientError, NoCredentialsError
 from osgeo import gdal
 from s1reader import Sentinel1BurstSlc
 
+from hyp3_autorift import cache
 from hyp3_autorift.utils import upload_file_to_s3_with_publish_access_keys
 
 
@@ -20,6 +24,10 @@ S3_BUCKET_PREFIX = 'static-topo-corrections'
 
 STATIC_DIR = Path('./static_topo_corrections/')
 
+# Size limit of the (optional) node-wide static layer cache; see `hyp3_autorift.cache`
+STATIC_CACHE_SIZE_ENV = 'HYP3_AUTORIFT_STATIC_CACHE_GB'
+DEFAULT_STATIC_CACHE_SIZE_GB = 20.0
+
 RADAR_GRID_PARAMS = [
     'NC_GLOBAL#sensing_start',
     'NC_GLOBAL#wavelength',
@@ -41,6 +49,41 @@ ADDITIONAL_METADATA_PARAMS = [
 
 TOPO_CORRECTION_FILES = ['x.tif', 'y.tif', 'z.tif', 'layover_shadow_mask.tif']
 
+STATIC_FILE_VERSION = 2
+
+# The netCDF variable and data type of each band of `topo.vrt`, for each version of the static file
+STATIC_LAYER_BANDS = {
+    1: [('Band1', 'Float64'), ('Band2', 'Float64'), ('Band3', 'Float64'), ('Band4', 'Byte')],
+    2: [('x', 'Float64'), ('y', 'Float64'), ('z', 'Float64'), ('layover_shadow_mask', 'Byte')],
+}
+
+# Version 2 static files store the x/y (lon/lat) coordinates as int32 quantized to this many degrees (~1 mm)
+COORDINATE_QUANTUM = 1e-8
+INT32_FILL = np.iinfo(np.int32).min
+
+# Version 2 static files are chunked in strips of rows, so ISCE3's line-block reads decompress whole chunks
+STATIC_CHUNK_ROWS = 256
+
+
+def _print_static_nc_error(error: Exception, burst_id: str) -> None:
+    if isinstance(error, NoCredentialsError):
+        print('AWS credentials are required to retrieve static files from the provided bucket.')
+        return
+
+    assert isinstance(error, ClientError)
+    code = error.response['Error']['Code']
+    if code in ('404', 'NoSuchKey'):
+        message = f'Unable to find static correction file for {burst_id}.'
+    elif code == '403':
+        message = f'Got access denied when attempting to retrieve static correction file for {burst_id}.'
+    else:
+        message = str(error)
+    print(message + ' `rdr2geo` will be run for this burst.')
+
+
+def get_static_nc_key(burst_id: str) -> str:
+    return f'{S3_BUCKET_PREFIX}/{burst_id[:-4]}/{burst_id}_static_rdr.nc'
+
 
 def retrieve_static_nc_from_s3(burst_id: str, bucket: str, filename: str) -> str | None:
     """Attempt to download a radar static topographic correction file from S3.
@@ -54,31 +97,79 @@ def retrieve_static_nc_from_s3(burst_id: str, bucket: str, filename: str) -> str
         The filename of the downloaded static file if one was found, else None
     """
 
-    bucket_prefix = f'{S3_BUCKET_PREFIX}/{burst_id[:-4]}'
-    s3_filename = f'{burst_id}_static_rdr.nc'
-    key = f'{bucket_prefix}/{s3_filename}'
+    key = get_static_nc_key(burst_id)
 
     print(f'Retrieving Static File: {key}')
 
     try:
         S3_CLIENT.download_file(bucket, key, filename)
-    except ClientError as e:
-        code = e.response['Error']['Code']
-        if code == '404':
-            message = f'Unable to find static correction file for {burst_id}.'
-        elif code == '403':
-            message = f'Got access denied when attempting to retrieve static correction file for {burst_id}.'
-        else:
-            message = str(e)
-        print(message + ' `rdr2geo` will be run for this burst.')
-        return None
-    except NoCredentialsError:
-        print('AWS credentials are required to retrieve static files from the provided bucket.')
+    except (ClientError, NoCredentialsError) as e:
+        _print_static_nc_error(e, burst_id)
         return None
 
     return filename
 
 
+def get_static_cache_max_bytes() -> int:
+    return int(float(os.environ.get(STATIC_CACHE_SIZE_ENV, DEFAULT_STATIC_CACHE_SIZE_GB)) * 1e9)
+
+
+def retrieve_static_nc_from_cache(burst_id: str, bucket: str, filename: str, cache_dir: Path) -> str | None:
+    """Attempt to retrieve a radar static topographic correction file from the node-wide static layer cache,
+    downloading it from S3 into the cache if it isn't there.
+
+    Cached files are keyed by burst ID and S3 ETag, so a static file that is regenerated in S3 is downloaded again.
+    The least recently used files are evicted once the cache grows beyond `HYP3_AUTORIFT_STATIC_CACHE_GB`.
+
+    Args:
+        burst_id: The format ISCE burst ID
+        bucket: The bucket to download from
+        filename: The filename to save the static file as
+        cache_dir: The static layer cache directory
+
+    Returns:
+        The filename of the retrieved static file if one was found, else None
+    """
+    key = get_static_nc_key(burst_id)
+
+    try:
+        etag = S3_CLIENT.head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+    except (ClientError, NoCredentialsError) as e:
+        _print_static_nc_error(e, burst_id)
+        return None
+
+    cached_file = cache_dir / f'{burst_id}_{etag}_static_rdr.nc'
+    local_dir = Path(filename).parent
+    with cache.file_lock(cache_dir / f'.{burst_id}.lock'):
+        # Evictions hold the cache lock exclusively, so a cached file can't disappear while it's being linked
+        with cache.file_lock(cache_dir / '.lock', shared=True):
+            if cached_file.exists():
+                print(f'Using cached Static File: {key}')
+                os.utime(cached_file)
+                local_file = cache.link_from_cache(cached_file, local_dir, hard=True)
+            else:
+                local_file = None
+
+        if local_file is None:
+            print(f'Retrieving Static File: {key}')
+            download_file = cache_dir / f'.{cached_file.name}.download'
+            try:
+                S3_CLIENT.download_file(bucket, key, str(download_file))
+            except (ClientError, NoCredentialsError) as e:
+                download_file.unlink(missing_ok=True)
+                _print_static_nc_error(e, burst_id)
+                return None
+
+            with cache.file_lock(cache_dir / '.lock', shared=True):
+                cache.publish_file(download_file, cached_file, move=True)
+                local_file = cache.link_from_cache(cached_file, local_dir, hard=True)
+
+    with cache.file_lock(cache_dir / '.lock'):
+        cache.evict_lru(cache_dir, get_static_cache_max_bytes(), pattern='*_static_rdr.nc', keep=(cached_file,))
+
+    return str(local_file.rename(filename))
+
+
 def upload_static_nc_to_s3(filename: Path, burst_id: str, bucket: str) -> None:
     """Attempt to upload a radar static topographic correction file to S3.
 
@@ -101,6 +192,68 @@ def upload_static_nc_to_s3(filename: Path, burst_id: str, bucket: str) -> None:
         print(f'Unable to upload {filename} to S3 due to {e}.')
 
 
+def build_topo_vrt(static_file: str, vrt_path: Path, bands: list[tuple[str, str]] = STATIC_LAYER_BANDS[1]) -> Path:
+    """Build a VRT of the x, y, z, and layover/shadow mask layers of a static NetCDF that reads directly from the
+    NetCDF's subdatasets, so the layers don't need to be expanded into separate rasters. Packed (scaled) variables
+    are unpacked by the VRT.
+
+    Args:
+        static_file: The static NetCDF
+        vrt_path: The VRT to create
+        bands: The NetCDF variable and (VRT) data type of each band
+
+    Returns:
+        The path of the VRT
+    """
+    subdatasets = [f'NETCDF:"{Path(static_file).absolute()}":{variable}' for variable, _ in bands]
+
+    vrt_bands = []
+    for band, (subdataset, (_, data_type)) in enumerate(zip(subdatasets, bands), start=1):
+        ds = gdal.Open(subdataset)
+        cols, rows = ds.RasterXSize, ds.RasterYSize
+        src_band = ds.GetRasterBand(1)
+        scale, offset, nodata = src_band.GetScale(), src_band.GetOffset(), src_band.GetNoDataValue()
+        del src_band, ds
+
+        rects = (
+            f'      <SrcRect xOff="0" yOff="0" xSize="{cols}" ySize="{rows}" />\n'
+            f'      <DstRect xOff="0" yOff="0" xSize="{cols}" ySize="{rows}" />\n'
+        )
+        source_filename = f'      <SourceFilename relativeToVRT="0">{escape(subdataset)}</SourceFilename>\n'
+
+        if scale in (None, 1) and offset in (None, 0):
+            vrt_bands.append(
+                f'  <VRTRasterBand dataType="{data_type}" band="{band}">\n'
+                f'    <SimpleSource>\n{source_filename}      <SourceBand>1</SourceBand>\n{rects}    </SimpleSource>\n'
+                '  </VRTRasterBand>\n'
+            )
+        else:
+            nodata_element = '' if nodata is None else f'      <NODATA>{nodata:.0f}</NODATA>\n'
+            vrt_bands.append(
+                f'  <VRTRasterBand dataType="{data_type}" band="{band}">\n'
+                '    <NoDataValue>nan</NoDataValue>\n'
+                f'    <ComplexSource>\n{source_filename}      <SourceBand>1</SourceBand>\n{rects}'
+                f'{nodata_element}'
+                f'      <ScaleOffset>{offset!r}</ScaleOffset>\n'
+                f'      <ScaleRatio>{scale!r}</ScaleRatio>\n'
+                '    </ComplexSource>\n'
+                '  </VRTRasterBand>\n'
+            )
+
+    vrt_path.write_text(
+        f'<VRTDataset rasterXSize="{cols}" rasterYSize="{rows}">\n'
+        '  <SRS>EPSG:4326</SRS>\n'
+        f'{"".join(vrt_bands)}'
+        '</VRTDataset>\n'
+    )
+    return vrt_path
+
+
+def get_static_file_version(metadata: dict) -> int:
+    """Get the version of a static file from its (GDAL) metadata; files without a version are version 1."""
+    return int(metadata.get('NC_GLOBAL#static_file_version', 1))
+
+
 def get_static_layer(burst_id: str, bucket: str) -> bool:
     """Download a radar-geometry topographic correction and stage it for ISCE3 processing
     in the following manner:
@@ -108,10 +261,7 @@ def get_static_layer(burst_id: str, bucket: str) -> bool:
         static_topo_corrections/
           - | {burst_id}/
             - | {burst_id}_static.nc     (Retrived from S3)
-            - | x.tif                    (Created from NetCDF)
-            - | y.tif                    (Created from NetCDF)
-            - | z.tif                    (Created from NetCDF)
-            - | layover_shadow_mask.tif  (Created from NetCDF)
+            - | topo.vrt                 (x, y, z, and layover/shadow mask bands read directly from the NetCDF)
             - | radar_grid.txt           (Created from NetCDF)
 
     Args:
@@ -126,38 +276,21 @@ def get_static_layer(burst_id: str, bucket: str) -> bool:
     burst_static_dir = STATIC_DIR / burst_id
     burst_static_dir.mkdir(exist_ok=True)
 
-    static_file = retrieve_static_nc_from_s3(
-        burst_id=burst_id, bucket=bucket, filename=str(burst_static_dir / f'{burst_id}_static_rdr.nc')
-    )
+    filename = str(burst_static_dir / f'{burst_id}_static_rdr.nc')
+    if (cache_dir := cache.get_cache_dir('static_layers')) is not None:
+        static_file = retrieve_static_nc_from_cache(burst_id, bucket, filename, cache_dir)
+    else:
+        static_file = retrieve_static_nc_from_s3(burst_id=burst_id, bucket=bucket, filename=filename)
 
     if not static_file:
         return False
 
-    static_file = 'NETCDF:' + static_file
-
-    files = [str(burst_static_dir / file) for file in TOPO_CORRECTION_FILES]
-
-    for band, filename in enumerate(files, start=1):
-        band_str = f':Band{band}'
-        band_gdal_type = gdal.GDT_Float64 if band != 4 else gdal.GDT_Byte
-        band_numpy_type = np.float64 if band != 4 else np.uint8
-
-        in_ds = gdal.Open(static_file + band_str)
-        in_band = in_ds.GetRasterBand(1)
-        in_arr = in_band.ReadAsArray().astype(band_numpy_type)
-
-        rows, cols = in_arr.shape
-
-        driver = gdal.GetDriverByName('GTiff')
-        out_ds = driver.Create(filename, cols, rows, 1, band_gdal_type)
-        out_ds.GetRasterBand(1).WriteArray(in_arr)
-        out_ds.FlushCache()
-
-    gdal.BuildVRT(str(burst_static_dir / 'topo.vrt'), files, separate=True, outputSRS='EPSG:4326')
-
-    with gdal.Open(static_file) as ds:
+    with gdal.Open('NETCDF:' + static_file) as ds:
         metadata = ds.GetMetadata()
 
+    bands = STATIC_LAYER_BANDS[get_static_file_version(metadata)]
+    build_topo_vrt(static_file, burst_static_dir / 'topo.vrt', bands=bands)
+
     with open(burst_static_dir / 'radar_grid.txt', 'w') as rdr_grid_file:
         for param in RADAR_GRID_PARAMS:
             rdr_grid_file.write(metadata[param] + '\n')
@@ -197,29 +330,86 @@ def create_static_layer(burst_id: str, burst: Sentinel1BurstSlc, isce_product_pa
 
     metadata = dict(metadata, **dict(zip(ADDITIONAL_METADATA_PARAMS, additional_metadata_vals)))
 
-    with gdal.Open(burst_dir + '/' + 'topo.vrt') as ds:
-        cols = ds.RasterXSize
-        rows = ds.RasterYSize
+    layers = {}
+    for (variable, _), file in zip(STATIC_LAYER_BANDS[STATIC_FILE_VERSION], topo_files):
+        with gdal.Open(file) as in_ds:
+            layers[variable] = in_ds.GetRasterBand(1).ReadAsArray()
 
-    driver = gdal.GetDriverByName('netCDF')
-    options = ['FORMAT=NC4', 'COMPRESS=DEFLATE']
-    out_ds = driver.Create(burst_topo_nc, cols, rows, len(topo_files), gdal.GDT_Float64, options)
+    write_static_nc(burst_topo_nc, layers, metadata)
 
-    if out_ds is None:
-        print('Failed to create radar static correction NetCDF file. Check that your GDAL has NetCDF-4 support.')
-        return None
+    return Path(burst_topo_nc)
 
-    out_ds.SetMetadata(metadata)
 
-    for i, file in enumerate(topo_files):
-        with gdal.Open(file) as in_ds:
-            band_data = in_ds.GetRasterBand(1).ReadAsArray()
+def quantize_coordinates(coordinates: np.ndarray) -> tuple[np.ndarray, float, float]:
+    """Pack (lon/lat) coordinates into int32 with CF `scale_factor` and `add_offset` packing.
+
+    Args:
+        coordinates: The coordinates to pack; NaNs are packed as `INT32_FILL`
 
-            if file.endswith('layover_shadow_mask.tif'):
-                band_data = band_data.astype(np.float64)
+    Returns:
+        The packed coordinates, the scale factor, and the offset
+    """
+    valid = np.isfinite(coordinates)
+    if not valid.any():
+        return np.full(coordinates.shape, INT32_FILL, dtype=np.int32), 1.0, 0.0
 
-            out_ds.GetRasterBand(i + 1).WriteArray(band_data)
+    low, high = float(np.min(coordinates[valid])), float(np.max(coordinates[valid]))
+    offset = round((low + high) / 2, 6)
+    max_steps = np.iinfo(np.int32).max - 1
+    scale = max(COORDINATE_QUANTUM, max(high - offset, offset - low) / max_steps)
 
-    out_ds.FlushCache()
+    packed = np.full(coordinates.shape, INT32_FILL, dtype=np.int32)
+    packed[valid] = np.round((coordinates[valid] - offset) / scale).astype(np.int32)
+    return packed, scale, offset
 
-    return Path(burst_topo_nc)
+
+def write_static_nc(filename: str, layers: dict[str, np.ndarray], metadata: dict) -> None:
+    """Write a version 2 radar-geometry static topographic correction netCDF.
+
+    Compared to version 1 files (written with GDAL, all float64), the x/y coordinates are packed into int32
+    (see `quantize_coordinates`), z is float32, and the layover/shadow mask is uint8. Variables are compressed with
+    a fast DEFLATE level and byte shuffling, and chunked in strips of `STATIC_CHUNK_ROWS` rows.
+
+    Args:
+        filename: The static file to write
+        layers: The `x`, `y`, `z`, and `layover_shadow_mask` layers
+        metadata: The radar grid metadata, keyed by GDAL metadata name (e.g., `NC_GLOBAL#sensing_start`)
+    """
+    rows, cols = layers['x'].shape
+    chunks = (min(rows, STATIC_CHUNK_ROWS), cols)
+
+    with netCDF4.Dataset(filename, 'w', format='NETCDF4') as nc:
+        nc.setncattr('static_file_version', STATIC_FILE_VERSION)
+        for key, value in metadata.items():
+            nc.setncattr(key.removeprefix('NC_GLOBAL#'), str(value))
+
+        nc.createDimension('y', rows)
+        nc.createDimension('x', cols)
+
+        # GDAL reads netCDF variables without coordinate variables bottom-up (like it writes them),
+        # so rows are stored flipped to read the same as version 1 files
+        for name in ('x', 'y'):
+            packed, scale, offset = quantize_coordinates(layers[name].astype(np.float64))
+            var = nc.createVariable(
+                name, 'i4', ('y', 'x'), fill_value=INT32_FILL, zlib=True, complevel=1, shuffle=True, chunksizes=chunks
+            )
+            var.setncatts({'scale_factor': scale, 'add_offset': offset})
+            var.set_auto_maskandscale(False)  # already packed
+            var[:] = packed[::-1]
+
+        var = nc.createVariable(
+            'z', 'f4', ('y', 'x'), fill_value=np.nan, zlib=True, complevel=1, shuffle=True, chunksizes=chunks
+        )
+        var[:] = layers['z'].astype(np.float32)[::-1]
+
+        var = nc.createVariable(
+            'layover_shadow_mask',
+            'u1',
+            ('y', 'x'),
+            fill_value=False,
+            zlib=True,
+            complevel=1,
+            shuffle=True,
+            chunksizes=chunks,
+        )
+        var[:] = layers['layover_shadow_mask'].astype(np.uint8)[::-1]
@@ -2,22 +2,31 @@
 
 import json
 import logging
+import math
 import os
+import threading
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Tuple, Union
+from urllib.parse import urlparse
 
 import boto3
 import numpy as np
+import requests
 from burst2safe.safe import Safe
 from burst2safe.utils import BurstInfo
 from hyp3lib import DemError
 from hyp3lib.aws import get_content_type, get_tag_set
 from netCDF4 import Dataset
 from osgeo import gdal, ogr, osr
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from hyp3_autorift.geometry import fix_point_for_antimeridian, flip_point_coordinates
+from hyp3_autorift.parameters import get_parameter_catalog
 
 
 log = logging.getLogger(__name__)
@@ -52,8 +61,7 @@ def upload_file_to_s3_with_publish_access_keys(
 
 
 def find_jpl_parameter_info(polygon: ogr.Geometry, parameter_file: str, flip_point: bool = True) -> dict:
-    driver = ogr.GetDriverByName('ESRI Shapefile')
-    shapes = driver.Open(parameter_file, gdal.GA_ReadOnly)
+    catalog = get_parameter_catalog(parameter_file)
 
     parameter_info = None
 
@@ -63,47 +71,46 @@ def find_jpl_parameter_info(polygon: ogr.Geometry, parameter_file: str, flip_poi
         centroid = polygon.Centroid()
 
     centroid = fix_point_for_antimeridian(centroid)
-    for feature in shapes.GetLayer(0):
-        if feature.geometry().Contains(centroid):
-            parameter_info = {
-                'name': f'{feature["name"]}',
-                'epsg': feature['epsg'],
-                'geogrid': {
-                    'dem': f'/vsicurl/{feature["h"]}',
-                    'ssm': f'/vsicurl/{feature["StableSurfa"]}',
-                    'dhdx': f'/vsicurl/{feature["dhdx"]}',
-                    'dhdy': f'/vsicurl/{feature["dhdy"]}',
-                    'vx': f'/vsicurl/{feature["vx0"]}',
-                    'vy': f'/vsicurl/{feature["vy0"]}',
-                    'srx': f'/vsicurl/{feature["vxSearchRan"]}',
-                    'sry': f'/vsicurl/{feature["vySearchRan"]}',
-                    'csminx': f'/vsicurl/{feature["xMinChipSiz"]}',
-                    'csminy': f'/vsicurl/{feature["yMinChipSiz"]}',
-                    'csmaxx': f'/vsicurl/{feature["xMaxChipSiz"]}',
-                    'csmaxy': f'/vsicurl/{feature["yMaxChipSiz"]}',
-                    'sp': f'/vsicurl/{feature["sp"]}',
-                    'dhdxs': f'/vsicurl/{feature["dhdxs"]}',
-                    'dhdys': f'/vsicurl/{feature["dhdys"]}',
-                },
-                'autorift': {
-                    'grid_location': 'window_location.tif',
-                    'init_offset': 'window_offset.tif',
-                    'search_range': 'window_search_range.tif',
-                    'chip_size_min': 'window_chip_size_min.tif',
-                    'chip_size_max': 'window_chip_size_max.tif',
-                    'offset2vx': 'window_rdr_off2vel_x_vec.tif',
-                    'offset2vy': 'window_rdr_off2vel_y_vec.tif',
-                    'stable_surface_mask': 'window_stable_surface_mask.tif',
-                    'scale_factor': 'window_scale_factor.tif',
-                    'mpflag': 0,
-                },
-            }
-            break
+    if (feature := catalog.find(centroid)) is not None:
+        parameter_info = {
+            'name': f'{feature["name"]}',
+            'epsg': feature['epsg'],
+            'geogrid': {
+                'dem': f'/vsicurl/{feature["h"]}',
+                'ssm': f'/vsicurl/{feature["StableSurfa"]}',
+                'dhdx': f'/vsicurl/{feature["dhdx"]}',
+                'dhdy': f'/vsicurl/{feature["dhdy"]}',
+                'vx': f'/vsicurl/{feature["vx0"]}',
+                'vy': f'/vsicurl/{feature["vy0"]}',
+                'srx': f'/vsicurl/{feature["vxSearchRan"]}',
+                'sry': f'/vsicurl/{feature["vySearchRan"]}',
+                'csminx': f'/vsicurl/{feature["xMinChipSiz"]}',
+                'csminy': f'/vsicurl/{feature["yMinChipSiz"]}',
+                'csmaxx': f'/vsicurl/{feature["xMaxChipSiz"]}',
+                'csmaxy': f'/vsicurl/{feature["yMaxChipSiz"]}',
+                'sp': f'/vsicurl/{feature["sp"]}',
+                'dhdxs': f'/vsicurl/{feature["dhdxs"]}',
+                'dhdys': f'/vsicurl/{feature["dhdys"]}',
+            },
+            'autorift': {
+                'grid_location': 'window_location.tif',
+                'init_offset': 'window_offset.tif',
+                'search_range': 'window_search_range.tif',
+                'chip_size_min': 'window_chip_size_min.tif',
+                'chip_size_max': 'window_chip_size_max.tif',
+                'offset2vx': 'window_rdr_off2vel_x_vec.tif',
+                'offset2vy': 'window_rdr_off2vel_y_vec.tif',
+                'stable_surface_mask': 'window_stable_surface_mask.tif',
+                'scale_factor': 'window_scale_factor.tif',
+                'mpflag': 0,
+                'tiles': 1,
+            },
+        }
 
     if parameter_info is None:
         raise DemError(f'Could not determine appropriate DEM for:\n    centroid: {centroid}    using: {parameter_file}')
 
-    dem_geotransform = gdal.Info(parameter_info['geogrid']['dem'], format='json')['geoTransform']
+    dem_geotransform = catalog.get_geotransform(parameter_info['geogrid']['dem'])
     parameter_info['xsize'] = abs(dem_geotransform[1])
     parameter_info['ysize'] = abs(dem_geotransform[5])
 
@@ -171,6 +178,7 @@ def ensure_same_projection(reference_path: Union[str, Path], secondary_path: Uni
         yRes=ref_info['geoTransform'][5],
         resampleAlg='lanczos',
         targetAlignedPixels=True,
+        multithread=True,
     )
     gdal.Warp(
         reprojected_secondary,
@@ -180,11 +188,252 @@ def ensure_same_projection(reference_path: Union[str, Path], secondary_path: Uni
         yRes=ref_info['geoTransform'][5],
         resampleAlg='lanczos',
         targetAlignedPixels=True,
+        multithread=True,
     )
 
     return reprojected_reference, reprojected_secondary
 
 
+def get_cgroup_cpu_limit(cgroup_root: Path = Path('/sys/fs/cgroup')) -> float | None:
+    """Get the CPU limit imposed on this process by a cgroup CPU quota (e.g., a container's vCPUs), if any.
+
+    Args:
+        cgroup_root: Mount point of the cgroup filesystem
+
+    Returns:
+        The (possibly fractional) number of CPUs the quota allows, or None if there is no quota
+    """
+    cpu_max = cgroup_root / 'cpu.max'  # cgroup v2
+    if cpu_max.exists():
+        v2_quota, _, v2_period = cpu_max.read_text().strip().partition(' ')
+        if v2_quota == 'max':
+            return None
+        return int(v2_quota) / int(v2_period or 100_000)
+
+    cfs_quota = cgroup_root / 'cpu' / 'cpu.cfs_quota_us'  # cgroup v1
+    cfs_period = cgroup_root / 'cpu' / 'cpu.cfs_period_us'
+    if cfs_quota.exists() and cfs_period.exists():
+        v1_quota_us = int(cfs_quota.read_text())
+        if v1_quota_us <= 0:
+            return None
+        return v1_quota_us / int(cfs_period.read_text())
+
+    return None
+
+
+def get_available_cpus() -> int:
+    """Get the number of CPUs this process can actually use, respecting CPU affinity and cgroup CPU quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        cpu_limit = get_cgroup_cpu_limit()
+    except (OSError, ValueError):
+        cpu_limit = None
+
+    if cpu_limit is not None:
+        cpus = min(cpus, math.floor(cpu_limit))
+
+    return max(cpus, 1)
+
+
+def configure_workers(workers: int | None = None) -> int:
+    """Determine the number of workers to use and configure GDAL to use that many threads.
+
+    Args:
+        workers: Number of workers to use; if None or less than 1, use all available CPUs
+
+    Returns:
+        The number of workers to use
+    """
+    if workers is None or workers < 1:
+        workers = get_available_cpus()
+
+    # Set config and env for new CXX threads in Geogrid/autoRIFT
+    gdal.SetConfigOption('GDAL_NUM_THREADS', str(workers))
+    os.environ['GDAL_NUM_THREADS'] = str(workers)
+
+    log.info(f'Using {workers} workers')
+    return workers
+
+
+def get_autorift_mpflag(workers: int) -> int:
+    """Get the autoRIFT `mpflag` for a number of workers; 0 selects autoRIFT's original single-core routine."""
+    return workers if workers > 1 else 0
+
+
+class DownloadProgress:
+    """Thread-safe byte counter that logs the progress and bandwidth of a download.
+
+    Args:
+        name: Name of the download to report
+        total_bytes: Expected size of the download, if known
+        report_fraction: Log the progress every time this fraction of the download completes
+    """
+
+    def __init__(self, name: str, total_bytes: int | None = None, report_fraction: float = 0.1):
+        self.name = name
+        self.total_bytes = total_bytes
+        self.bytes = 0
+        self.start = time.monotonic()
+        self._report_fraction = report_fraction
+        self._next_report = report_fraction
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    @property
+    def rate(self) -> float:
+        """Average bandwidth in MB/s"""
+        return self.bytes / 1e6 / max(self.elapsed, 1e-6)
+
+    def update(self, num_bytes: int) -> None:
+        with self._lock:
+            self.bytes += num_bytes
+            if not self.total_bytes or self.bytes / self.total_bytes < self._next_report:
+                return
+            while self._next_report <= self.bytes / self.total_bytes:
+                self._next_report += self._report_fraction
+            log.info(f'{self.name}: {self.bytes / self.total_bytes:.0%} ({self.rate:.1f} MB/s)')
+
+    def finish(self) -> None:
+        log.info(f'Downloaded {self.name}: {self.bytes / 1e6:.1f} MB in {self.elapsed:.1f} s ({self.rate:.1f} MB/s)')
+
+
+def get_download_session(retries: int = 2, backoff_factor: float = 1, pool_size: int = 10) -> requests.Session:
+    """Create a requests session that retries failed connections and server errors."""
+    session = requests.Session()
+    retry_strategy = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _get_content_range_size(response: requests.Response) -> int | None:
+    if response.status_code != 206:
+        return None
+    size = response.headers.get('Content-Range', '').rpartition('/')[2]
+    return int(size) if size.isdigit() else None
+
+
+def split_byte_range(size: int, parts: int, min_part_size: int = 1) -> list[tuple[int, int]]:
+    """Split `size` bytes into at most `parts` contiguous, inclusive `(start, end)` byte ranges.
+
+    Args:
+        size: Number of bytes to split
+        parts: Maximum number of ranges
+        min_part_size: Minimum size of each range, except possibly the last
+
+    Returns:
+        The byte ranges, in order
+    """
+    parts = max(1, min(parts, size // max(min_part_size, 1)))
+    bounds = np.linspace(0, size, parts + 1).astype(int)
+    return [(int(start), int(end) - 1) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _download_byte_range(
+    session: requests.Session, url: str, filename: str, byte_range: tuple[int, int], chunk_size: int, progress
+) -> None:
+    start, end = byte_range
+    with session.get(url, headers={'Range': f'bytes={start}-{end}'}, stream=True) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise RuntimeError(f'Range request for bytes {start}-{end} of {url} was not honored')
+
+        position = start
+        with open(filename, 'r+b') as f:
+            f.seek(start)
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    position += len(chunk)
+                    progress.update(len(chunk))
+
+    if position != end + 1:
+        raise RuntimeError(f'Expected {end + 1 - start} bytes from {url}, but received {position - start}')
+
+
+def download_file_in_parts(
+    url: str,
+    directory: Union[str, Path] = '.',
+    parts: int = 4,
+    chunk_size: int = 5242880,
+    retries: int = 2,
+    backoff_factor: float = 1,
+) -> str:
+    """Download a file using several concurrent HTTP range requests.
+
+    Redirects (and authentication, e.g., with a `.netrc`) are resolved once, and then each part of the file is
+    requested from the resolved URL and written to its place in the output file. If the server does not support range
+    requests, the file is downloaded with a single streamed request instead.
+
+    Args:
+        url: URL of the file to download
+        directory: Directory to download the file to
+        parts: Maximum number of concurrent range requests
+        chunk_size: Size of the chunks to stream; parts are at least this big
+        retries: Number of times to retry a failed request
+        backoff_factor: Backoff factor between retries
+
+    Returns:
+        The path of the downloaded file
+    """
+    filename = os.path.join(directory, os.path.basename(urlparse(url).path))
+    partial_filename = f'{filename}.partial'
+    name = os.path.basename(filename)
+
+    with get_download_session(retries, backoff_factor, pool_size=max(parts, 1)) as session:
+        with session.get(url, headers={'Range': 'bytes=0-0'}, stream=True) as response:
+            response.raise_for_status()
+            resolved_url = response.url
+            size = _get_content_range_size(response)
+
+        try:
+            if size is None:
+                progress = DownloadProgress(name)
+                with session.get(url, stream=True) as response:
+                    response.raise_for_status()
+                    progress.total_bytes = int(response.headers.get('Content-Length', 0)) or None
+                    with open(partial_filename, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if chunk:
+                                f.write(chunk)
+                                progress.update(len(chunk))
+            else:
+                progress = DownloadProgress(name, size)
+                byte_ranges = split_byte_range(size, parts, min_part_size=chunk_size)
+                with open(partial_filename, 'wb') as f:
+                    f.truncate(size)
+                with ThreadPoolExecutor(max_workers=len(byte_ranges) or 1) as executor:
+                    futures = [
+                        executor.submit(
+                            _download_byte_range,
+                            session,
+                            resolved_url,
+                            partial_filename,
+                            byte_range,
+                            chunk_size,
+                            progress,
+                        )
+                        for byte_range in byte_ranges
+                    ]
+                    for future in futures:
+                        future.result()
+        except BaseException:
+            Path(partial_filename).unlink(missing_ok=True)
+            raise
+
+    os.replace(partial_filename, filename)
+    progress.finish()
+    return filename
+
+
 def nullable_string(argument_string: str) -> str | None:
     argument_string = argument_string.replace('None', '').strip()
     return argument_string if argument_string else None
@@ -1211,6 +1211,28 @@ def netCDF_packaging(
     return out_nc_filename
 
 
+def nearest_grid_index(grid, values):
+    """Find the index of the nearest grid point for each value.
+
+    Equivalent to `np.argmin(np.abs(grid - value))` for each value, including resolving ties to the lower index, but
+    uses a binary search over the (ascending) grid instead of a full scan.
+
+    Args:
+        grid: 1D ascending array of grid coordinates
+        values: Array of coordinates to locate on the grid
+
+    Returns:
+        Array of grid indices with the same shape as `values`
+    """
+    values = np.asarray(values)
+    if len(grid) == 1:
+        return np.zeros(values.shape, dtype=np.intp)
+
+    index = np.clip(np.searchsorted(grid, values), 1, len(grid) - 1)
+    index -= (values - grid[index - 1]) <= (grid[index] - values)
+    return index
+
+
 def rotate_vel2radar(rngind, azmind, vel_x, vel_y, swath_border, swath_border_full, GridSpacingX, ScaleChipSizeY, flag):
     ncols = np.nanmax(rngind) + 1
     nrows = np.nanmax(azmind) + 1
@@ -1230,15 +1252,16 @@ def rotate_vel2radar(rngind, azmind, vel_x, vel_y, swath_border, swath_border_fu
     output_vel_x = np.zeros(rngind1.shape) * np.nan
     output_vel_y = np.zeros(rngind1.shape) * np.nan
 
-    for irow in range(rngind.shape[0]):
-        for icol in range(rngind.shape[1]):
-            tempcol = rngind[irow, icol]
-            temprow = azmind[irow, icol]
-            if (~np.isnan(tempcol)) & (~np.isnan(temprow)):
-                tempcol = np.argmin(np.abs(xGrid - rngind[irow, icol]))
-                temprow = np.argmin(np.abs(yGrid - azmind[irow, icol]))
-                output_vel_x[temprow, tempcol] = vel_x[irow, icol]
-                output_vel_y[temprow, tempcol] = vel_y[irow, icol]
+    valid = ~np.isnan(rngind) & ~np.isnan(azmind)
+    tempcol = nearest_grid_index(xGrid, rngind[valid])
+    temprow = nearest_grid_index(yGrid, azmind[valid])
+
+    # Several pixels can map to the same grid cell; keep the last one in row-major order
+    target = np.ravel_multi_index((temprow, tempcol), output_vel_x.shape)
+    _, last = np.unique(target[::-1], return_index=True)
+    last = target.size - 1 - last
+    output_vel_x.flat[target[last]] = vel_x[valid][last]
+    output_vel_y.flat[target[last]] = vel_y[valid][last]
 
     shift = 500
 
@@ -1266,15 +1289,8 @@ def rotate_vel2radar(rngind, azmind, vel_x, vel_y, swath_border, swath_border_fu
     output_vel_x1 = vel_x.copy()
     output_vel_y1 = vel_y.copy()
 
-    for irow in range(rngind.shape[0]):
-        for icol in range(rngind.shape[1]):
-            tempcol = rngind[irow, icol]
-            temprow = azmind[irow, icol]
-            if (~np.isnan(tempcol)) & (~np.isnan(temprow)):
-                tempcol = np.argmin(np.abs(xGrid - rngind[irow, icol]))
-                temprow = np.argmin(np.abs(yGrid - azmind[irow, icol]))
-                output_vel_x1[irow, icol] = output_vel_x[temprow, tempcol]
-                output_vel_y1[irow, icol] = output_vel_y[temprow, tempcol]
+    output_vel_x1[valid] = output_vel_x[temprow, tempcol]
+    output_vel_y1[valid] = output_vel_y[temprow, tempcol]
 
     output_vel_x1[np.isnan(vel_x)] = np.nan
     output_vel_y1[np.isnan(vel_y)] = np.nan
@@ -1283,16 +1299,9 @@ def rotate_vel2radar(rngind, azmind, vel_x, vel_y, swath_border, swath_border_fu
 
 
 def getPol(safe, orbit_path):
-    from s1reader import load_bursts
+    from hyp3_autorift.s1_metadata import get_pol
 
-    pols = ['vv', 'vh', 'hh', 'hv']
-    for pol in pols:
-        try:
-            bursts = load_bursts(safe, orbit_path, 1, pol)
-            print('Polarization ' + pol)
-            return pol
-        except:
-            pass
+    return get_pol(safe, orbit_path)
 
 
 def loadMetadata(indir):
@@ -1302,7 +1311,7 @@ def loadMetadata(indir):
     import os
     import numpy as np
     from datetime import datetime
-    from s1reader import load_bursts
+    from hyp3_autorift.s1_metadata import load_bursts
     import glob
 
     orbits = glob.glob('*.EOF')
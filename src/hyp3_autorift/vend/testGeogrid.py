@@ -37,9 +37,9 @@ import isce3
 import numpy as np
 from geogrid import GeogridOptical, GeogridRadar
 from osgeo import gdal
-from s1reader import load_bursts
 
-from nisar.products.readers import product
+from hyp3_autorift import nisar_products
+from hyp3_autorift.s1_metadata import get_pol, load_bursts
 
 log = logging.getLogger(__name__)
 
@@ -94,16 +94,7 @@ class Dummy(object):
 
 
 def getPol(safe, orbit_path):
-    pols = ['vv', 'vh', 'hh', 'hv']
-    for pol in pols:
-        for swath in [1, 2, 3]:
-            try:
-                _ = load_bursts(safe, orbit_path, swath, pol)
-                print(f'Polarization {pol}')
-                return pol
-            except:
-                pass
-    raise ValueError(f'No polarization information found for {safe}.')
+    return get_pol(safe, orbit_path)
 
 
 def getMergedOrbit(safe, orbit_path, swath):
@@ -224,8 +215,8 @@ def loadMetadataRslc(ref_rslc: str, buffer: float = 0.0, orbit_path: str = ''):
     Input file.
     """
     info = Dummy()
-    rslc =  product.open_product(ref_rslc)
-    metadata = rslc.getSwathMetadata()
+    rslc = nisar_products.open_product(ref_rslc)
+    metadata = nisar_products.get_swath_metadata(ref_rslc)
 
     slant_ranges = metadata.slant_range
     info.startingRange = slant_ranges[0]
@@ -261,7 +252,7 @@ def loadMetadataRslc(ref_rslc: str, buffer: float = 0.0, orbit_path: str = ''):
     print(f'Number of Samples: {info.numberOfSamples}')
 
     info.orbitname = orbit_path
-    info.orbit = rslc.getOrbit()
+    info.orbit = nisar_products.get_orbit(ref_rslc)
     info.absoluteOrbitNumber = rslc.identification.absoluteOrbitNumber
     info.orbitPassDirection = rslc.identification.orbitPassDirection
 
@@ -29,12 +29,15 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 import argparse
+import copy
 import glob
+import multiprocessing
 import os
 import re
 import subprocess
 import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -44,10 +47,10 @@ from autoRIFT import __version__ as version
 from autoRIFT import autoRIFT
 from geogrid import GeogridOptical
 from osgeo import gdal
-from s1reader import load_bursts
 from nisar.products.readers import product
 
 import hyp3_autorift.vend.netcdf_output as no
+from hyp3_autorift.s1_metadata import load_bursts
 from hyp3_autorift.vend.testGeogrid import getPol, loadMetadataRslc
 
 
@@ -218,6 +221,15 @@ def cmdLineParse():
         default=0,
         help='number of threads for multiple threading (default is specified by 0, which uses the original single-core version and surpasses the multithreading routine)',
     )
+    parser.add_argument(
+        '-tiles',
+        '--tiles',
+        dest='tiles',
+        type=int,
+        required=False,
+        default=1,
+        help='number of grid strips to process in parallel processes (default is 1, which processes the whole grid at once)',
+    )
     parser.add_argument(
         '-ncname',
         '--ncname',
@@ -272,6 +284,205 @@ def loadProductOptical(file_m, file_s):
     return I1, I2
 
 
+def _iter_valid_grid_nodes(xGrid, yGrid, nodata, batch_rows):
+    """Yield (row slice, valid node mask, pixel row indices, pixel column indices) for batches of grid rows.
+
+    Grid locations are 1-based pixel indices, so the returned pixel indices are shifted by one to index the image
+    arrays directly. Batching bounds the size of the temporary index arrays for very large grids.
+    """
+    for start in range(0, xGrid.shape[0], batch_rows):
+        rows = slice(start, start + batch_rows)
+        x = xGrid[rows]
+        y = yGrid[rows]
+        valid = (y != nodata) & (x != nodata)
+        yield rows, valid, y[valid].astype(np.intp) - 1, x[valid].astype(np.intp) - 1
+
+
+def mask_zero_pixels(noDataMask, xGrid, yGrid, nodata, images, batch_rows=1024):
+    """Flag grid nodes that fall on a zero-valued pixel in any of the images.
+
+    Args:
+        noDataMask: Boolean grid mask to update in place
+        xGrid: Pixel column (1-based) of each grid node
+        yGrid: Pixel row (1-based) of each grid node
+        nodata: Grid nodata value; nodes with a nodata location are left untouched
+        images: Images to sample at each grid node
+        batch_rows: Number of grid rows to process at once
+
+    Returns:
+        The updated `noDataMask`
+    """
+    for rows, valid, pixel_rows, pixel_cols in _iter_valid_grid_nodes(xGrid, yGrid, nodata, batch_rows):
+        is_zero = np.zeros(pixel_rows.shape, dtype=bool)
+        for image in images:
+            is_zero |= image[pixel_rows, pixel_cols] == 0
+        noDataMask[rows][valid] |= is_zero
+    return noDataMask
+
+
+def mask_from_zero_mask(noDataMask, xGrid, yGrid, nodata, zero_mask, batch_rows=1024):
+    """Set the grid mask from the image zero mask at each grid node.
+
+    Args:
+        noDataMask: Boolean grid mask to update in place
+        xGrid: Pixel column (1-based) of each grid node
+        yGrid: Pixel row (1-based) of each grid node
+        nodata: Grid nodata value; nodes with a nodata location are left untouched
+        zero_mask: Image mask of zero-valued (invalid) pixels
+        batch_rows: Number of grid rows to process at once
+
+    Returns:
+        The updated `noDataMask`
+    """
+    for rows, valid, pixel_rows, pixel_cols in _iter_valid_grid_nodes(xGrid, yGrid, nodata, batch_rows):
+        noDataMask[rows][valid] = zero_mask[pixel_rows, pixel_cols]
+    return noDataMask
+
+
+def split_grid_rows(n_rows, tiles, chop_factor, halo):
+    """Split the grid rows into horizontal strips for tiled autoRIFT processing.
+
+    Strip boundaries are aligned to `chop_factor` so the nested (coarse) grids autoRIFT builds for each strip line up
+    with those of the full grid. Fewer strips than requested are used if needed to keep each strip's core at least
+    twice the halo, so most of the rows a strip processes are its own.
+
+    Args:
+        n_rows: Number of grid rows
+        tiles: Requested number of strips
+        chop_factor: Ratio of the largest chip size to the smallest chip size
+        halo: Number of extra grid rows to process on either side of each strip
+
+    Returns:
+        A list of `(core, extended)` row slices; `core` are the rows each strip contributes to the stitched output and
+        `extended` are the rows it processes, including the halo
+    """
+    n_chops = n_rows // chop_factor
+    halo = int(np.ceil(halo / chop_factor)) * chop_factor
+    tiles = max(1, min(tiles, n_rows // max(chop_factor, 2 * halo)))
+
+    bounds = [int(b) * chop_factor for b in np.linspace(0, n_chops, tiles + 1).round()]
+    bounds[-1] = n_rows
+
+    strips = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        strips.append((slice(start, stop), slice(max(0, start - halo), min(n_rows, stop + halo))))
+    return strips
+
+
+def _tile_rows(value, rows):
+    if np.size(value) == 1:
+        return value
+    return value[rows].copy()
+
+
+def _crop_autorift_tile(obj, rows, chop_factor):
+    """Build an autoRIFT object for a strip of grid rows, cropping the images to what the strip can search."""
+    tile = copy.copy(obj)
+    tile.MultiThread = 0
+    for name in ('xGrid', 'yGrid', 'Dx0', 'Dy0', 'SearchLimitX', 'SearchLimitY', 'ChipSizeMaxX', 'ChipSizeMinX'):
+        setattr(tile, name, _tile_rows(getattr(obj, name), rows))
+
+    valid = tile.yGrid > 0
+    if not np.any(valid):
+        return None
+
+    chip_size_y = np.max(obj.ChipSizeMaxX) * getattr(obj, 'ScaleChipSizeY', 1)
+    # Generous: the chip, twice the search limit (coarse-to-fine searches re-center), and the initial offset
+    pad = int(np.ceil(1.5 * chip_size_y + 2 * np.max(np.abs(tile.SearchLimitY)) + np.max(np.abs(tile.Dy0))))
+    first_row = max(0, int(np.min(tile.yGrid[valid])) - 1 - pad)
+    last_row = min(obj.I1.shape[0], int(np.max(tile.yGrid[valid])) + pad)
+
+    tile.I1 = obj.I1[first_row:last_row].copy()
+    tile.I2 = obj.I2[first_row:last_row].copy()
+    tile.yGrid[valid] -= first_row
+    return tile
+
+
+def get_tile_halo(obj, chop_factor):
+    """Get the number of extra grid rows each strip of a tiled autoRIFT run needs on either side.
+
+    The halo covers the largest chip and search window (in grid rows, from the grid spacing) and the filter autoRIFT
+    applies to the nested grid of the largest chip size, whose nodes are `chop_factor` grid rows apart.
+
+    Args:
+        obj: A fully configured autoRIFT object
+        chop_factor: Ratio of the largest chip size to the smallest chip size
+
+    Returns:
+        The number of halo grid rows
+    """
+    valid = obj.yGrid > 0
+    steps = np.abs(np.diff(obj.yGrid, axis=0))[valid[1:] & valid[:-1]]
+    steps = steps[steps > 0]
+    spacing = float(np.median(steps)) if steps.size else 1.0
+
+    chip_size_y = np.max(obj.ChipSizeMaxX) * getattr(obj, 'ScaleChipSizeY', 1)
+    search_rows = int(np.ceil((chip_size_y / 2 + np.max(np.abs(obj.SearchLimitY))) / spacing))
+    filter_rows = (getattr(obj, 'FiltWidth', 5) // 2 + 1) * chop_factor
+    return max(search_rows, filter_rows)
+
+
+def _run_autorift_tile(tile):
+    tile.runAutorift()
+    return tile.Dx, tile.Dy, tile.InterpMask, tile.ChipSizeX, tile.SearchLimitX, tile.SearchLimitY
+
+
+def run_autorift_tiled(obj, tiles, max_workers=None, halo=None):
+    """Run autoRIFT over horizontal strips of the grid in a process pool and stitch the results together.
+
+    Each strip is processed with `halo` extra grid rows on either side (and all of the image rows its chips and search
+    windows can reach), so the chip matching and local filtering near a strip's edges see the same neighboring grid
+    nodes as in a single full-grid run. autoRIFT's gap-filling interpolates over the whole (strip) grid, so results
+    near large gaps and masked areas can differ slightly from a full-grid run. The stitched `Dx`, `Dy`, `InterpMask`,
+    `ChipSizeX`, `SearchLimitX`, `SearchLimitY`, and `origSize` attributes are set on `obj` just like
+    `obj.runAutorift()` does.
+
+    Args:
+        obj: A fully configured autoRIFT object
+        tiles: Number of strips to split the grid into
+        max_workers: Maximum number of processes to use; defaults to `tiles`
+        halo: Number of extra grid rows to process on either side of each strip; defaults to `get_tile_halo`
+    """
+    if np.size(obj.ChipSizeMaxX) == 1:
+        chop_factor = int(np.round(obj.ChipSizeMaxX / obj.ChipSize0X))
+    else:
+        chop_factor = int(np.round(np.max(obj.ChipSizeMaxX) / obj.ChipSize0X))
+    chop_factor = max(chop_factor, 1)
+
+    if halo is None:
+        halo = get_tile_halo(obj, chop_factor)
+
+    n_rows, n_cols = obj.xGrid.shape
+    strips = split_grid_rows(n_rows, tiles, chop_factor, halo)
+    tile_objs = [_crop_autorift_tile(obj, extended, chop_factor) for _, extended in strips]
+
+    if len(strips) == 1 or all(tile is None for tile in tile_objs):
+        obj.runAutorift()
+        return
+
+    # Spawn (rather than fork) workers: the parent has already used OpenCV/OpenMP thread pools, which aren't fork-safe
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers or len(strips), mp_context=context) as executor:
+        futures = [executor.submit(_run_autorift_tile, tile) if tile is not None else None for tile in tile_objs]
+        results = [future.result() if future is not None else None for future in futures]
+
+    rlim = (n_rows // chop_factor) * chop_factor
+    clim = (n_cols // chop_factor) * chop_factor
+    template = next(result for result in results if result is not None)
+    fill_values = (np.nan, np.nan, 0, 0, 0, 0)
+    stitched = [np.full((rlim, clim), fill, dtype=array.dtype) for array, fill in zip(template, fill_values)]
+
+    for (core, extended), result in zip(strips, results):
+        if result is None:
+            continue
+        rows = slice(core.start - extended.start, min(core.stop, rlim) - extended.start)
+        for out, array in zip(stitched, result):
+            out[core.start : min(core.stop, rlim)] = array[rows]
+
+    obj.Dx, obj.Dy, obj.InterpMask, obj.ChipSizeX, obj.SearchLimitX, obj.SearchLimitY = stitched
+    obj.origSize = (n_rows, n_cols)
+
+
 def runAutorift(
     indir_m,
     indir_s,
@@ -294,6 +505,7 @@ def runAutorift(
     preprocessing_methods=('hps', 'hps'),
     preprocessing_filter_width=5,
     zero_mask=None,
+    tiles=1,
 ):
     """
     Wire and run geogrid.
@@ -335,18 +547,9 @@ def runAutorift(
     #        generate the nodata mask where offset searching will be skipped based on 1) imported nodata mask and/or 2) zero values in the image
     # TODO: Is this necessary for radar images?
     if 'wallis_fill' not in preprocessing_methods:
-        for ii in range(obj.xGrid.shape[0]):
-            for jj in range(obj.xGrid.shape[1]):
-                if (obj.yGrid[ii, jj] != nodata) & (obj.xGrid[ii, jj] != nodata):
-                    if (obj.I1[obj.yGrid[ii, jj] - 1, obj.xGrid[ii, jj] - 1] == 0) | (
-                        obj.I2[obj.yGrid[ii, jj] - 1, obj.xGrid[ii, jj] - 1] == 0
-                    ):
-                        noDataMask[ii, jj] = True
+        mask_zero_pixels(noDataMask, obj.xGrid, obj.yGrid, nodata, (obj.I1, obj.I2))
     elif zero_mask is not None:
-        for ii in range(obj.xGrid.shape[0]):
-            for jj in range(obj.xGrid.shape[1]):
-                if (obj.yGrid[ii, jj] != nodata) & (obj.xGrid[ii, jj] != nodata):
-                    noDataMask[ii, jj] = zero_mask[obj.yGrid[ii,jj]-1,obj.xGrid[ii,jj]-1]
+        mask_from_zero_mask(noDataMask, obj.xGrid, obj.yGrid, nodata, zero_mask)
 
     if SRx0 is None:
         obj.SearchLimitX = obj.SearchLimitX * np.logical_not(noDataMask)
@@ -512,7 +715,11 @@ def runAutorift(
     # run Autorift
     t1 = time.time()
     print('AutoRIFT Start!!!')
-    obj.runAutorift()
+    if tiles > 1:
+        print(f'Running autoRIFT in {tiles} tiles')
+        run_autorift_tiled(obj, tiles)
+    else:
+        obj.runAutorift()
     print('AutoRIFT Done!!!')
     print(time.time() - t1)
 
@@ -556,6 +763,7 @@ def main():
         nc_sensor=inps.nc_sensor,
         mpflag=inps.mpflag,
         ncname=inps.ncname,
+        tiles=inps.tiles,
     )
 
 
@@ -770,6 +978,7 @@ def generateAutoriftProduct(
             preprocessing_methods=preprocessing_methods,
             preprocessing_filter_width=preprocessing_filter_width,
             zero_mask=zero_mask,
+            tiles=kwargs.get('tiles', 1),
         )
         if nc_sensor is not None:
             no.netCDF_packaging_intermediate(
@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+
+from hyp3_autorift import cache
+
+
+def test_get_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv(cache.CACHE_DIR_ENV, raising=False)
+    assert cache.get_cache_dir('orbits') is None
+
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    assert cache.get_cache_dir('orbits') == tmp_path / 'cache' / 'orbits'
+    assert (tmp_path / 'cache' / 'orbits').is_dir()
+
+
+def test_publish_file(tmp_path):
+    src = tmp_path / 'foo.txt'
+    src.write_text('foo')
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+
+    assert cache.publish_file(src, cache_dir / 'foo.txt') == cache_dir / 'foo.txt'
+    assert (cache_dir / 'foo.txt').read_text() == 'foo'
+    assert src.exists()
+
+    src.write_text('bar')
+    cache.publish_file(src, cache_dir / 'foo.txt', move=True)
+    assert (cache_dir / 'foo.txt').read_text() == 'bar'
+    assert not src.exists()
+    assert list(cache_dir.iterdir()) == [cache_dir / 'foo.txt']
+
+
+def test_read_write_json(tmp_path):
+    assert cache.read_json(tmp_path / 'index.json', default={}) == {}
+
+    cache.write_json({'foo': [1, 2]}, tmp_path / 'index.json')
+    assert cache.read_json(tmp_path / 'index.json') == {'foo': [1, 2]}
+
+    (tmp_path / 'index.json').write_text('{"foo": ')
+    assert cache.read_json(tmp_path / 'index.json', default={}) == {}
+
+
+def test_file_lock(tmp_path):
+    with cache.file_lock(tmp_path / '.lock'):
+        assert (tmp_path / '.lock').exists()
+    with cache.file_lock(tmp_path / '.lock', shared=True):
+        pass
+
+
+def test_link_from_cache(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    cached_file = cache_dir / 'foo.txt'
+    cached_file.write_text('foo')
+    work_dir = tmp_path / 'work'
+    work_dir.mkdir()
+
+    local_file = cache.link_from_cache(cached_file, work_dir)
+    assert local_file == work_dir / 'foo.txt'
+    assert local_file.is_symlink()
+    assert local_file.read_text() == 'foo'
+
+    assert cache.link_from_cache(local_file.resolve(), cache_dir) == cache_dir / 'foo.txt'
+    assert Path(cached_file).read_text() == 'foo'
+
+
+def test_evict_lru(tmp_path):
+    for mtime, name in enumerate(['c.nc', 'a.nc', 'b.nc', 'd.nc']):
+        (tmp_path / name).write_bytes(b'x' * 10)
+        os.utime(tmp_path / name, (mtime, mtime))
+    (tmp_path / 'other.txt').write_bytes(b'x' * 100)
+
+    assert cache.evict_lru(tmp_path, max_bytes=40, pattern='*.nc') == []
+    assert cache.evict_lru(tmp_path, max_bytes=20, pattern='*.nc', keep=(tmp_path / 'c.nc',)) == [
+        tmp_path / 'a.nc',
+        tmp_path / 'b.nc',
+    ]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['c.nc', 'd.nc', 'other.txt']
+
+    assert cache.evict_lru(tmp_path, max_bytes=0, pattern='*.nc') == [tmp_path / 'c.nc', tmp_path / 'd.nc']
@@ -0,0 +1,54 @@
+import pytest
+from hyp3lib import DemError
+
+from hyp3_autorift import dem
+
+
+def test_get_tile_origins():
+    assert dem.get_tile_origins([-149.5, 61.2, -149.1, 61.9]) == [(-150, 61)]
+    assert dem.get_tile_origins([-149.5, 61.2, -148.0, 62.1]) == [(-150, 62), (-149, 62), (-150, 61), (-149, 61)]
+    assert dem.get_tile_origins([10.0, -1.0, 11.0, 0.0]) == [(10, -1)]
+    assert dem.get_tile_origins([10.0, -1.0, 10.0, -1.0]) == [(10, -1)]
+
+
+def test_get_tile_name():
+    assert dem.get_tile_name(-150, 61) == 'N61W150.tif'
+    assert dem.get_tile_name(5, -1) == 'S01E005.tif'
+    assert dem.get_tile_name(0, 0) == 'N00E000.tif'
+
+
+def test_snap_bounds():
+    assert dem.snap_bounds([-149.5004, 61.2, -148.70001, 61.9], 0.001) == pytest.approx([-149.501, 61.2, -148.7, 61.9])
+    assert dem.snap_bounds([0.25, 0.25, 0.75, 0.75], 0.5) == [0.0, 0.0, 1.0, 1.0]
+
+
+def test_get_dem_key():
+    key = dem.get_dem_key('/vsicurl/https://example.com/dem.vrt', 0.001, resample='cubic')
+    assert key.startswith('dem_0.001_')
+    assert key == dem.get_dem_key('/vsicurl/https://example.com/dem.vrt', 0.001, resample='cubic')
+    assert key != dem.get_dem_key('/vsicurl/https://example.com/dem.vrt', 0.001, resample='bilinear')
+    assert key != dem.get_dem_key('/vsicurl/https://example.com/dem.vrt', 0.002, resample='cubic')
+
+
+def test_fetch_cached_tile(tmp_path):
+    fetched = []
+
+    def fetch_tile(bounds, path):
+        fetched.append(bounds)
+        if bounds[1] < 0:
+            raise DemError('ocean')
+        path.write_text('tile')
+
+    tile = dem.fetch_cached_tile(tmp_path, (-150, 61), fetch_tile)
+    assert tile is not None
+    assert tile == tmp_path / 'N61W150.tif'
+    assert tile.read_text() == 'tile'
+    assert fetched == [[-150, 61, -149, 62]]
+
+    assert dem.fetch_cached_tile(tmp_path, (-150, 61), fetch_tile) == tile
+    assert len(fetched) == 1
+
+    assert dem.fetch_cached_tile(tmp_path, (-150, -61), fetch_tile) is None
+    assert (tmp_path / 'S61W150.empty').exists()
+    assert dem.fetch_cached_tile(tmp_path, (-150, -61), fetch_tile) is None
+    assert len(fetched) == 2
@@ -0,0 +1,37 @@
+import pytest
+
+from hyp3_autorift import footprints
+
+
+def test_get_s2_tile():
+    assert footprints.get_s2_tile('S2A_MSIL1C_20160616T112217_N0204_R137_T29QKF_20160617T193500') == '29QKF'
+    assert footprints.get_s2_tile('S2B_MSIL2A_20200913T151809_N0214_R068_T22WEB_20200913T180530') == '22WEB'
+    assert footprints.get_s2_tile('S2A_11UNA_20201203_0_L2A') == '11UNA'
+    assert footprints.get_s2_tile('LC08_L1TP_009011_20200703_20200913_02_T1') is None
+
+
+def test_get_square_origin():
+    assert footprints.get_square_origin('60CWU') == (500000, 1300000)
+    assert footprints.get_square_origin('55XEE') == (500000, 8400000)
+    assert footprints.get_square_origin('29QKF') == (200000, 2500000)
+
+    with pytest.raises(ValueError):
+        footprints.get_square_origin('61CWU')
+
+
+def test_get_s2_tile_bbox():
+    # compare with process.get_raster_bbox of the test data rasters
+    bbox = footprints.get_s2_tile_bbox('60CWU')
+    assert bbox == pytest.approx([-183.0008956, -78.4606571, -178.0958227, -77.438842], abs=0.002)
+    assert bbox[0] <= -183.0008956 and bbox[2] >= -178.0958227
+
+    bbox = footprints.get_s2_tile_bbox('55XEE')
+    assert bbox == pytest.approx([146.999228, 75.5641782, 151.2301741, 76.5810287], abs=0.002)
+    assert bbox[0] <= 146.999228 and bbox[3] >= 76.5810287
+
+
+def test_get_s2_scene_bbox():
+    assert footprints.get_s2_scene_bbox('S2A_MSIL1C_20160414T200612_N0201_R128_T60CWU_20160414T200613') == (
+        footprints.get_s2_tile_bbox('60CWU')
+    )
+    assert footprints.get_s2_scene_bbox('LC08_L1TP_009011_20200703_20200913_02_T1') is None
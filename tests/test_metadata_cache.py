@@ -0,0 +1,41 @@
+from hyp3_autorift import metadata_cache
+
+
+def test_metadata_cache(tmp_path, monkeypatch):
+    cache = metadata_cache.MetadataCache(tmp_path / 'metadata.sqlite')
+    assert cache.get('landsat-c2l1', 'LC08') is None
+
+    cache.put('landsat-c2l1', 'LC08', {'id': 'LC08', 'bbox': [0, 0, 1, 1]})
+    assert cache.get('landsat-c2l1', 'LC08') == {'id': 'LC08', 'bbox': [0, 0, 1, 1]}
+    assert cache.get('sentinel-2-c1-l2a', 'LC08') is None
+
+    cache.put('landsat-c2l1', 'LC08', {'id': 'LC08', 'bbox': [0, 0, 2, 2]})
+    reopened = metadata_cache.MetadataCache(tmp_path / 'metadata.sqlite')
+    assert reopened.get('landsat-c2l1', 'LC08') == {'id': 'LC08', 'bbox': [0, 0, 2, 2]}
+
+    now = metadata_cache.time.time()
+    cache.put('sentinel-2-c1-l2a', 'S2A', {'id': 'S2A'}, ttl=60)
+    assert cache.get('sentinel-2-c1-l2a', 'S2A') == {'id': 'S2A'}
+    monkeypatch.setattr(metadata_cache.time, 'time', lambda: now + 61)
+    assert cache.get('sentinel-2-c1-l2a', 'S2A') is None
+    assert cache.get('landsat-c2l1', 'LC08') is not None
+
+
+def test_get_cached_metadata(tmp_path, monkeypatch):
+    calls = []
+
+    def get_metadata():
+        calls.append(1)
+        return {'id': 'LC08'}
+
+    monkeypatch.delenv('HYP3_AUTORIFT_CACHE_DIR', raising=False)
+    assert metadata_cache.get_metadata_cache() is None
+    assert metadata_cache.get_cached_metadata('landsat-c2l1', 'LC08', get_metadata) == {'id': 'LC08'}
+    assert metadata_cache.get_cached_metadata('landsat-c2l1', 'LC08', get_metadata) == {'id': 'LC08'}
+    assert len(calls) == 2
+
+    monkeypatch.setenv('HYP3_AUTORIFT_CACHE_DIR', str(tmp_path))
+    assert metadata_cache.get_cached_metadata('landsat-c2l1', 'LC08', get_metadata) == {'id': 'LC08'}
+    assert metadata_cache.get_cached_metadata('landsat-c2l1', 'LC08', get_metadata) == {'id': 'LC08'}
+    assert len(calls) == 3
+    assert (tmp_path / 'metadata' / 'metadata.sqlite').exists()
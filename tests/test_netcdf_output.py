@@ -1,3 +1,8 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hyp3_autorift.vend import netcdf_output
 from hyp3_autorift.vend.netcdf_output import get_satellite_attribute
 
 
@@ -33,3 +38,71 @@ def test_get_satellite_attribute():
         'satellite_img2': '1B',
     }
     assert get_satellite_attribute(info_dict) == 'Sentinel-1A and Sentinel-1B'
+
+
+def _loop_rotate_vel2radar(rngind, azmind, vel_x, vel_y, swath_border, GridSpacingX, ScaleChipSizeY, flag):
+    ncols = np.nanmax(rngind) + 1
+    nrows = np.nanmax(azmind) + 1
+    xGrid = np.arange(0, ncols, GridSpacingX)
+    yGrid = np.arange(0, nrows, int(np.round(GridSpacingX * ScaleChipSizeY)))
+    rngind1 = np.dot(np.ones((len(yGrid), 1)), np.reshape(xGrid, (1, len(xGrid)))).astype(np.int32).astype(np.float32)
+
+    output_vel_x = np.zeros(rngind1.shape) * np.nan
+    output_vel_y = np.zeros(rngind1.shape) * np.nan
+    for irow in range(rngind.shape[0]):
+        for icol in range(rngind.shape[1]):
+            if ~np.isnan(rngind[irow, icol]) & ~np.isnan(azmind[irow, icol]):
+                tempcol = np.argmin(np.abs(xGrid - rngind[irow, icol]))
+                temprow = np.argmin(np.abs(yGrid - azmind[irow, icol]))
+                output_vel_x[temprow, tempcol] = vel_x[irow, icol]
+                output_vel_y[temprow, tempcol] = vel_y[irow, icol]
+
+    mask = (rngind1 > swath_border[flag] - 500) & (rngind1 < swath_border[flag] + 500)
+    output_vel_x[mask] = np.nan
+    output_vel_y[mask] = np.nan
+    output_vel_x = pd.DataFrame(output_vel_x).interpolate(method='linear', axis=1).to_numpy().astype('float32')
+    output_vel_y = pd.DataFrame(output_vel_y).interpolate(method='linear', axis=1).to_numpy().astype('float32')
+
+    output_vel_x1 = vel_x.copy()
+    output_vel_y1 = vel_y.copy()
+    for irow in range(rngind.shape[0]):
+        for icol in range(rngind.shape[1]):
+            if ~np.isnan(rngind[irow, icol]) & ~np.isnan(azmind[irow, icol]):
+                tempcol = np.argmin(np.abs(xGrid - rngind[irow, icol]))
+                temprow = np.argmin(np.abs(yGrid - azmind[irow, icol]))
+                output_vel_x1[irow, icol] = output_vel_x[temprow, tempcol]
+                output_vel_y1[irow, icol] = output_vel_y[temprow, tempcol]
+
+    output_vel_x1[np.isnan(vel_x)] = np.nan
+    output_vel_y1[np.isnan(vel_y)] = np.nan
+    return output_vel_x1, output_vel_y1
+
+
+def test_nearest_grid_index():
+    grid = np.arange(0, 100, 10)
+    values = np.array([-7.0, 0.0, 4.9, 5.0, 5.1, 44.0, 45.0, 95.0, 250.0])
+    expected = [np.argmin(np.abs(grid - value)) for value in values]
+    np.testing.assert_array_equal(netcdf_output.nearest_grid_index(grid, values), expected)
+
+    np.testing.assert_array_equal(netcdf_output.nearest_grid_index(np.array([0]), values), np.zeros(values.shape))
+
+
+@pytest.mark.parametrize('flag', [0, 1])
+def test_rotate_vel2radar(flag):
+    rng = np.random.default_rng(flag)
+    rows, cols = 60, 80
+    rngind = (np.arange(cols) * 37.5 + rng.normal(0, 5, (rows, cols))).astype(np.float32)
+    azmind = (np.arange(rows)[:, np.newaxis] * 9.0 + rng.normal(0, 2, (rows, cols))).astype(np.float32)
+    rngind[rng.random((rows, cols)) < 0.05] = np.nan
+    azmind[rng.random((rows, cols)) < 0.05] = np.nan
+    vel_x = rng.normal(0, 1, (rows, cols)).astype(np.float32)
+    vel_y = rng.normal(0, 1, (rows, cols)).astype(np.float32)
+    vel_x[rng.random((rows, cols)) < 0.05] = np.nan
+    vel_y[rng.random((rows, cols)) < 0.05] = np.nan
+    swath_border = [1000, 2000]
+
+    expected = _loop_rotate_vel2radar(rngind, azmind, vel_x, vel_y, swath_border, 40, 0.25, flag)
+    actual = netcdf_output.rotate_vel2radar(rngind, azmind, vel_x, vel_y, swath_border, None, 40, 0.25, flag)
+
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_array_equal(actual[1], expected[1])
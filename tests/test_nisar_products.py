@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from hyp3_autorift import nisar_products
+
+
+def _mock_open_product(calls):
+    def open_product(filename):
+        calls.append(filename)
+        return SimpleNamespace(
+            getOrbit=lambda: f'orbit of {filename}',
+            getSwathMetadata=lambda: f'swath metadata of {filename}',
+            identification=SimpleNamespace(boundingPolygon='POLYGON ((0 0, 1 0, 1 1, 0 1, 0 0))'),
+            polarizations={'A': ['HH', 'HV'], 'B': ['HH']},
+        )
+
+    return open_product
+
+
+def test_open_product_cached(monkeypatch, tmp_path):
+    calls: list[str] = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(nisar_products.product, 'open_product', _mock_open_product(calls))
+    session = nisar_products.NisarProductSession()
+
+    slc = session.open_product('NISAR_L1_PR_RSLC.h5')
+    assert session.open_product(str(tmp_path / 'NISAR_L1_PR_RSLC.h5')) is slc
+    assert calls == ['NISAR_L1_PR_RSLC.h5']
+
+    session.open_product('NISAR_L1_PR_RSLC_2.h5')
+    assert len(calls) == 2
+
+    session.clear()
+    session.open_product('NISAR_L1_PR_RSLC.h5')
+    assert len(calls) == 3
+
+
+def test_metadata_cached(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(nisar_products.product, 'open_product', _mock_open_product(calls))
+    session = nisar_products.NisarProductSession()
+
+    assert session.get_orbit('ref.h5') == 'orbit of ref.h5'
+    assert session.get_swath_metadata('ref.h5') == 'swath metadata of ref.h5'
+    assert session.get_bounding_polygon('ref.h5') == 'POLYGON ((0 0, 1 0, 1 1, 0 1, 0 0))'
+    assert session.get_polarizations('ref.h5') == ['HH', 'HV']
+    assert session.get_polarizations('ref.h5', 'B') == ['HH']
+    assert calls == ['ref.h5']
+
+    polarizations = session.get_polarizations('ref.h5')
+    polarizations.append('VV')
+    assert session.get_polarizations('ref.h5') == ['HH', 'HV']
@@ -0,0 +1,119 @@
+import numpy as np
+from osgeo import ogr
+
+from hyp3_autorift import parameters
+
+
+def test_get_catalog_key():
+    key = parameters.get_catalog_key('/vsicurl/https://example.com/v001/autorift_landice_0120m.shp')
+    assert key.startswith('autorift_landice_0120m_')
+    assert key != parameters.get_catalog_key('/vsicurl/https://example.com/v002/autorift_landice_0120m.shp')
+
+
+def test_find_candidates():
+    bboxes = np.array([[0.0, 0.0, 10.0, 10.0], [5.0, 5.0, 15.0, 15.0], [-10.0, -10.0, 0.0, 0.0]])
+    assert parameters.find_candidates(bboxes, 1.0, 1.0).tolist() == [0]
+    assert parameters.find_candidates(bboxes, 7.0, 7.0).tolist() == [0, 1]
+    assert parameters.find_candidates(bboxes, 0.0, 0.0).tolist() == [0, 2]
+    assert parameters.find_candidates(bboxes, 20.0, 0.0).tolist() == []
+    assert parameters.find_candidates(np.empty((0, 4)), 1.0, 1.0).tolist() == []
+
+
+def test_parameter_catalog_find():
+    features = [
+        {
+            'attributes': {'name': 'triangle'},
+            'wkt': 'POLYGON ((0 0, 10 0, 0 10, 0 0))',
+            'bbox': [0.0, 0.0, 10.0, 10.0],
+        },
+        {
+            'attributes': {'name': 'square'},
+            'wkt': 'POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0))',
+            'bbox': [0.0, 0.0, 10.0, 10.0],
+        },
+    ]
+    catalog = parameters.ParameterCatalog(features)
+
+    point = ogr.CreateGeometryFromWkt('POINT (1 1)')
+    assert catalog.find(point) == {'name': 'triangle'}
+
+    point = ogr.CreateGeometryFromWkt('POINT (9 9)')
+    assert catalog.find(point) == {'name': 'square'}
+
+    point = ogr.CreateGeometryFromWkt('POINT (11 9)')
+    assert catalog.find(point) is None
+
+
+def test_parameter_catalog_cached(monkeypatch, tmp_path):
+    monkeypatch.setenv('HYP3_AUTORIFT_CACHE_DIR', str(tmp_path))
+    features = [{'attributes': {'name': 'square'}, 'wkt': 'POLYGON EMPTY', 'bbox': [0.0, 0.0, 1.0, 1.0]}]
+    translated: list[str] = []
+
+    def vector_translate(dest, src, format):
+        translated.append(src)
+        open(dest, 'w').close()
+
+    monkeypatch.setattr(parameters.gdal, 'VectorTranslate', vector_translate)
+    monkeypatch.setattr(parameters, 'read_features', lambda parameter_file: features)
+
+    catalog = parameters.ParameterCatalog.from_parameter_file('/vsicurl/https://example.com/parameters.shp')
+    assert catalog.features == features
+    assert translated == ['/vsicurl/https://example.com/parameters.shp']
+
+    cache_dir = catalog.cache_dir
+    assert cache_dir is not None
+    assert (cache_dir / 'catalog.json').exists()
+    assert (cache_dir / 'shapefile' / 'parameters.shp').exists()
+
+    monkeypatch.setattr(parameters, 'read_features', lambda parameter_file: [])
+    catalog = parameters.ParameterCatalog.from_parameter_file('/vsicurl/https://example.com/parameters.shp')
+    assert catalog.features == features
+    assert len(translated) == 1
+
+    monkeypatch.setattr(parameters.gdal, 'Info', lambda raster, format: {'geoTransform': [0, 120, 0, 0, 0, -120]})
+    assert catalog.get_geotransform('dem.tif') == [0, 120, 0, 0, 0, -120]
+    monkeypatch.setattr(parameters.gdal, 'Info', lambda raster, format: None)
+    catalog = parameters.ParameterCatalog.from_parameter_file('/vsicurl/https://example.com/parameters.shp')
+    assert catalog.get_geotransform('dem.tif') == [0, 120, 0, 0, 0, -120]
+
+
+def test_get_aoi_window():
+    geotransform = [-3000000.0, 120.0, 0.0, 3000000.0, 0.0, -120.0]
+    window = parameters.get_aoi_window([-50.0, 69.0, -48.0, 70.0], 3413, geotransform, [50000, 50000], margin=10000.0)
+    assert window == [-210480.0, -2169600.0, -104400.0, -2306520.0]
+
+    window = parameters.get_aoi_window([-50.0, 69.0, -48.0, 70.0], 3413, geotransform, [24000, 50000], margin=10000.0)
+    assert window == [-210480.0, -2169600.0, -120000.0, -2306520.0]
+
+
+def test_prefetch_parameter_rasters(monkeypatch, tmp_path):
+    parameter_info: dict = {
+        'epsg': 3413,
+        'geogrid': {
+            'dem': '/vsicurl/https://example.com/h.tif',
+            'vx': '/vsicurl/https://example.com/vx.tif',
+            'sp': '/vsicurl/https://example.com/vx.tif',
+            'ChipSizeX': 240,
+        },
+    }
+    translated: list[tuple[str, str, list[float]]] = []
+
+    def translate(local_file, raster, projWin, format, creationOptions):
+        translated.append((local_file, raster, projWin))
+
+    monkeypatch.setattr(parameters.gdal, 'Info', lambda raster, format: {'geoTransform': [0], 'size': [1, 1]})
+    monkeypatch.setattr(parameters.gdal, 'Translate', translate)
+    monkeypatch.setattr(parameters, 'get_aoi_window', lambda *args: [0.0, 1.0, 1.0, 0.0])
+
+    prefetched = parameters.prefetch_parameter_rasters(parameter_info, [0.0, 0.0, 1.0, 1.0], directory=tmp_path)
+    assert prefetched['geogrid'] == {
+        'dem': str(tmp_path / 'dem.tif'),
+        'vx': str(tmp_path / 'vx.tif'),
+        'sp': str(tmp_path / 'vx.tif'),
+        'ChipSizeX': 240,
+    }
+    assert parameter_info['geogrid']['dem'] == '/vsicurl/https://example.com/h.tif'
+    assert sorted(translated) == [
+        (str(tmp_path / 'dem.tif'), '/vsicurl/https://example.com/h.tif', [0.0, 1.0, 1.0, 0.0]),
+        (str(tmp_path / 'vx.tif'), '/vsicurl/https://example.com/vx.tif', [0.0, 1.0, 1.0, 0.0]),
+    ]
@@ -1,4 +1,5 @@
 import io
+import time
 from pathlib import Path
 from unittest import mock
 from unittest.mock import MagicMock, patch
@@ -133,6 +134,32 @@ def test_get_lc2_metadata_fallback(s3_stubber):
         assert process.get_lc2_metadata('LC08_L1TP_009011_20200703_20200913_02_T1') == {'foo': 'bar'}
 
 
+def test_resolve_metadata():
+    def get_metadata(scene_name):
+        time.sleep(0.01 * (5 - int(scene_name[-1])))
+        return {'id': scene_name}
+
+    scene_names = [f'scene_{ii}' for ii in range(5)]
+    assert process.resolve_metadata(get_metadata, scene_names, max_workers=3) == [{'id': name} for name in scene_names]
+    assert process.resolve_metadata(get_metadata, []) == []
+
+
+@responses.activate
+def test_get_lc2_metadata_session_reused():
+    for scene_name in ('LC08_L1TP_009011_20200703_20200913_02_T1', 'LC08_L1TP_009011_20200603_20200813_02_T1'):
+        responses.add(responses.GET, f'{process.LC2_SEARCH_URL}/{scene_name}', json={'id': scene_name}, status=200)
+
+    metas = process.resolve_metadata(
+        process.get_lc2_metadata,
+        ['LC08_L1TP_009011_20200703_20200913_02_T1', 'LC08_L1TP_009011_20200603_20200813_02_T1'],
+    )
+    assert [meta['id'] for meta in metas] == [
+        'LC08_L1TP_009011_20200703_20200913_02_T1',
+        'LC08_L1TP_009011_20200603_20200813_02_T1',
+    ]
+    assert process.get_metadata_session() is process.get_metadata_session()
+
+
 def test_get_lc2_path():
     metadata = {'id': 'L--5', 'assets': {'B2.TIF': {'href': 'foo'}}}
     assert process.get_lc2_path(metadata) == 'foo'
@@ -154,17 +181,18 @@ def test_get_s2_metadata(mock_get_s2_path: MagicMock, mock_get_raster_bbox: Magi
     mock_get_s2_path.return_value = 's2 path'
     mock_get_raster_bbox.return_value = [0, 0, 1, 1]
 
-    expected = {
-        'path': 's2 path',
-        'bbox': [0, 0, 1, 1],
-        'id': 'S2A_MSIL1C_20160616T112217_N0204_R137_T29QKF_20160617T193500',
-        'properties': {
-            'datetime': '2016-06-16T11:22:17Z',
-        },
-    }
-    assert process.get_s2_metadata('S2A_MSIL1C_20160616T112217_N0204_R137_T29QKF_20160617T193500') == expected
+    metadata = process.get_s2_metadata('S2A_MSIL1C_20160616T112217_N0204_R137_T29QKF_20160617T193500')
+    assert metadata['path'] == 's2 path'
+    assert metadata['bbox'] == pytest.approx([-11.9374, 22.4919, -10.8491, 23.4994], abs=1e-4)
+    assert metadata['id'] == 'S2A_MSIL1C_20160616T112217_N0204_R137_T29QKF_20160617T193500'
+    assert metadata['properties'] == {'datetime': '2016-06-16T11:22:17Z'}
 
     mock_get_s2_path.assert_called_once_with('S2A_MSIL1C_20160616T112217_N0204_R137_T29QKF_20160617T193500')
+    mock_get_raster_bbox.assert_not_called()
+
+    with patch('hyp3_autorift.process.footprints.get_s2_scene_bbox', return_value=None):
+        metadata = process.get_s2_metadata('S2A_MSIL1C_20160616T112217_N0204_R137_T29QKF_20160617T193500')
+    assert metadata['bbox'] == [0, 0, 1, 1]
     mock_get_raster_bbox.assert_called_once_with('s2 path')
 
 
@@ -0,0 +1,233 @@
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from osgeo import gdal
+
+from hyp3_autorift import s1_isce3
+
+
+AZ_TIME_INTERVAL = 0.25
+BURST_SHAPE = (60, 200)
+
+
+def _synthetic_swaths():
+    """Two swaths of three bursts with an odd number of overlapping valid lines, so the merge windows overlap by a line.
+
+    The second swath starts later and further in range than the first.
+    """
+    start = datetime(2024, 1, 1)
+    swaths: dict[int, list[SimpleNamespace]] = {}
+    for swath, az_offset, starting_range in ((1, 0, 800_000.0), (2, 7, 800_250.0)):
+        swaths[swath] = [
+            SimpleNamespace(
+                sensing_start=start + timedelta(seconds=(az_offset + 49 * index) * AZ_TIME_INTERVAL),
+                azimuth_time_interval=AZ_TIME_INTERVAL,
+                first_valid_line=3,
+                last_valid_line=56,
+                first_valid_sample=2,
+                last_valid_sample=195,
+                starting_range=starting_range,
+                range_pixel_spacing=2.5,
+            )
+            for index in range(3)
+        ]
+    return swaths
+
+
+def _synthetic_bursts(rng, swaths):
+    bursts: dict[str, np.ndarray] = {}
+    for slc in ('ref', 'sec'):
+        for swath, swath_bursts in swaths.items():
+            for index in range(len(swath_bursts)):
+                burst = rng.uniform(1, 2, size=BURST_SHAPE).astype(np.float32)
+                burst[rng.random(BURST_SHAPE) < 0.05] = 0
+                bursts[f'{slc}_iw{swath}_{index}'] = burst
+    return bursts
+
+
+def _two_pass_merge(swaths, bursts, slc):
+    """The previous merge: bursts into per-swath images, and then the swath images into the mosaic."""
+    swath_arrays = {}
+    for swath, swath_bursts in swaths.items():
+        _, swath_shape = s1_isce3.get_burst_merge_windows(swath_bursts, BURST_SHAPE)
+        swath_arr = np.zeros(swath_shape, dtype=np.float32)
+        offsets = s1_isce3.get_azimuth_reference_offsets(swath_bursts)
+        for index, burst in enumerate(swath_bursts):
+            limit = offsets[index]
+            burst_start, merge_start = burst.first_valid_line, limit[0]
+            burst_end, merge_end = 1 + burst.last_valid_line, limit[1]
+            if index > 0:
+                half_overlap = (offsets[index - 1][1] - limit[0]) // 2
+                burst_start, merge_start = burst_start + half_overlap, merge_start + half_overlap
+            if index < len(swath_bursts) - 1:
+                half_overlap = (limit[1] - offsets[index + 1][0]) // 2
+                burst_end, merge_end = burst_end - half_overlap, merge_end - half_overlap
+            rng = slice(burst.first_valid_sample, burst.last_valid_sample)
+            swath_arr[merge_start:merge_end, rng] = bursts[f'{slc}_iw{swath}_{index}'][burst_start:burst_end, rng]
+        swath_arrays[swath] = swath_arr
+
+    first_bursts = [swath_bursts[0] for swath_bursts in swaths.values()]
+    sensing_start = min(burst.sensing_start for burst in first_bursts)
+    burst_length = timedelta(seconds=AZ_TIME_INTERVAL * (swath_arrays[1].shape[0] - 1))
+    sensing_stop = max(swath_bursts[-1].sensing_start + burst_length for swath_bursts in swaths.values())
+    rng_offsets = [
+        int(np.floor((burst.starting_range - first_bursts[0].starting_range) / burst.range_pixel_spacing))
+        for burst in first_bursts
+    ]
+    merged_arr = np.zeros(
+        (
+            1 + int(np.round((sensing_stop - sensing_start).total_seconds() / AZ_TIME_INTERVAL)),
+            swath_arrays[max(swaths)].shape[1] + rng_offsets[-1],
+        ),
+        dtype=np.float32,
+    )
+
+    for swath_index, (swath, swath_bursts) in enumerate(swaths.items()):
+        slc_array = swath_arrays[swath]
+        first_rng, last_rng = swath_bursts[0].first_valid_sample, swath_bursts[0].last_valid_sample
+        az_offset = int(np.floor((swath_bursts[0].sensing_start - sensing_start).total_seconds() / AZ_TIME_INTERVAL))
+        rng_offset = rng_offsets[swath_index] + first_rng
+        buffer = 64 if swath != max(swaths) else 0
+        az_start, az_end = swath_bursts[0].first_valid_line, -swath_bursts[-1].last_valid_line
+        merged_az = slice(az_offset, az_offset + slc_array.shape[0] + az_end - az_start)
+        merged_rng = slice(rng_offset, rng_offset + last_rng - first_rng - buffer)
+        swath_window = slc_array[az_start:az_end, first_rng : last_rng - buffer]
+        cond = np.logical_and(merged_arr[merged_az, merged_rng] == 0, swath_window != 0)
+        merged_arr[merged_az, merged_rng][cond] = swath_window[cond]
+
+    return merged_arr
+
+
+@pytest.mark.parametrize('use_memmap', [False, True])
+def test_merge_swaths_matches_two_pass_merge(monkeypatch, tmp_path, use_memmap):
+    rng = np.random.default_rng(3)
+    swaths = _synthetic_swaths()
+    bursts = _synthetic_bursts(rng, swaths)
+
+    monkeypatch.chdir(tmp_path)
+    burst_files: dict[tuple[str, str], np.ndarray] = {}
+    for name, burst in bursts.items():
+        slc, swath, index = name.split('_')
+        burst_file = tmp_path / ('product' if slc == 'ref' else 'product_sec') / f't001_00000{index}_{swath}'
+        burst_file.mkdir(parents=True)
+        burst_files[(burst_file.parent.name, burst_file.name)] = burst
+
+    def read_slc_gdal(path, window=None):
+        burst = burst_files[(Path(path).parent.name, Path(path).name)]
+        if window is None:
+            return burst
+        xoff, yoff, xsize, ysize = window
+        return burst[yoff : yoff + ysize, xoff : xoff + xsize].copy()
+
+    written: dict[str, np.ndarray] = {}
+    monkeypatch.setattr(s1_isce3, 'get_burst_ids', lambda safe, orbit: [None] * 6)
+    monkeypatch.setattr(s1_isce3, 'get_burst_path', lambda burst_file: burst_file)
+    monkeypatch.setattr(s1_isce3, 'get_raster_shape', lambda path: BURST_SHAPE)
+    monkeypatch.setattr(s1_isce3, 'read_slc_gdal', read_slc_gdal)
+    monkeypatch.setattr(s1_isce3, 'write_slc_gdal', lambda data, out_path: written.update({out_path: np.array(data)}))
+    monkeypatch.setattr(s1_isce3.s1_metadata, 'get_pol', lambda safe, orbit: 'vv')
+    monkeypatch.setattr(s1_isce3.s1_metadata, 'load_bursts', lambda safe, orbit, swath, pol: swaths[swath])
+
+    memmap_dir = tmp_path if use_memmap else None
+    shape = s1_isce3.merge_swaths('ref.zip', 'ref.EOF', swaths=(1, 2), memmap_dir=memmap_dir)
+
+    expected_ref = _two_pass_merge(swaths, bursts, 'ref')
+    expected_sec = _two_pass_merge(swaths, bursts, 'sec')
+    assert shape == expected_ref.shape
+    np.testing.assert_array_equal(written['reference.tif'], expected_ref)
+    np.testing.assert_array_equal(written['secondary.tif'], expected_sec)
+    assert not list(tmp_path.glob('*_merged.dat'))
+
+
+def test_get_burst_merge_windows():
+    swath_bursts = _synthetic_swaths()[1]
+    windows, swath_shape = s1_isce3.get_burst_merge_windows(swath_bursts, BURST_SHAPE)
+
+    # 3 bursts 49 lines apart with 5 valid overlapping lines; later bursts start halfway through (and so win) the overlap
+    assert swath_shape == (158, 200)
+    assert windows == [
+        (slice(3, 55), slice(3, 55), slice(2, 195)),
+        (slice(54, 104), slice(5, 55), slice(2, 195)),
+        (slice(103, 155), slice(5, 57), slice(2, 195)),
+    ]
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_convert_slc_to_amplitude(tmp_path, workers):
+    rng = np.random.default_rng(5)
+    rows, cols = 100, 37
+    slc = (rng.normal(size=(rows, cols)) + 1j * rng.normal(size=(rows, cols))).astype(np.complex64)
+    slc[:10] = 0
+
+    slc_path = str(tmp_path / 'burst.slc.tif')
+    options = ['TILED=YES', 'BLOCKXSIZE=16', 'BLOCKYSIZE=16']
+    ds = gdal.GetDriverByName('GTiff').Create(slc_path, cols, rows, 1, gdal.GDT_CFloat32, options)
+    ds.GetRasterBand(1).WriteArray(slc)
+    del ds
+
+    # 40 rows round down to strips of two 16-row blocks, and the last strip is partial
+    out_path = str(tmp_path / 'reference.tif')
+    assert s1_isce3.convert_slc_to_amplitude(slc_path, out_path, workers=workers, strip_rows=40) == out_path
+
+    with gdal.Open(out_path) as ds:
+        band = ds.GetRasterBand(1)
+        assert band.DataType == gdal.GDT_Float32
+        assert band.GetNoDataValue() == 0
+        np.testing.assert_array_equal(band.ReadAsArray(), np.abs(slc).astype(np.float32))
+
+
+def test_get_orbit_safe_name(monkeypatch):
+    slc = 'S1A_IW_SLC__1SDV_20201222T022251_20201222T022318_032861_03CE65_7C85'
+    assert s1_isce3.get_orbit_safe_name(slc) == slc
+
+    results = [
+        SimpleNamespace(
+            properties={
+                'platform': 'Sentinel-1B',
+                'startTime': '2020-06-04T02:23:12.123Z',
+                'stopTime': '2020-06-04T02:23:15.456Z',
+            }
+        ),
+        SimpleNamespace(
+            properties={
+                'platform': 'Sentinel-1B',
+                'startTime': '2020-06-04T02:23:15.000Z',
+                'stopTime': '2020-06-04T02:23:18.000Z',
+            }
+        ),
+    ]
+    monkeypatch.setattr(s1_isce3.asf, 'granule_search', lambda granules: results)
+    bursts = ['S1_136231_IW2_20200604T022312_VV_7C85-BURST', 'S1_136232_IW2_20200604T022315_VV_7C85-BURST']
+    assert s1_isce3.get_orbit_safe_name(bursts) == 'S1B_IW_SLC__1SDV_20200604T022312_20200604T022318'
+    assert s1_isce3.get_orbit_safe_name(bursts[0]) == 'S1B_IW_SLC__1SDV_20200604T022312_20200604T022318'
+
+    # CMR times may have no fractional seconds, or fewer than 3 digits of them
+    results[0].properties['startTime'] = '2020-06-04T02:23:12Z'
+    results[1].properties['stopTime'] = '2020-06-04T02:23:18.45Z'
+    assert s1_isce3.get_orbit_safe_name(bursts) == 'S1B_IW_SLC__1SDV_20200604T022312_20200604T022318'
+
+    monkeypatch.setattr(s1_isce3.asf, 'granule_search', lambda granules: [])
+    with pytest.raises(ValueError):
+        s1_isce3.get_orbit_safe_name(bursts)
+
+
+def test_stage_scenes(monkeypatch):
+    # Every download and orbit retrieval waits for all four to have started, so this only passes if they're concurrent
+    barrier = threading.Barrier(4, timeout=10)
+
+    def download(scene):
+        barrier.wait()
+        return f'{scene}.SAFE'
+
+    def get_orbit_file(safe):
+        barrier.wait()
+        return f'{safe}.EOF'
+
+    monkeypatch.setattr(s1_isce3.s1_orbits, 'get_orbit_file', get_orbit_file)
+    monkeypatch.setattr(s1_isce3, 'get_orbit_safe_name', lambda scene: scene.upper())
+
+    assert s1_isce3.stage_scenes(download, 'ref', 'sec') == (('ref.SAFE', 'REF.EOF'), ('sec.SAFE', 'SEC.EOF'))
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+from hyp3_autorift import s1_metadata
+
+
+def _mock_load_bursts(calls, pols=('vh',)):
+    def load_bursts(safe, orbit_path, swath, pol):
+        calls.append((safe, orbit_path, swath, pol))
+        if pol not in pols:
+            raise ValueError(f'{pol} not found')
+        return [SimpleNamespace(burst_id=f't001_00000{ii}_iw{swath}') for ii in range(3)]
+
+    return load_bursts
+
+
+def test_load_bursts_cached(monkeypatch, tmp_path):
+    calls: list[tuple] = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(s1_metadata.s1reader, 'load_bursts', _mock_load_bursts(calls))
+    session = s1_metadata.BurstMetadataSession()
+
+    bursts = session.load_bursts('S1A.SAFE', 'orbit.EOF', 2, 'vh')
+    assert [b.burst_id for b in bursts] == ['t001_000000_iw2', 't001_000001_iw2', 't001_000002_iw2']
+
+    bursts.clear()
+    again = session.load_bursts(str(tmp_path / 'S1A.SAFE'), str(tmp_path / 'orbit.EOF'), 2, 'vh')
+    assert len(again) == 3
+    assert len(calls) == 1
+
+    filtered = session.load_bursts('S1A.SAFE', 'orbit.EOF', 2, 'vh', burst_ids=['t001_000001_iw2'])
+    assert [b.burst_id for b in filtered] == ['t001_000001_iw2']
+    assert len(calls) == 1
+
+    session.load_bursts('S1A.SAFE', 'orbit.EOF', 3, 'vh')
+    assert len(calls) == 2
+
+    session.clear()
+    session.load_bursts('S1A.SAFE', 'orbit.EOF', 2, 'vh')
+    assert len(calls) == 3
+
+
+def test_get_pol(monkeypatch):
+    calls: list[tuple] = []
+    monkeypatch.setattr(s1_metadata.s1reader, 'load_bursts', _mock_load_bursts(calls, pols=('hv',)))
+    session = s1_metadata.BurstMetadataSession()
+
+    assert session.get_pol('S1A.SAFE', 'orbit.EOF') == 'hv'
+    assert len(calls) == 10
+
+    assert session.get_pol('S1A.SAFE', 'orbit.EOF') == 'hv'
+    session.load_bursts('S1A.SAFE', 'orbit.EOF', 1, 'hv')
+    assert len(calls) == 10
+
+    monkeypatch.setattr(s1_metadata.s1reader, 'load_bursts', _mock_load_bursts(calls, pols=()))
+    with pytest.raises(ValueError, match='No polarization information found'):
+        session.get_pol('S1B.SAFE', 'orbit.EOF')
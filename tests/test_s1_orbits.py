@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from hyp3_autorift import cache, s1_orbits
+
+
+SAFE = 'S1A_IW_SLC__1SDV_20201222T022251_20201222T022318_032861_03CE65_7C85.zip'
+POEORB = 'S1A_OPER_AUX_POEORB_OPOD_20210111T121212_V20201221T225942_20201223T005942.EOF'
+RESORB = 'S1A_OPER_AUX_RESORB_OPOD_20201222T041212_V20201222T005942_20201222T041712.EOF'
+
+
+def test_parse_orbit_file_name():
+    assert s1_orbits.parse_orbit_file_name(POEORB) == {
+        'mission': 'S1A',
+        'type': 'POEORB',
+        'produced': '20210111T121212',
+        'start': '2020-12-21T22:59:42',
+        'stop': '2020-12-23T00:59:42',
+    }
+    assert s1_orbits.parse_orbit_file_name('foo.EOF') is None
+
+
+def test_get_safe_sensing_window():
+    assert s1_orbits.get_safe_sensing_window(f'/tmp/{SAFE}') == (
+        'S1A',
+        datetime(2020, 12, 22, 2, 22, 51),
+        datetime(2020, 12, 22, 2, 23, 18),
+    )
+
+
+def test_find_cached_orbit_file(tmp_path):
+    start, stop = datetime(2020, 12, 22, 2, 22, 51), datetime(2020, 12, 22, 2, 23, 18)
+    assert s1_orbits.find_cached_orbit_file(tmp_path, 'S1A', start, stop) is None
+
+    for orbit_file in [RESORB, POEORB]:
+        (tmp_path / orbit_file).touch()
+        s1_orbits.add_to_index(tmp_path, tmp_path / orbit_file)
+
+    assert s1_orbits.find_cached_orbit_file(tmp_path, 'S1A', start, stop) == tmp_path / POEORB
+    assert s1_orbits.find_cached_orbit_file(tmp_path, 'S1B', start, stop) is None
+    assert s1_orbits.find_cached_orbit_file(tmp_path, 'S1A', start, datetime(2020, 12, 23, 1)) is None
+
+    (tmp_path / POEORB).unlink()
+    assert s1_orbits.find_cached_orbit_file(tmp_path, 'S1A', start, stop) == tmp_path / RESORB
+
+
+def test_get_orbit_file(monkeypatch, tmp_path):
+    calls = []
+
+    def retrieve_orbit_file(safe, orbit_dir, concatenate):
+        calls.append(safe)
+        orbit_file = Path(orbit_dir) / POEORB
+        orbit_file.write_text('orbit')
+        return str(orbit_file)
+
+    monkeypatch.setattr(s1_orbits, 'retrieve_orbit_file', retrieve_orbit_file)
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, str(tmp_path / 'cache'))
+
+    for work_dir in [tmp_path / 'job1', tmp_path / 'job2']:
+        work_dir.mkdir()
+        orbit_file = s1_orbits.get_orbit_file(SAFE, orbit_dir=work_dir)
+        assert orbit_file == str(work_dir / POEORB)
+        assert Path(orbit_file).read_text() == 'orbit'
+
+    assert calls == [SAFE]
+    assert sorted(path.name for path in (tmp_path / 'cache' / 'orbits').iterdir()) == ['.lock', POEORB, 'index.json']
+
+
+def test_get_orbit_file_no_cache(monkeypatch, tmp_path):
+    monkeypatch.delenv(cache.CACHE_DIR_ENV, raising=False)
+    monkeypatch.setattr(s1_orbits, 'retrieve_orbit_file', lambda safe, orbit_dir, concatenate: f'{orbit_dir}/{POEORB}')
+    assert s1_orbits.get_orbit_file(SAFE, orbit_dir=tmp_path) == f'{tmp_path}/{POEORB}'
+
+
+def test_is_current(tmp_path):
+    stop = datetime(2020, 12, 22, 2, 23, 18)
+    assert s1_orbits.is_current(tmp_path / POEORB, stop)
+    assert not s1_orbits.is_current(tmp_path / RESORB, stop)
+    assert s1_orbits.is_current(tmp_path / RESORB, datetime.now() - timedelta(days=2))
+
+
+def test_get_orbit_file_replaces_stale_resorb(monkeypatch, tmp_path):
+    calls: list[str] = []
+
+    def retrieve_orbit_file(safe, orbit_dir, concatenate):
+        calls.append(safe)
+        orbit_file = Path(orbit_dir) / POEORB
+        orbit_file.write_text('precise orbit')
+        return str(orbit_file)
+
+    monkeypatch.setattr(s1_orbits, 'retrieve_orbit_file', retrieve_orbit_file)
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    orbit_dir = tmp_path / 'cache' / 'orbits'
+    orbit_dir.mkdir(parents=True)
+    (orbit_dir / RESORB).write_text('restituted orbit')
+    s1_orbits.add_to_index(orbit_dir, orbit_dir / RESORB)
+
+    # the precise orbit for this 2020 scene has long been published, so the cached restituted orbit isn't used
+    orbit_file = s1_orbits.get_orbit_file(SAFE, orbit_dir=tmp_path)
+    assert orbit_file == str(tmp_path / POEORB)
+    assert Path(orbit_file).read_text() == 'precise orbit'
+    assert calls == [SAFE]
+    assert s1_orbits.find_cached_orbit_file(
+        orbit_dir, 'S1A', datetime(2020, 12, 22, 2, 22, 51), datetime(2020, 12, 22, 2, 23, 18)
+    ) == (orbit_dir / POEORB)
@@ -0,0 +1,162 @@
+import shutil
+
+import netCDF4
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+from osgeo import gdal
+
+from hyp3_autorift import cache, s1_rdr_static_files
+
+
+class FakeS3Client:
+    def __init__(self, objects):
+        self.objects = objects
+        self.downloads = []
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+        return {'ETag': f'"{self.objects[Key][0]}"'}
+
+    def download_file(self, bucket, key, filename):
+        self.downloads.append(key)
+        with open(filename, 'wb') as f:
+            f.write(self.objects[key][1])
+
+
+def _static_layers(rows, cols):
+    rng = np.random.default_rng(42)
+    return {
+        'x': -150.5 + rng.random((rows, cols)),
+        'y': 61.0 + rng.random((rows, cols)),
+        'z': 3000 * rng.random((rows, cols)),
+        'layover_shadow_mask': rng.integers(0, 4, (rows, cols)).astype(np.float64),
+    }
+
+
+def _write_v1_static_nc(filename, layers, metadata):
+    """Write a version 1 static file like `create_static_layer` did before version 2: all float64, with GDAL."""
+    rows, cols = layers['x'].shape
+    driver = gdal.GetDriverByName('netCDF')
+    out_ds = driver.Create(filename, cols, rows, 4, gdal.GDT_Float64, ['FORMAT=NC4', 'COMPRESS=DEFLATE'])
+    out_ds.SetMetadata(metadata)
+    for band, name in enumerate(['x', 'y', 'z', 'layover_shadow_mask'], start=1):
+        out_ds.GetRasterBand(band).WriteArray(layers[name])
+    out_ds.FlushCache()
+    del out_ds
+
+
+def test_retrieve_static_nc_from_cache(monkeypatch, tmp_path):
+    burst_id = 't064_135523_iw1'
+    key = s1_rdr_static_files.get_static_nc_key(burst_id)
+    assert key == 'static-topo-corrections/t064_135523/t064_135523_iw1_static_rdr.nc'
+
+    client = FakeS3Client({key: ('abc123', b'static')})
+    monkeypatch.setattr(s1_rdr_static_files, 'S3_CLIENT', client)
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+
+    for job in ['job1', 'job2']:
+        (tmp_path / job).mkdir()
+        filename = str(tmp_path / job / f'{burst_id}_static_rdr.nc')
+        assert s1_rdr_static_files.retrieve_static_nc_from_cache(burst_id, 'bucket', filename, cache_dir) == filename
+        assert (tmp_path / job / f'{burst_id}_static_rdr.nc').read_bytes() == b'static'
+
+    assert client.downloads == [key]
+    assert (cache_dir / f'{burst_id}_abc123_static_rdr.nc').exists()
+
+    client.objects[key] = ('def456', b'regenerated')
+    filename = str(tmp_path / 'job1' / f'{burst_id}_static_rdr.nc')
+    s1_rdr_static_files.retrieve_static_nc_from_cache(burst_id, 'bucket', filename, cache_dir)
+    assert (tmp_path / 'job1' / f'{burst_id}_static_rdr.nc').read_bytes() == b'regenerated'
+    assert client.downloads == [key, key]
+
+    monkeypatch.setenv(s1_rdr_static_files.STATIC_CACHE_SIZE_ENV, '0')
+    s1_rdr_static_files.retrieve_static_nc_from_cache(burst_id, 'bucket', filename, cache_dir)
+    assert sorted(path.name for path in cache_dir.glob('*.nc')) == [f'{burst_id}_def456_static_rdr.nc']
+
+
+def test_retrieve_static_nc_from_cache_missing(monkeypatch, tmp_path):
+    monkeypatch.setattr(s1_rdr_static_files, 'S3_CLIENT', FakeS3Client({}))
+    filename = str(tmp_path / 't064_135523_iw1_static_rdr.nc')
+    assert s1_rdr_static_files.retrieve_static_nc_from_cache('t064_135523_iw1', 'bucket', filename, tmp_path) is None
+
+
+def test_quantize_coordinates():
+    coordinates = np.array([[-150.123456789, -150.0], [np.nan, -149.5]])
+    packed, scale, offset = s1_rdr_static_files.quantize_coordinates(coordinates)
+
+    assert packed.dtype == np.int32
+    assert packed[1, 0] == s1_rdr_static_files.INT32_FILL
+    assert scale == s1_rdr_static_files.COORDINATE_QUANTUM
+    valid = np.isfinite(coordinates)
+    np.testing.assert_allclose(packed[valid] * scale + offset, coordinates[valid], rtol=0, atol=scale / 2)
+
+    packed, scale, offset = s1_rdr_static_files.quantize_coordinates(np.array([-180.0, 180.0]))
+    assert scale > s1_rdr_static_files.COORDINATE_QUANTUM
+    np.testing.assert_allclose(packed * scale + offset, [-180.0, 180.0], rtol=0, atol=scale / 2)
+
+    packed, _, _ = s1_rdr_static_files.quantize_coordinates(np.full((2, 2), np.nan))
+    assert (packed == s1_rdr_static_files.INT32_FILL).all()
+
+
+def test_write_static_nc(tmp_path):
+    layers = _static_layers(300, 40)
+    metadata = {'NC_GLOBAL#sensing_start': '2020-01-01 00:00:01.123456', 'NC_GLOBAL#first_valid_line': 12}
+
+    filename = str(tmp_path / 'static_rdr.nc')
+    s1_rdr_static_files.write_static_nc(filename, layers, metadata)
+
+    with netCDF4.Dataset(filename) as nc:
+        assert nc.static_file_version == s1_rdr_static_files.STATIC_FILE_VERSION
+        assert nc.sensing_start == '2020-01-01 00:00:01.123456'
+        assert nc.first_valid_line == '12'
+
+        assert nc['x'].dtype == np.int32
+        assert nc['z'].dtype == np.float32
+        assert nc['layover_shadow_mask'].dtype == np.uint8
+        assert nc['x'].chunking() == [256, 40]
+        assert nc['x'].filters()['zlib'] and nc['x'].filters()['shuffle']
+
+        # rows are stored bottom-up
+        for name in ['x', 'y']:
+            np.testing.assert_allclose(nc[name][::-1], layers[name], rtol=0, atol=1e-8)
+        np.testing.assert_allclose(nc['z'][::-1], layers['z'], rtol=1e-6)
+        np.testing.assert_array_equal(nc['layover_shadow_mask'][::-1], layers['layover_shadow_mask'])
+
+
+@pytest.mark.parametrize('version', [1, 2])
+def test_get_static_layer(monkeypatch, tmp_path, version):
+    burst_id = 't064_135523_iw1'
+    layers = _static_layers(300, 40)
+    radar_grid = ['2020-01-01 00:00:01.123456', '0.05546576', '1717.128973', '800082.35', '2.329562', '300', '40', '0']
+    metadata = dict(zip(s1_rdr_static_files.RADAR_GRID_PARAMS, radar_grid))
+    metadata.update(dict.fromkeys(s1_rdr_static_files.ADDITIONAL_METADATA_PARAMS, '1'))
+
+    static_file = str(tmp_path / f'v{version}_static_rdr.nc')
+    if version == 1:
+        _write_v1_static_nc(static_file, layers, metadata)
+    else:
+        s1_rdr_static_files.write_static_nc(static_file, layers, metadata)
+
+    def retrieve_static_nc_from_s3(burst_id, bucket, filename):
+        return shutil.copy(static_file, filename)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(cache.CACHE_DIR_ENV, raising=False)
+    monkeypatch.setattr(s1_rdr_static_files, 'retrieve_static_nc_from_s3', retrieve_static_nc_from_s3)
+    assert s1_rdr_static_files.get_static_layer(burst_id, 'bucket')
+
+    burst_static_dir = s1_rdr_static_files.STATIC_DIR / burst_id
+    assert (burst_static_dir / 'radar_grid.txt').read_text().splitlines() == radar_grid
+
+    with gdal.Open(str(burst_static_dir / 'topo.vrt')) as ds:
+        assert (ds.RasterYSize, ds.RasterXSize) == (300, 40)
+        x, y, z, mask = (ds.GetRasterBand(band).ReadAsArray() for band in range(1, 5))
+
+    for name, data in (('x', x), ('y', y)):
+        assert data.dtype == np.float64
+        np.testing.assert_allclose(data, layers[name], rtol=0, atol=1e-8)
+    np.testing.assert_allclose(z, layers['z'], rtol=1e-6)
+    np.testing.assert_array_equal(mask, layers['layover_shadow_mask'])
@@ -0,0 +1,234 @@
+import numpy as np
+import pytest
+
+from hyp3_autorift.vend import testautoRIFT
+
+
+def _loop_mask_zero_pixels(noDataMask, xGrid, yGrid, nodata, I1, I2):
+    for ii in range(xGrid.shape[0]):
+        for jj in range(xGrid.shape[1]):
+            if (yGrid[ii, jj] != nodata) & (xGrid[ii, jj] != nodata):
+                if (I1[yGrid[ii, jj] - 1, xGrid[ii, jj] - 1] == 0) | (I2[yGrid[ii, jj] - 1, xGrid[ii, jj] - 1] == 0):
+                    noDataMask[ii, jj] = True
+    return noDataMask
+
+
+def _loop_mask_from_zero_mask(noDataMask, xGrid, yGrid, nodata, zero_mask):
+    for ii in range(xGrid.shape[0]):
+        for jj in range(xGrid.shape[1]):
+            if (yGrid[ii, jj] != nodata) & (xGrid[ii, jj] != nodata):
+                noDataMask[ii, jj] = zero_mask[yGrid[ii, jj] - 1, xGrid[ii, jj] - 1]
+    return noDataMask
+
+
+def _synthetic_grid(rng, nodata=-32767, shape=(37, 53), image_shape=(400, 500)):
+    xGrid = rng.integers(1, image_shape[1] + 1, size=shape).astype(np.int32)
+    yGrid = rng.integers(1, image_shape[0] + 1, size=shape).astype(np.int32)
+    xGrid[rng.random(shape) < 0.1] = nodata
+    yGrid[rng.random(shape) < 0.1] = nodata
+    noDataMask = xGrid == nodata
+    return xGrid, yGrid, noDataMask
+
+
+@pytest.mark.parametrize('batch_rows', [1, 7, 1024])
+def test_mask_zero_pixels(batch_rows):
+    rng = np.random.default_rng(42)
+    nodata = -32767
+    xGrid, yGrid, noDataMask = _synthetic_grid(rng, nodata=nodata)
+    I1 = rng.integers(0, 4, size=(400, 500)).astype(np.float32)
+    I2 = rng.integers(0, 4, size=(400, 500)).astype(np.float32)
+
+    expected = _loop_mask_zero_pixels(noDataMask.copy(), xGrid, yGrid, nodata, I1, I2)
+    actual = testautoRIFT.mask_zero_pixels(noDataMask.copy(), xGrid, yGrid, nodata, (I1, I2), batch_rows=batch_rows)
+
+    assert actual.any()
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_mask_zero_pixels_no_nodata():
+    rng = np.random.default_rng(7)
+    xGrid, yGrid, _ = _synthetic_grid(rng, nodata=0)
+    xGrid[xGrid == 0] = 1
+    yGrid[yGrid == 0] = 1
+    noDataMask = np.logical_not(xGrid)
+    I1 = rng.integers(0, 4, size=(400, 500)).astype(np.float32)
+    I2 = np.ones((400, 500), dtype=np.float32)
+
+    expected = _loop_mask_zero_pixels(noDataMask.copy(), xGrid, yGrid, None, I1, I2)
+    actual = testautoRIFT.mask_zero_pixels(noDataMask.copy(), xGrid, yGrid, None, (I1, I2))
+
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize('batch_rows', [1, 7, 1024])
+def test_mask_from_zero_mask(batch_rows):
+    rng = np.random.default_rng(1234)
+    nodata = -32767
+    xGrid, yGrid, noDataMask = _synthetic_grid(rng, nodata=nodata)
+    zero_mask = (rng.random((400, 500)) < 0.3).astype(np.uint8)
+
+    expected = _loop_mask_from_zero_mask(noDataMask.copy(), xGrid, yGrid, nodata, zero_mask)
+    actual = testautoRIFT.mask_from_zero_mask(noDataMask.copy(), xGrid, yGrid, nodata, zero_mask, batch_rows=batch_rows)
+
+    assert actual.dtype == bool
+    np.testing.assert_array_equal(actual, expected)
+
+
+class FakeAutorift:
+    """Stands in for `autoRIFT.autoRIFT`; each node's displacement depends on the image pixels at that node."""
+
+    def __init__(self, I1, I2, xGrid, yGrid, chip_size_max):
+        self.I1 = I1
+        self.I2 = I2
+        self.xGrid = xGrid
+        self.yGrid = yGrid
+        self.Dx0 = np.zeros(xGrid.shape, dtype=np.float32)
+        self.Dy0 = np.full(xGrid.shape, 3.0, dtype=np.float32)
+        self.SearchLimitX = np.full(xGrid.shape, 4, dtype=np.float32)
+        self.SearchLimitY = np.full(xGrid.shape, 4, dtype=np.float32)
+        self.ChipSizeMaxX = np.full(xGrid.shape, chip_size_max, dtype=np.float32)
+        self.ChipSizeMinX = np.full(xGrid.shape, 16, dtype=np.float32)
+        self.ChipSize0X = 16
+        self.ScaleChipSizeY = 1
+        self.MultiThread = 0
+
+    def runAutorift(self):
+        chop_factor = int(np.max(self.ChipSizeMaxX) / self.ChipSize0X)
+        rlim = (self.xGrid.shape[0] // chop_factor) * chop_factor
+        clim = (self.xGrid.shape[1] // chop_factor) * chop_factor
+        self.origSize = self.xGrid.shape
+        x = self.xGrid[:rlim, :clim]
+        y = self.yGrid[:rlim, :clim]
+        valid = y > 0
+        # touch the furthest row the chip and search window can reach
+        reach = np.clip(y + 16 + 4, 1, self.I1.shape[0])
+
+        self.Dx = np.full(x.shape, np.nan, dtype=np.float32)
+        self.Dy = np.full(x.shape, np.nan, dtype=np.float32)
+        self.Dx[valid] = self.I1[y[valid] - 1, x[valid] - 1] - self.I2[y[valid] - 1, x[valid] - 1]
+        self.Dy[valid] = self.I2[reach[valid] - 1, x[valid] - 1]
+        self.InterpMask = valid.astype(np.float32)
+        self.ChipSizeX = np.where(valid, 16, 0).astype(np.float32)
+        self.SearchLimitX = self.SearchLimitX[:rlim, :clim]
+        self.SearchLimitY = self.SearchLimitY[:rlim, :clim]
+
+
+@pytest.mark.parametrize('n_rows,tiles,chop_factor', [(100, 4, 4), (103, 3, 8), (10, 8, 4), (7, 2, 4)])
+def test_split_grid_rows(n_rows, tiles, chop_factor):
+    strips = testautoRIFT.split_grid_rows(n_rows, tiles, chop_factor, halo=5)
+
+    assert 1 <= len(strips) <= tiles
+    assert strips[0][0].start == 0
+    assert strips[-1][0].stop == n_rows
+    for (core, extended), (next_core, _) in zip(strips[:-1], strips[1:]):
+        assert core.stop == next_core.start
+        assert core.stop % chop_factor == 0
+    for core, extended in strips:
+        assert extended.start % chop_factor == 0
+        assert extended.start <= core.start
+        assert extended.stop >= core.stop
+        assert extended.stop <= n_rows
+
+
+def test_split_grid_rows_small_grid():
+    # 32 strips of a 64-row grid would have 2-row cores with 16 halo rows on either side
+    strips = testautoRIFT.split_grid_rows(64, 32, 2, halo=16)
+    assert [core for core, _ in strips] == [slice(0, 32), slice(32, 64)]
+    assert [extended for _, extended in strips] == [slice(0, 48), slice(16, 64)]
+
+    assert testautoRIFT.split_grid_rows(20, 4, 2, halo=16) == [(slice(0, 20), slice(0, 20))]
+
+
+def test_get_tile_halo():
+    xGrid, yGrid = np.meshgrid(np.arange(20, 290, 10), np.arange(20, 990, 10))
+    yGrid[:5, :] = 0
+    obj = FakeAutorift(None, None, xGrid, yGrid, chip_size_max=64)
+
+    # the filter on the 4x coarser grid of the largest chips reaches further than the 64 pixel chips and search limits
+    assert testautoRIFT.get_tile_halo(obj, 4) == 12
+
+    # half a 64 pixel chip plus a 100 pixel search limit, at 10 pixels per grid row
+    obj.SearchLimitY[:] = 100
+    assert testautoRIFT.get_tile_halo(obj, 4) == 14
+
+
+@pytest.mark.parametrize('tiles', [2, 3, 5])
+def test_run_autorift_tiled(tiles):
+    rng = np.random.default_rng(tiles)
+    I1 = rng.integers(0, 255, size=(1000, 300)).astype(np.uint8)
+    I2 = rng.integers(0, 255, size=(1000, 300)).astype(np.uint8)
+    xGrid, yGrid = np.meshgrid(np.arange(20, 290, 10), np.arange(20, 990, 10))
+    xGrid = xGrid.astype(np.int32)
+    yGrid = yGrid.astype(np.int32)
+    xGrid[:5, :] = 0
+    yGrid[:5, :] = 0
+
+    expected = FakeAutorift(I1, I2, xGrid.copy(), yGrid.copy(), chip_size_max=64)
+    expected.runAutorift()
+
+    obj = FakeAutorift(I1, I2, xGrid.copy(), yGrid.copy(), chip_size_max=64)
+    testautoRIFT.run_autorift_tiled(obj, tiles)
+
+    assert obj.origSize == expected.origSize
+    for name in ('Dx', 'Dy', 'InterpMask', 'ChipSizeX', 'SearchLimitX', 'SearchLimitY'):
+        np.testing.assert_array_equal(getattr(obj, name), getattr(expected, name))
+
+
+def _write_image(path, array):
+    driver = testautoRIFT.gdal.GetDriverByName('GTiff')
+    ds = driver.Create(str(path), array.shape[1], array.shape[0], 1, testautoRIFT.gdal.GDT_Float32)
+    ds.GetRasterBand(1).WriteArray(array)
+    del ds
+
+
+def _run_autorift(reference, secondary, tiles):
+    nodata = -32767
+    xGrid, yGrid = np.meshgrid(np.arange(40, 217, 16), np.arange(40, 1161, 16))
+    shape = xGrid.shape
+    return testautoRIFT.runAutorift(
+        reference,
+        secondary,
+        xGrid.astype(np.int32),
+        yGrid.astype(np.int32),
+        np.zeros(shape, dtype=np.float32),
+        np.zeros(shape, dtype=np.float32),
+        np.full(shape, 8, dtype=np.float32),
+        np.full(shape, 8, dtype=np.float32),
+        np.full(shape, 16, dtype=np.int32),
+        np.full(shape, 16, dtype=np.int32),
+        np.full(shape, 32, dtype=np.int32),
+        np.full(shape, 32, dtype=np.int32),
+        np.zeros(shape, dtype=bool),
+        0,
+        nodata,
+        0,
+        geogrid_run_info={'gridspacingx': 240.0, 'chipsizex0': 240.0, 'XPixelSize': 15.0},
+        tiles=tiles,
+    )
+
+
+def test_run_autorift_tiled_matches_untiled(tmp_path):
+    rng = np.random.default_rng(0)
+    texture = testautoRIFT.cv2.GaussianBlur(rng.normal(size=(1220, 276)).astype(np.float32), (0, 0), 1.5)
+    reference = tmp_path / 'reference.tif'
+    secondary = tmp_path / 'secondary.tif'
+    _write_image(reference, texture[10:1210, 10:266])
+    _write_image(secondary, texture[12:1212, 9:265])
+
+    expected = _run_autorift(str(reference), str(secondary), tiles=1)
+    actual = _run_autorift(str(reference), str(secondary), tiles=3)
+
+    # the secondary image is shifted by 2 rows and 1 column; the sign conventions are autoRIFT's
+    dx, dy = expected[0], expected[1]
+    assert np.isfinite(dx).mean() > 0.9
+    assert abs(np.nanmedian(dx)) == pytest.approx(1, abs=0.2)
+    assert abs(np.nanmedian(dy)) == pytest.approx(2, abs=0.2)
+
+    for name, expected_value, actual_value in zip(
+        ('Dx', 'Dy', 'InterpMask', 'ChipSizeX', 'GridSpacingX', 'ScaleChipSizeY', 'SearchLimitX', 'SearchLimitY'),
+        expected[:8],
+        actual[:8],
+    ):
+        np.testing.assert_allclose(actual_value, expected_value, atol=1e-4, equal_nan=True, err_msg=name)
+    assert actual[8] == expected[8]
+    np.testing.assert_array_equal(actual[9], expected[9])
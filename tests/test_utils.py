@@ -2,6 +2,7 @@ from datetime import datetime
 from pathlib import Path
 
 import pytest
+import responses
 from hyp3lib import DemError
 
 from hyp3_autorift import geometry, utils
@@ -295,3 +296,122 @@ def test_ensure_burst_group_validity():
     with pytest.raises(ValueError):
         # less than 5 bursts
         _, _ = utils.ensure_burst_group_validity(reference=reference[:4], secondary=secondary[:4])
+
+
+def test_get_cgroup_cpu_limit(tmp_path):
+    assert utils.get_cgroup_cpu_limit(tmp_path) is None
+
+    (tmp_path / 'cpu.max').write_text('max 100000\n')
+    assert utils.get_cgroup_cpu_limit(tmp_path) is None
+
+    (tmp_path / 'cpu.max').write_text('1600000 100000\n')
+    assert utils.get_cgroup_cpu_limit(tmp_path) == 16.0
+
+    (tmp_path / 'cpu.max').write_text('150000 100000\n')
+    assert utils.get_cgroup_cpu_limit(tmp_path) == 1.5
+
+
+def test_get_cgroup_cpu_limit_v1(tmp_path):
+    (tmp_path / 'cpu').mkdir()
+    (tmp_path / 'cpu' / 'cpu.cfs_quota_us').write_text('-1\n')
+    (tmp_path / 'cpu' / 'cpu.cfs_period_us').write_text('100000\n')
+    assert utils.get_cgroup_cpu_limit(tmp_path) is None
+
+    (tmp_path / 'cpu' / 'cpu.cfs_quota_us').write_text('400000\n')
+    assert utils.get_cgroup_cpu_limit(tmp_path) == 4.0
+
+
+def test_get_available_cpus(monkeypatch):
+    monkeypatch.setattr(utils.os, 'sched_getaffinity', lambda pid: set(range(32)), raising=False)
+
+    monkeypatch.setattr(utils, 'get_cgroup_cpu_limit', lambda: None)
+    assert utils.get_available_cpus() == 32
+
+    monkeypatch.setattr(utils, 'get_cgroup_cpu_limit', lambda: 16.0)
+    assert utils.get_available_cpus() == 16
+
+    monkeypatch.setattr(utils, 'get_cgroup_cpu_limit', lambda: 0.5)
+    assert utils.get_available_cpus() == 1
+
+    monkeypatch.setattr(utils.os, 'sched_getaffinity', lambda pid: {0, 1}, raising=False)
+    monkeypatch.setattr(utils, 'get_cgroup_cpu_limit', lambda: 16.0)
+    assert utils.get_available_cpus() == 2
+
+
+def test_configure_workers(monkeypatch):
+    monkeypatch.setattr(utils, 'get_available_cpus', lambda: 12)
+    monkeypatch.delenv('GDAL_NUM_THREADS', raising=False)
+
+    assert utils.configure_workers(4) == 4
+    assert utils.os.environ['GDAL_NUM_THREADS'] == '4'
+
+    assert utils.configure_workers(None) == 12
+    assert utils.configure_workers(0) == 12
+    assert utils.os.environ['GDAL_NUM_THREADS'] == '12'
+
+
+def test_get_autorift_mpflag():
+    assert utils.get_autorift_mpflag(1) == 0
+    assert utils.get_autorift_mpflag(16) == 16
+
+
+def test_split_byte_range():
+    assert utils.split_byte_range(10, 3) == [(0, 2), (3, 5), (6, 9)]
+    assert utils.split_byte_range(10, 4, min_part_size=4) == [(0, 4), (5, 9)]
+    assert utils.split_byte_range(3, 4, min_part_size=4) == [(0, 2)]
+    assert utils.split_byte_range(0, 4) == []
+
+
+def _range_callback(body, requests_seen):
+    def callback(request):
+        byte_range = request.headers.get('Range')
+        requests_seen.append(byte_range)
+        if byte_range is None:
+            return 200, {}, body
+        start, end = (int(byte) for byte in byte_range.removeprefix('bytes=').split('-'))
+        end = min(end, len(body) - 1)
+        return 206, {'Content-Range': f'bytes {start}-{end}/{len(body)}'}, body[start : end + 1]
+
+    return callback
+
+
+@responses.activate
+def test_download_file_in_parts(tmp_path):
+    body = bytes(range(256)) * 40
+    requests_seen: list[str] = []
+    url = 'https://foo.com/bar/S1A_IW_SLC__1SDV.zip'
+    responses.add_callback(responses.GET, url, callback=_range_callback(body, requests_seen))
+
+    filename = utils.download_file_in_parts(url, directory=tmp_path, parts=3, chunk_size=1000)
+
+    assert filename == str(tmp_path / 'S1A_IW_SLC__1SDV.zip')
+    assert Path(filename).read_bytes() == body
+    assert sorted(requests_seen) == ['bytes=0-0', 'bytes=0-3412', 'bytes=3413-6825', 'bytes=6826-10239']
+    assert not (tmp_path / 'S1A_IW_SLC__1SDV.zip.partial').exists()
+
+
+@responses.activate
+def test_download_file_in_parts_no_range_support(tmp_path):
+    url = 'https://foo.com/bar/S1A_IW_SLC__1SDV.zip'
+    responses.add(responses.GET, url, body=b'foo' * 100, status=200)
+
+    filename = utils.download_file_in_parts(url, directory=tmp_path)
+
+    assert Path(filename).read_bytes() == b'foo' * 100
+
+
+@responses.activate
+def test_download_file_in_parts_truncated(tmp_path):
+    body = b'foo' * 1000
+    url = 'https://foo.com/bar/S1A_IW_SLC__1SDV.zip'
+
+    def callback(request):
+        start, end = (int(byte) for byte in request.headers['Range'].removeprefix('bytes=').split('-'))
+        return 206, {'Content-Range': f'bytes {start}-{end}/{len(body)}'}, body[start:end]
+
+    responses.add_callback(responses.GET, url, callback=callback)
+
+    with pytest.raises(RuntimeError, match='Expected'):
+        utils.download_file_in_parts(url, directory=tmp_path, parts=2, chunk_size=100)
+
+    assert list(tmp_path.iterdir()) == []